@@ -2,18 +2,24 @@ from voice.voice import CatiaVoice
 from memory.memory import CatiaMemory
 import json
 import os
-import requests
-from fake_useragent import UserAgent
-from bs4 import BeautifulSoup
+import re
 import random
 from llm.llm import CatiaLLM  # ✅ Import fine-tuned model
+from llm.workers import RemoteLLM
+from config import Config
+from classifier.classifier import MOODS
+from search.engine import SearchEngine
+from search.extract import extract_snippet
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?…])\s+")
 
 class CatiaAssistant:
     
     def __init__(self):
-        self.llm = CatiaLLM()
+        # ✅ Generation runs in worker processes (Config.INFERENCE_WORKERS) so a stall never freezes the GUI
+        self.llm = RemoteLLM() if Config.INFERENCE_WORKERS else CatiaLLM()
         self.voice = CatiaVoice()
-        self.memory = CatiaMemory()
+        self.memory = CatiaMemory.shared()  # ✅ The same store CatiaLLM learns into
         self.mood = "neutral"  # 🔥 Tracks her current mood
         self.character_file = r"C:\Users\swapn\OneDrive\Desktop\Prog\SideProjects\Catia\llm\Catia-specV2.json"  # ✅ Correct absolute path
 
@@ -26,19 +32,10 @@ class CatiaAssistant:
         if self.mood != "neutral":  # 🔥 If she already has a mood, don't reset it immediately
             return self.mood
 
-        mood_keywords = {
-            "angry": ["mad", "pissed", "furious", "annoyed", "irritated"],
-            "sad": ["depressed", "unhappy", "miserable", "lonely", "cry"],
-            "horny": ["hot", "turned on", "needy", "moan", "naughty"],
-            "happy": ["excited", "great", "amazing", "love", "happy", "awesome"]
-        }
-
-        for mood, keywords in mood_keywords.items():
-            if any(word in user_input.lower() for word in keywords):
-                self.mood = mood  # 🔥 Keep the mood persistent
-                return mood
-
-        return "neutral"
+        mood = MOODS.classify(user_input)
+        if mood != "neutral":
+            self.mood = mood  # 🔥 Keep the mood persistent
+        return mood
 
     def get_mood_response(self, user_input):
         """Generates a response based on Catia's mood."""
@@ -56,9 +53,37 @@ class CatiaAssistant:
 
     def respond(self, user_input):
         """Processes user input, detects mood, and speaks the response."""
+        return "".join(self.respond_stream(user_input))
+
+    def respond_stream(self, user_input):
+        """Like respond(), but yields the reply in pieces as it is generated and speaks each finished sentence."""
         mood = self.detect_mood(user_input)  # 🔥 Detect current mood
 
         # 🔥 Mood-Triggered Events
+        event = self.get_mood_event(mood)
+        if event:
+            yield event
+            return
+
+        # 🔥 If no mood-based event is triggered, fall back to normal response
+        mood_response = self.get_mood_response(user_input)
+        yield mood_response + " "
+
+        # ✅ Speak sentence by sentence as they complete instead of waiting for the whole reply
+        ai_response, unspoken = "", mood_response + " "
+        for piece in self.llm.think_stream(user_input):
+            ai_response += piece
+            yield piece
+            *sentences, unspoken = SENTENCE_BREAK.split(unspoken + piece)
+            for sentence in sentences:
+                self.voice.speak_queued(sentence)
+        self.voice.speak_queued(unspoken)
+
+        response = f"{mood_response} {ai_response}"
+        self.memory.save_memory(user_input, response)
+
+    def get_mood_event(self, mood):
+        """Returns a mood-triggered reply that replaces the normal one, if the mood calls for it."""
         if mood == "angry":
             return random.choice([
                 "Tsk. I'm not in the mood for this.",
@@ -87,14 +112,7 @@ class CatiaAssistant:
                 "Mmm, I *love* days like this!"
             ])
 
-        # 🔥 If no mood-based event is triggered, fall back to normal response
-        mood_response = self.get_mood_response(user_input)  
-        ai_response = self.llm.think(user_input)  
-        response = f"{mood_response} {ai_response}"  
-
-        self.memory.save_memory(user_input, response)  
-        self.voice.speak(response)
-        return response
+        return None
 
     def load_responses(self):
         """Load predefined responses from responses.json."""
@@ -170,55 +188,17 @@ class CatiaAssistant:
         return "I can't learn that response."
 
     def search_web(self, query):
-        """Searches the web using multiple sources: Google → DuckDuckGo → Bing → Wikipedia."""
-        search_sources = [
-            ("Google", f"https://www.google.com/search?q={query}", "span"),
-            ("DuckDuckGo", f"https://html.duckduckgo.com/html/?q={query}", "div"),
-            ("Bing", f"https://www.bing.com/search?q={query}", "p"),
-            ("Wikipedia", f"https://en.wikipedia.org/w/index.php?search={query}", "p")
-        ]
-        
-        headers = {"User-Agent": UserAgent().random}
-
-        for name, url, tag in search_sources:
-            print(f"🔍 Trying {name}...")
-            try:
-                response = requests.get(url, headers=headers, timeout=5)
-                if response.status_code == 200:
-                    result = self.extract_search_result(response.text, tag)
-                    if result:
-                        print(f"✅ {name} Success!")
-                        return result
-            except requests.exceptions.RequestException:
-                print(f"❌ {name} Failed.")
-
-        return "Couldn't find anything useful. Try again later."
+        """Asks the offline Wikipedia index, then Google, DuckDuckGo, Bing and Wikipedia at once for the first good answer."""
+        print(f"🔍 Searching for {query!r}...")
+        return SearchEngine.shared().search(query) or "Couldn't find anything useful. Try again later."
 
     def extract_search_result(self, html, tag):
         """Extracts a short summary from search results, filtering out bad data."""
-        soup = BeautifulSoup(html, "html.parser")
-        snippets = soup.find_all(tag)
-
-        for snippet in snippets:
-            text = snippet.text.strip()
-            if len(text) > 50 and "http" not in text:
-                return text
-
-        return "No relevant results found."
+        return extract_snippet(html, tag) or "No relevant results found."
 
     def search_wikipedia(self, query):
-        """Search Wikipedia for simple answers (avoids CAPTCHAs)."""
-        url = f"https://en.wikipedia.org/w/index.php?search={query}"
-        headers = {"User-Agent": UserAgent().random}
-        try:
-            response = requests.get(url, headers=headers, timeout=5)
-            soup = BeautifulSoup(response.text, "html.parser")
-            first_paragraph = soup.find("p").text.strip()
-            if len(first_paragraph) > 50:
-                return first_paragraph
-        except requests.exceptions.RequestException:
-            return "Couldn't find anything useful. Try again later."
-        return "No relevant results found."
+        """Search Wikipedia for simple answers (avoids CAPTCHAs), offline when the local index has one."""
+        return SearchEngine.shared().search(query, ["Wikipedia"]) or "No relevant results found."
 
     def listen_and_respond(self):
         """Listens, responds, and remembers interactions."""
@@ -0,0 +1,80 @@
+"""Per-call cost of the compiled keyword classifier against the old any() loops.
+
+Run from the project root:  python -m benchmarks.bench_classifier
+"""
+import timeit
+from classifier.classifier import CONTEXTS, MEMORY_CATEGORIES, MOODS
+
+SAMPLES = [
+    "hello there, how are you doing today?",
+    "tell me about the history of the roman empire",
+    "you look absolutely gorgeous tonight",
+    "i'm working late again, the deadline is tomorrow",
+    "do you miss me when i'm gone?",
+    "ugh i'm so annoyed with everything right now",
+    "the quick brown fox jumps over the lazy dog " * 4,
+]
+
+
+def legacy_memory_category(key):
+    flirt_keywords = ["beautiful", "hot", "gorgeous", "sexy", "cute", "stunning", "ravishing", "luscious"]
+    joke_keywords = ["joke", "funny", "laugh"]
+    fact_keywords = ["what is", "who is", "tell me about", "explain", "define"]
+    question_keywords = ["how", "why", "when", "where", "does", "can", "is", "should", "will"]
+    greeting_keywords = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "yo", "sup"]
+    goodbye_keywords = ["bye", "goodbye", "see you", "later", "farewell", "take care"]
+    affirmation_keywords = ["yes", "yeah", "yep", "sure", "absolutely", "of course"]
+    negation_keywords = ["no", "nah", "nope", "never", "not really"]
+    key_lower = key.lower()
+    for category, keywords in [("flirtation", flirt_keywords), ("jokes", joke_keywords), ("facts", fact_keywords),
+                               ("questions", question_keywords), ("greetings", greeting_keywords),
+                               ("goodbyes", goodbye_keywords), ("affirmations", affirmation_keywords),
+                               ("negations", negation_keywords)]:
+        if any(word in key_lower for word in keywords):
+            return category
+    return "casual"
+
+
+def legacy_context(user_input):
+    nsfw_keywords = ["talk dirty", "moan", "kink", "naughty", "sexy", "seduce",
+                     "whisper", "dominate", "flirt", "kiss", "tease", "bite", "touch"]
+    overwork_keywords = ["working late", "overtime", "too busy", "stressed", "can't talk", "deadline"]
+    relationship_keywords = ["girlfriend", "jealous", "love me", "miss me",
+                             "who do you belong to", "am I your favorite", "do you think about me"]
+    user_input = user_input.lower()
+    if any(keyword in user_input for keyword in nsfw_keywords):
+        return "nsfw"
+    if any(keyword in user_input for keyword in relationship_keywords):
+        return "relationship"
+    if any(keyword in user_input for keyword in overwork_keywords):
+        return "overwork"
+    return "general"
+
+
+def legacy_mood(user_input):
+    mood_keywords = {
+        "angry": ["mad", "pissed", "furious", "annoyed", "irritated"],
+        "sad": ["depressed", "unhappy", "miserable", "lonely", "cry"],
+        "horny": ["hot", "turned on", "needy", "moan", "naughty"],
+        "happy": ["excited", "great", "amazing", "love", "happy", "awesome"]
+    }
+    for mood, keywords in mood_keywords.items():
+        if any(word in user_input.lower() for word in keywords):
+            return mood
+    return "neutral"
+
+
+def per_call_us(function, number=2000):
+    seconds = timeit.timeit(lambda: [function(text) for text in SAMPLES], number=number)
+    return seconds / (number * len(SAMPLES)) * 1e6
+
+
+if __name__ == "__main__":
+    cases = [
+        ("memory category", legacy_memory_category, MEMORY_CATEGORIES.classify),
+        ("llm context", legacy_context, CONTEXTS.classify),
+        ("assistant mood", legacy_mood, MOODS.classify),
+    ]
+    print(f"{'call site':<18}{'any() loops':>14}{'compiled':>12}")
+    for name, legacy, compiled in cases:
+        print(f"{name:<18}{per_call_us(legacy):>11.2f} us{per_call_us(compiled):>9.2f} us")
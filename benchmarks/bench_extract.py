@@ -0,0 +1,126 @@
+"""Snippet extraction: the full BeautifulSoup parse against the streaming parsers, on saved result pages.
+
+Each page is extracted with extract_snippet and with every streaming
+parser, fed in `--chunk-size` pieces the way SearchClient.stream delivers
+them. For every parser it reports the time per page, whether the snippet
+matches extract_snippet's, and how much of the page had been fed when the
+snippet was found, which is what an early exit saves in download.
+
+Pages are .html files whose name starts with a source name from
+search.engine.SOURCES (e.g. google_catia.html), which picks the tag the
+snippet is in. --fetch saves fresh pages for a query first.
+
+Run from the project root:
+    python -m benchmarks.bench_extract --fetch "what is catia" --pages benchmarks/pages --output bench_extract.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from urllib.parse import quote_plus
+from search.engine import SOURCES
+from search.extract import LxmlSnippetParser, StreamingSnippetParser, etree, extract_snippet
+
+PARSERS = {"html.parser": StreamingSnippetParser}
+if etree is not None:
+    PARSERS["lxml"] = LxmlSnippetParser
+
+
+def fetch_pages(query, directory):
+    from search.client import SearchClient
+
+    client = SearchClient.shared()
+    os.makedirs(directory, exist_ok=True)
+    for name, template, _ in SOURCES:
+        path = os.path.join(directory, f"{name.lower()}_{quote_plus(query)}.html")
+        try:
+            html = client.get(template.format(query=quote_plus(query)))
+        except Exception as error:
+            print(f"❌ {name} failed: {error}")
+            continue
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(html)
+        print(f"📦 Saved {path} ({len(html) / 1024:.0f} KB)")
+
+
+def load_pages(directory):
+    """(file name, tag, html) for every saved page named after a source."""
+    tags = {name.lower(): tag for name, _, tag in SOURCES}
+    pages = []
+    for file_name in sorted(os.listdir(directory)):
+        source = file_name.split("_", 1)[0].lower()
+        if file_name.endswith(".html") and source in tags:
+            with open(os.path.join(directory, file_name), "r", encoding="utf-8", errors="replace") as file:
+                pages.append((file_name, tags[source], file.read()))
+    return pages
+
+
+def stream_extract(parser_class, html, tag, chunk_size):
+    """(snippet, characters fed before it was found) for one page fed in chunks."""
+    parser = parser_class(tag)
+    for start in range(0, len(html), chunk_size):
+        if parser.feed(html[start:start + chunk_size]):
+            return parser.result, min(start + chunk_size, len(html))
+    return parser.close(), len(html)
+
+
+def timed(function, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = function()
+    return result, (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="benchmarks/pages", help="Directory of saved result pages")
+    parser.add_argument("--fetch", default=None, metavar="QUERY", help="Save fresh result pages for QUERY first")
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_pages(args.fetch, args.pages)
+    pages = load_pages(args.pages) if os.path.isdir(args.pages) else []
+    if not pages:
+        raise SystemExit(f"❌ No saved result pages in {args.pages}; use --fetch QUERY to save some")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "chunk_size": args.chunk_size,
+        "pages": {},
+    }
+    totals = dict.fromkeys(["beautifulsoup", *PARSERS], 0.0)
+
+    for file_name, tag, html in pages:
+        expected, seconds = timed(lambda: extract_snippet(html, tag), args.runs)
+        totals["beautifulsoup"] += seconds
+        row = {"tag": tag, "characters": len(html), "found": expected is not None,
+               "beautifulsoup_ms": seconds * 1000}
+        print(f"📊 {file_name}: {len(html) / 1024:.0f} KB, BeautifulSoup {seconds * 1000:.2f} ms")
+
+        for name, parser_class in PARSERS.items():
+            (snippet, fed), seconds = timed(lambda: stream_extract(parser_class, html, tag, args.chunk_size), args.runs)
+            totals[name] += seconds
+            row[name] = {"ms": seconds * 1000, "matches": snippet == expected, "fed_fraction": fed / len(html)}
+            print(f"📊   {name}: {seconds * 1000:.2f} ms, {'matches' if snippet == expected else 'DIFFERS'}, "
+                  f"stopped at {fed / len(html):.0%} of the page")
+        report["pages"][file_name] = row
+
+    report["total_ms"] = {name: seconds * 1000 for name, seconds in totals.items()}
+    report["speedup"] = {name: totals["beautifulsoup"] / totals[name] for name in PARSERS if totals[name]}
+    for name, speedup in report["speedup"].items():
+        print(f"✅ {name}: {speedup:.1f}x faster than BeautifulSoup over {len(pages)} pages")
+
+    output = args.output or f"bench_extract_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
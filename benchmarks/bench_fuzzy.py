@@ -0,0 +1,117 @@
+"""FuzzyIndex against difflib.get_close_matches: that they agree, and how much faster it is.
+
+Builds a store of synthetic inputs, then runs queries of several kinds
+through difflib (the matcher load_memory_fuzzy used before FuzzyIndex) and
+through FuzzyIndex: near copies of stored keys, keys with characters
+inserted, deleted or swapped, and short, repetitive strings. FuzzyIndex
+must return exactly what difflib does; any mismatch makes the exit status 1.
+
+Run from the project root:
+    python -m benchmarks.bench_fuzzy --keys 5000 --queries 2000 --output bench_fuzzy.json
+"""
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import time
+from difflib import get_close_matches
+from benchmarks.bench_memory import WORDS, random_sentence
+from memory.fuzzy import FuzzyIndex
+
+
+def mutate(rng, text, edits):
+    """text with `edits` random single-character insertions, deletions or substitutions."""
+    text = list(text)
+    for _ in range(edits):
+        position = rng.randint(0, len(text))
+        action = rng.choice(("insert", "delete", "substitute")) if text else "insert"
+        if action == "insert":
+            text.insert(position, rng.choice(string.ascii_lowercase + " "))
+        elif action == "delete":
+            del text[min(position, len(text) - 1)]
+        else:
+            text[min(position, len(text) - 1)] = rng.choice(string.ascii_lowercase + " ")
+    return "".join(text)
+
+
+def make_keys(rng, count):
+    keys = set()
+    while len(keys) < count:
+        kind = rng.random()
+        if kind < 0.7:
+            keys.add(random_sentence(rng))
+        elif kind < 0.85:
+            keys.add(rng.choice("ab") * rng.randint(1, 12) + rng.choice(["", "b", "ba", "ab"]))
+        else:
+            keys.add("".join(rng.choice("abc ") for _ in range(rng.randint(1, 8))))
+    return sorted(keys)
+
+
+def make_queries(rng, keys, count):
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(mutate(rng, rng.choice(keys), rng.randint(1, 6)))
+        elif kind < 0.6:
+            queries.append(rng.choice(keys) + rng.choice(["", "?", " pls", "!"]))
+        elif kind < 0.8:
+            queries.append(rng.choice("ab") * rng.randint(0, 14))
+        else:
+            queries.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--cutoff", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = make_keys(rng, args.keys)
+    queries = make_queries(rng, keys, args.queries)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "keys": len(keys),
+        "queries": len(queries),
+        "cutoff": args.cutoff,
+    }
+
+    start = time.perf_counter()
+    expected = [get_close_matches(query, keys, 3, args.cutoff) for query in queries]
+    difflib_ms = (time.perf_counter() - start) / len(queries) * 1000
+    report["difflib_ms"] = difflib_ms
+    print(f"📊 difflib: {difflib_ms:.3f} ms per query")
+
+    index = FuzzyIndex()
+    index.build({"learned": dict.fromkeys(keys, "")})
+    start = time.perf_counter()
+    found = [index.close_matches(query, 3, args.cutoff) for query in queries]
+    index_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    differing = [query for query, got, want in zip(queries, found, expected) if got != want]
+    report.update({"index_ms": index_ms, "speedup": difflib_ms / index_ms, "mismatches": len(differing),
+                   "examples": differing[:10]})
+    print(f"📊 FuzzyIndex: {index_ms:.3f} ms per query ({difflib_ms / index_ms:.1f}x), "
+          f"{len(differing)} of {len(queries)} results differ")
+
+    output = args.output or f"bench_fuzzy_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"✅ Results written to {output}")
+    if differing:
+        print(f"❌ FuzzyIndex disagreed with difflib on {len(differing)} queries")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
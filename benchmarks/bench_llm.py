@@ -0,0 +1,103 @@
+"""Greedy-decoding tokens/sec of each model backend on this host, checked against eager fp32.
+
+Loads the eager model as the reference, then every requested backend, and
+reports throughput and how many greedy tokens each backend reproduces
+exactly. The fastest backend that stays faithful is the one to put in
+Config.MODEL_BACKEND.
+
+Run from the project root:
+    python -m benchmarks.bench_llm --backends eager int8 onnx --output bench_llm.json
+"""
+import argparse
+import json
+import platform
+import time
+from concurrent.futures import wait
+from config import Config
+from llm.backends import greedy_agreement, load_model, tokens_per_second
+from llm.scheduler import BatchScheduler
+
+PROMPTS = [
+    "do you love me?",
+    "tell me about your day",
+    "i'm working late again tonight",
+    "what should we do this weekend?",
+    "explain why the sky is blue",
+]
+
+
+def batched_tokens_per_second(model, tokenizer, concurrency, max_new_tokens=64, rounds=3):
+    """Throughput of the micro-batcher with `concurrency` callers submitting at once."""
+    scheduler = BatchScheduler(model, tokenizer, Config.LLM_BATCH_WINDOW, max(concurrency, 1))
+    generated, start = 0, time.perf_counter()
+    for _ in range(rounds):
+        requests = [scheduler.submit(tokenizer(PROMPTS[i % len(PROMPTS)])["input_ids"],
+                                     max_new_tokens=max_new_tokens, do_sample=False)
+                    for i in range(concurrency)]
+        wait([request.future for request in requests])
+        generated += sum(len(request.generated) for request in requests)
+    return generated / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["eager", "int8", "onnx"])
+    parser.add_argument("--model", default=Config.MODEL_PATH)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.9,
+                        help="Mean greedy agreement with eager a backend needs to be recommended")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 2, 4, 8],
+                        help="Concurrent callers to measure the eager micro-batcher with")
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    import torch
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch_threads": torch.get_num_threads(),
+        "backends": {},
+    }
+
+    print("📊 Loading eager reference...")
+    reference, tokenizer = load_model(args.model, "eager")
+
+    for backend in args.backends:
+        print(f"📊 {backend}...")
+        try:
+            start = time.perf_counter()
+            model, _ = (reference, tokenizer) if backend == "eager" else load_model(args.model, backend, Config.MODEL_ONNX_DIR)
+            load_seconds = time.perf_counter() - start
+            agreement = greedy_agreement(reference, model, tokenizer, PROMPTS, args.max_new_tokens)
+            speed = tokens_per_second(model, tokenizer, PROMPTS, args.max_new_tokens, args.runs)
+        except Exception as error:
+            print(f"  ❌ {error}")
+            report["backends"][backend] = {"error": str(error)}
+            continue
+
+        mean_agreement = sum(agreement) / len(agreement)
+        report["backends"][backend] = {"tokens_per_second": speed, "load_seconds": load_seconds,
+                                       "greedy_agreement": mean_agreement, "per_prompt_agreement": agreement}
+        print(f"  {speed:8.1f} tok/s  greedy agreement {mean_agreement:.0%}  loaded in {load_seconds:.1f}s")
+
+    report["batched_eager"] = {}
+    for concurrency in args.concurrency:
+        speed = batched_tokens_per_second(reference, tokenizer, concurrency, args.max_new_tokens)
+        report["batched_eager"][str(concurrency)] = speed
+        print(f"📊 eager, {concurrency} concurrent callers: {speed:8.1f} tok/s")
+
+    faithful = {name: result["tokens_per_second"] for name, result in report["backends"].items()
+                if result.get("greedy_agreement", 0.0) >= args.min_agreement}
+    report["recommended"] = max(faithful, key=faithful.get) if faithful else None
+    print(f"✅ Fastest faithful backend: {report['recommended']}")
+
+    output = args.output or f"bench_llm_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
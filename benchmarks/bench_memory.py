@@ -0,0 +1,175 @@
+"""CatiaMemory latency, write volume and memory use at growing store sizes.
+
+Builds synthetic memories of each size in a temp directory, times the hot
+CatiaMemory operations against them and writes the results as JSON so that
+storage changes can be compared run to run. The store and its semantic
+index are built before any timing starts. Memory is the process's current
+RSS sampled before and after each phase, so every operation reports what
+it added on top of the loaded store.
+
+Run from the project root:
+    python -m benchmarks.bench_memory --sizes 1000 10000 100000 --output bench_memory.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from config import Config
+from memory.memory import CatiaMemory
+
+WORDS = ("hello hi hey how are you what is the weather today tell me a joke do you love me can you help "
+         "beautiful night good morning see you later explain python define love who is she why not baby "
+         "miss work late tired happy sad music movie dinner sleep dream coffee rain sun cat dog").split()
+
+
+def random_sentence(rng, low=3, high=10):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def written_bytes(directory):
+    """Bytes handed to write() by this process if the OS reports it, else the size of the directory."""
+    try:
+        with open("/proc/self/io") as file:
+            for line in file:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def rss_mb():
+    """This process's resident memory right now (None where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def rss_change(before):
+    after = rss_mb()
+    return None if before is None or after is None else after - before
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000,
+            "mean_ms": sum(ordered) / len(ordered) * 1000}
+
+
+def populate(directory, size, rng):
+    """Fills a fresh store with `size` learned inputs through one bulk write, then builds its semantic index."""
+    memory = CatiaMemory(os.path.join(directory, "catia_memory.enc"), os.path.join(directory, "memory_key.key"))
+    operations, seen = [], set()
+    while len(seen) < size:
+        key = random_sentence(rng)
+        if key not in seen:
+            seen.add(key)
+            operations.append(("put", (rng.choice(CatiaMemory.CATEGORIES), key), random_sentence(rng, 5, 20)))
+    memory.cache.store.write_batch(operations)
+    memory.cache.data = None  # Force the next read to load what was just written
+    memory.cache.memory()
+    memory.recall_semantic(next(iter(seen)), track=False)  # The bulk write bypassed the index; build it once here
+    return memory, sorted(seen)
+
+
+def time_operation(memory, directory, operation, iterations):
+    latencies = []
+    before = written_bytes(directory)
+    rss_before = rss_mb()
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+    memory.cache.flush()  # Count the write-back cost too
+    result = percentiles(latencies)
+    result["bytes_written_per_op"] = (written_bytes(directory) - before) / iterations
+    result["rss_change_mb"] = rss_change(rss_before)  # Across all iterations of this phase
+    result["iterations"] = iterations
+    return result
+
+
+def run_size(size, iterations, seed):
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix=f"catia-bench-{size}-")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rss_before = rss_mb()
+            memory, keys = populate(directory, size, rng)
+            populated_mb = rss_change(rss_before)
+            queries = [rng.choice(keys) + rng.choice(["", "?", " pls", "!"]) for _ in range(iterations)]
+            fuzzy_iterations = max(10, iterations // 10)
+
+            operations = {
+                "save_memory": lambda i: memory.save_memory(f"{queries[i]} {i}", random_sentence(rng, 5, 20)),
+                "load_memory": lambda i: memory.load_memory(),
+                "load_memory_fuzzy": lambda i: memory.load_memory_fuzzy(queries[i]),
+                "recall": lambda i: memory.recall(queries[i]),
+                "store_interaction": lambda i: memory.store_interaction(queries[i], "response"),
+                "save_feedback": lambda i: memory.save_feedback(rng.choice(keys[:50]), "corrected"),
+                "save_conversation": lambda i: memory.save_conversation(queries[i], "response"),
+            }
+            results = {}
+            for name, operation in operations.items():
+                count = fuzzy_iterations if name in ("save_memory", "load_memory_fuzzy", "recall") else iterations
+                results[name] = time_operation(memory, directory, operation, count)
+            usage = memory.stats()
+
+        results["usage"] = {name: usage[name] for name in ("entries", "hits", "misses", "hit_rate", "evictions")}
+        results["memory"] = {"populate_rss_change_mb": populated_mb, "rss_mb": rss_mb()}
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=Config.MEMORY_BACKEND)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    Config.MEMORY_BACKEND = args.backend
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+
+    for size in args.sizes:
+        print(f"📊 {size} entries...")
+        results = run_size(size, args.iterations, args.seed)
+        report["sizes"][str(size)] = results
+        for name, stats in results.items():
+            if isinstance(stats, dict) and "p50_ms" in stats:
+                rss = "" if stats["rss_change_mb"] is None else f"  {stats['rss_change_mb']:+7.1f} MB RSS"
+                print(f"  {name:<20} p50 {stats['p50_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms  "
+                      f"{stats['bytes_written_per_op']:10.0f} B/op{rss}")
+        print(f"  hit rate {results['usage']['hit_rate']:.2f}, {results['usage']['evictions']} evictions")
+        if results["memory"]["rss_mb"] is not None:
+            print(f"  loading the store added {results['memory']['populate_rss_change_mb']:.1f} MB RSS, "
+                  f"{results['memory']['rss_mb']:.1f} MB at the end")
+
+    output = args.output or f"bench_memory_{args.backend}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
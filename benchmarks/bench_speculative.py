@@ -0,0 +1,77 @@
+"""Tokens/sec of speculative decoding with a draft model against plain generate, with the draft's acceptance rate.
+
+Loads the main model and the draft, measures plain greedy decoding, then
+assisted decoding for each number of draft tokens per verification pass.
+Acceptance rate is the share of the draft's proposals the main model keeps;
+speculative decoding only pays off when it is high enough to cover the
+draft's own cost.
+
+Run from the project root:
+    python -m benchmarks.bench_speculative --draft llm/trained_catia_draft --output bench_speculative.json
+"""
+import argparse
+import json
+import platform
+import time
+from benchmarks.bench_llm import PROMPTS
+from config import Config
+from llm.backends import load_model, tokens_per_second
+from llm.speculative import acceptance_rate, draft_compatible
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=Config.MODEL_PATH)
+    parser.add_argument("--draft", default=Config.DRAFT_MODEL_PATH or "distilgpt2",
+                        help="Draft model path or Hugging Face Hub name")
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    import torch
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch_threads": torch.get_num_threads(),
+        "draft": args.draft,
+        "speculative": {},
+    }
+
+    print("📊 Loading models...")
+    model, tokenizer = load_model(args.model, "eager")
+    draft = load_model(args.draft, "eager")[0]
+    if not draft_compatible(model, draft):
+        raise SystemExit("❌ The draft model does not share the main model's vocabulary")
+
+    plain = tokens_per_second(model, tokenizer, PROMPTS, args.max_new_tokens, args.runs)
+    report["plain_tokens_per_second"] = plain
+    print(f"📊 plain: {plain:8.1f} tok/s")
+
+    for count in args.draft_tokens:
+        # ✅ A constant schedule so each row measures exactly `count` proposals per pass
+        draft.generation_config.num_assistant_tokens = count
+        draft.generation_config.num_assistant_tokens_schedule = "constant"
+        speed = tokens_per_second(model, tokenizer, PROMPTS, args.max_new_tokens, args.runs, assistant_model=draft)
+        accepted = acceptance_rate(model, draft, tokenizer, PROMPTS, count, args.max_new_tokens)
+        report["speculative"][str(count)] = {"tokens_per_second": speed, "speedup": speed / plain,
+                                             "acceptance_rate": accepted}
+        print(f"📊 {count} draft tokens: {speed:8.1f} tok/s ({speed / plain:.2f}x)  acceptance {accepted:.0%}")
+
+    best = max(report["speculative"], key=lambda count: report["speculative"][count]["tokens_per_second"])
+    report["recommended_draft_tokens"] = int(best) if report["speculative"][best]["speedup"] > 1 else None
+    if report["recommended_draft_tokens"]:
+        print(f"✅ Set Config.DRAFT_MODEL_PATH and Config.LLM_DRAFT_TOKENS = {best}")
+    else:
+        print("⚠ Speculative decoding is no faster than plain generate with this draft model")
+
+    output = args.output or f"bench_speculative_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,5 +22,9 @@ class BootScreen(QWidget):
         self.player.mediaStatusChanged.connect(self.close_on_finish)
 
     def close_on_finish(self, status):
-        if status == QMediaPlayer.EndOfMedia:
-            self.setParent(None)  # Remove from the UI properly
+        if status in (QMediaPlayer.EndOfMedia, QMediaPlayer.InvalidMedia):
+            self.close()  # A top-level window has no parent to leave, so close it
+
+    def mousePressEvent(self, event):
+        self.player.stop()  # ✅ Click to skip; the main window is already usable behind it
+        self.close()
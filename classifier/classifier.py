@@ -0,0 +1,75 @@
+import re
+
+
+class KeywordClassifier:
+    """Matches several keyword tables against text in a single compiled regex pass.
+
+    Tables are given in priority order as (label, keywords) pairs; `classify`
+    returns the first label (in that order) that has a keyword in the text,
+    which is the same precedence as a chain of `if any(word in text ...)`
+    checks. Keywords only match as whole words/phrases, case-insensitively.
+    """
+
+    def __init__(self, tables, default=None):
+        self.default = default
+        self.order = [label for label, _ in tables]
+
+        owners = {}
+        for label, keywords in tables:
+            for keyword in keywords:
+                owners.setdefault(keyword.lower(), set()).add(label)
+
+        # A phrase that contains another keyword also carries that keyword's labels,
+        # so the longest match at each position is enough to see every label.
+        bounded = {keyword: re.compile(rf"(?<!\w){re.escape(keyword)}(?!\w)") for keyword in owners}
+        self.owners = {
+            keyword: frozenset().union(*(owners[other] for other, pattern in bounded.items() if pattern.search(keyword)))
+            for keyword in owners
+        }
+        self.best = {keyword: min(map(self.order.index, labels)) for keyword, labels in self.owners.items()}
+
+        # Text is lowercased before matching (much faster than re.IGNORECASE), and the
+        # lookahead lets matches overlap, e.g. "can't talk" and "talk dirty".
+        alternation = "|".join(re.escape(keyword) for keyword in sorted(owners, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?=(?<!\w)({alternation})(?!\w))")
+
+    def labels(self, text):
+        """Returns every label with at least one keyword in text."""
+        return set().union(*map(self.owners.__getitem__, self.pattern.findall(text.lower())))
+
+    def classify(self, text):
+        """Returns the highest-priority matching label, or the default."""
+        matches = self.pattern.findall(text.lower())
+        if not matches:
+            return self.default
+        return self.order[min(map(self.best.__getitem__, matches))]
+
+
+# ✅ Keyword tables, compiled once per process
+
+MEMORY_CATEGORIES = KeywordClassifier([
+    ("flirtation", ["beautiful", "hot", "gorgeous", "sexy", "cute", "stunning", "ravishing", "luscious"]),
+    ("jokes", ["joke", "funny", "laugh"]),
+    ("facts", ["what is", "who is", "tell me about", "explain", "define"]),
+    ("questions", ["how", "why", "when", "where", "does", "can", "is", "should", "will"]),
+    ("greetings", ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "yo", "sup"]),
+    ("goodbyes", ["bye", "goodbye", "see you", "later", "farewell", "take care"]),
+    ("affirmations", ["yes", "yeah", "yep", "sure", "absolutely", "of course"]),
+    ("negations", ["no", "nah", "nope", "never", "not really"]),
+], default="casual")
+
+CONTEXTS = KeywordClassifier([
+    ("nsfw", ["talk dirty", "moan", "kink", "naughty", "sexy", "seduce",
+              "whisper", "dominate", "flirt", "kiss", "tease", "bite", "touch"]),
+    ("relationship", ["girlfriend", "jealous", "love me", "miss me",
+                      "who do you belong to", "am I your favorite", "do you think about me"]),
+    ("overwork", ["working late", "overtime", "too busy", "stressed",
+                  "can't talk", "deadline"]),
+], default="general")
+
+MOODS = KeywordClassifier([
+    ("angry", ["mad", "pissed", "furious", "annoyed", "irritated"]),
+    ("sad", ["depressed", "unhappy", "miserable", "lonely", "cry"]),
+    ("horny", ["hot", "turned on", "needy", "moan", "naughty"]),
+    ("happy", ["excited", "great", "amazing", "love", "happy", "awesome"]),
+], default="neutral")
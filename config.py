@@ -11,6 +11,61 @@ class Config:
     IDLE_VIDEO = os.path.join(BASE_DIR, "boot", "catia_idle.mp4")
     MEMORY_FILE = os.path.join(BASE_DIR, "memory", "catia_memory.enc")
     MEMORY_KEY = os.path.join(BASE_DIR, "memory", "memory_key.key")
+    MODEL_PATH = os.path.join(BASE_DIR, "llm", "trained_catia")
+    MODEL_ONNX_DIR = os.path.join(BASE_DIR, "llm", "trained_catia_onnx")  # Exported on first use of the "onnx" backend
+    DRAFT_MODEL_PATH = None  # Small draft model for speculative decoding, e.g. os.path.join(BASE_DIR, "llm", "trained_catia_draft") (None = off)
+    PERSONA_FILE = os.path.join(BASE_DIR, "llm", "Catia-specV2.json")
+
+    # Memory cache settings
+    MEMORY_BACKEND = "journal"  # "journal" (append-only encrypted log) or "sqlite" (per-row encrypted database)
+    MEMORY_FLUSH_EVERY = 16  # Flush queued memory writes after this many
+    MEMORY_FLUSH_INTERVAL = 5.0  # ...or this many seconds after the first one
+    MEMORY_CHECK_INTERVAL = 1.0  # Seconds between checks for outside changes to the memory file
+
+    # Learned memory size limits
+    MEMORY_MAX_ENTRIES = 50000  # Learned responses kept across all categories (None = unlimited)
+    MEMORY_CATEGORY_CAPS = {}  # Per-category limits, e.g. {"casual": 10000}
+    MEMORY_EVICTION_POLICY = "lru"  # "lru", "lfu" or "age" (old entries with few recalls go first)
+    MEMORY_EVICTION_SAMPLE = 16  # Least recently used entries the policy chooses a victim from
+    MEMORY_EVICTION_BATCH = 4  # Most entries evicted per save, so eviction never stalls a reply
+
+    # Model settings
+    MODEL_BACKEND = "auto"  # "eager" (fp32), "fp16", "int8" (dynamic quantization), "onnx" (ONNX Runtime) or "auto"
+    LLM_CONVERSATION_CONTEXT = True  # Condition replies on earlier turns, reusing their cached keys/values
+    LLM_CONTEXT_TOKENS = None  # Conversation window in tokens (None = the model's n_positions)
+    LLM_CONTEXT_KEEP_TOKENS = 384  # Recent turns kept when the window fills and slides
+    LLM_PERSONA_TOKENS = 256  # Persona examples from PERSONA_FILE placed before every conversation
+    LLM_BATCHING = True  # Batch concurrent generations, with or without a conversation context, into shared forward passes
+    LLM_BATCH_WINDOW = 0.005  # Seconds the batcher waits for more requests after the first
+    LLM_MAX_BATCH = 8  # Most requests decoded together
+    LLM_BEST_OF = 1  # Sample this many replies in one pass and keep the best-scored (1 = stream a single reply)
+    LLM_BEST_OF_LOGPROB_WEIGHT = 0.0  # Weight of the model's mean token log-probability in that score
+    LLM_DRAFT_TOKENS = 5  # Tokens DRAFT_MODEL_PATH proposes per verification pass (adapted as generation runs)
+    # Latency SLO per context ("general" covers the rest; {} = plain max_length): a reply stops after `seconds`,
+    # or at the first sentence end once `min_tokens` are out, and gets tokens_per_prompt_token new tokens per
+    # utterance token, between min_tokens and max_tokens
+    LLM_SLO = {
+        "general": {"seconds": 3.0, "min_tokens": 16, "tokens_per_prompt_token": 6, "max_tokens": 64},
+        "nsfw": {"seconds": 4.0, "min_tokens": 20, "tokens_per_prompt_token": 6, "max_tokens": 80},
+    }
+
+    # Inference worker settings
+    INFERENCE_WORKERS = 1  # Processes that run generation outside the GUI process (0 = generate in-process)
+    INFERENCE_THREADS = None  # torch threads per worker (None = its pinned CPUs, or the cores split evenly)
+    INFERENCE_CPU_AFFINITY = None  # CPUs per worker, e.g. [[0, 1, 2, 3], [4, 5, 6, 7]]; "auto" splits them evenly (Linux)
+    INFERENCE_HEALTH_INTERVAL = 5.0  # Seconds between health-check pings
+    INFERENCE_HEALTH_TIMEOUT = 30.0  # A worker silent this long is restarted
+    INFERENCE_SESSIONS = 8  # Conversation contexts each worker keeps, one per session; the least recently used is dropped
+
+    # Conversation log settings
+    CONVERSATION_LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the live log segment past this size...
+    CONVERSATION_LOG_MAX_AGE = 7 * 24 * 3600  # ...or once its first turn is this many seconds old
+    CONVERSATION_LOG_COMPRESS = True  # Gzip rotated segments
+    CONVERSATION_LOG_FSYNC = False  # fsync after every turn (slower, survives power loss)
+
+    # Semantic recall settings
+    SEMANTIC_DIM = 1024  # Hashed TF-IDF buckets per embedding
+    SEMANTIC_RECALL_THRESHOLD = 0.8  # Cosine similarity needed to answer from memory instead of generating
 
     # Voice settings
     VOICE_RATE = 170
@@ -22,6 +77,27 @@ class Config:
     DEFAULT_WINDOW_HEIGHT = 600
     FULLSCREEN = False
 
+    # Search settings
+    SEARCH_TIMEOUT = 5.0  # Seconds each source gets to connect and send data
+    SEARCH_DEADLINE = 6.0  # Seconds the whole race across sources may take
+    SEARCH_CACHE_DIR = os.path.join(BASE_DIR, "search", "cache")  # Answers cached on disk (None = no cache)
+    SEARCH_CACHE_TTL = 24 * 3600  # Seconds a cached answer is served as is...
+    SEARCH_CACHE_STALE_TTL = 7 * 24 * 3600  # ...then this long more while it is refreshed in the background
+    SEARCH_CACHE_MAX_BYTES = 20 * 1024 * 1024  # Least recently used answers are evicted past this size
+    SEARCH_HEALTH_FILE = os.path.join(BASE_DIR, "search", "health.json")  # Per-source health, kept across restarts (None = not saved)
+    SEARCH_HEALTH_WINDOW = 50  # Recent requests per source the success rate is taken over
+    SEARCH_LATENCY_ALPHA = 0.2  # Weight of the newest request in each source's latency EWMA
+    SEARCH_BREAKER_FAILURES = 5  # Failures or timeouts in a row that open a source's circuit breaker...
+    SEARCH_BREAKER_MIN_SUCCESS = 0.05  # ...or a success rate below this over half a window or more
+    SEARCH_BREAKER_COOLDOWN = 60.0  # Seconds an open source is skipped before one probe; doubles each failed probe...
+    SEARCH_BREAKER_MAX_COOLDOWN = 3600.0  # ...up to this
+
+    # Offline Wikipedia settings
+    WIKI_INDEX_DIR = os.path.join(BASE_DIR, "search", "wikipedia_index")  # Built by `python -m search.build_wikipedia <dump>` (None = live Wikipedia only)
+    WIKI_BUILD_WORKERS = None  # Processes building the index (None = one per core)
+    WIKI_BM25_K1 = 1.2  # BM25 term frequency saturation
+    WIKI_BM25_B = 0.75  # BM25 document length normalisation
+
     # Browser settings
     HOMEPAGE = "https://search.brave.com/"
 
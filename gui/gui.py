@@ -1,17 +1,40 @@
 from PyQt5.QtWidgets import QMainWindow, QPushButton, QTextEdit, QVBoxLayout, QWidget, QLineEdit
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QTextCursor
 from boot.boot import BootScreen  
 
 from config import Config
 from assistant.assistant import CatiaAssistant
 from browser.browser import CatiaBrowser
+from gui.memory_manager import MemoryManagerWindow
 #from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QPushButton
 from PyQt5.QtWidgets import QMainWindow, QPushButton, QTextEdit, QVBoxLayout, QWidget, QLineEdit
 from PyQt5.QtWidgets import QHBoxLayout
 
 
 
+class ResponseWorker(QThread):
+    """Runs the assistant's streaming reply off the GUI thread and forwards each piece as it arrives."""
+
+    piece = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, assistant, user_input, parent=None):
+        super().__init__(parent)
+        self.assistant = assistant
+        self.user_input = user_input
+
+    def run(self):
+        try:
+            for piece in self.assistant.respond_stream(self.user_input):
+                self.piece.emit(piece)
+        except Exception as error:
+            self.failed.emit(str(error))
+
+
 class CatiaGUI(QMainWindow):
+    model_ready = pyqtSignal(object)  # ✅ Emitted from the loader thread, delivered on the GUI thread
+
     def __init__(self, assistant):  # ✅ Accept assistant as a parameter
         super().__init__()
         self.setWindowTitle(Config.APP_NAME)
@@ -20,6 +43,7 @@ class CatiaGUI(QMainWindow):
 
         # ✅ Fix: Store the passed assistant instance
         self.assistant = assistant  
+        self.worker = None  # ✅ The reply being streamed, if any
 
         # Chat Box
         self.chat_box = QTextEdit(self)
@@ -67,13 +91,49 @@ class CatiaGUI(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+        # ✅ Input works right away; memory and pre-defined responses answer until the model is warm
+        self.statusBar().showMessage("🧠 Warming up...")
+        self.model_ready.connect(self.on_model_ready)
+        self.assistant.llm.loading.add_done_callback(self.model_ready.emit)
+
+    def on_model_ready(self, loading):
+        if loading.exception() is not None:
+            self.statusBar().showMessage(f"❌ Model failed to load: {loading.exception()}")
+        else:
+            self.statusBar().showMessage("✅ Ready", 5000)
+
 
     def process_input(self):
         text = self.user_input.text()
-        if text.strip():
-            response = self.assistant.respond(text)
-            self.chat_box.append(f"You: {text}\nCatia: {response}\n")
+        if text.strip() and self.worker is None:
+            self.chat_box.append(f"You: {text}")
             self.user_input.clear()
+            self.stream_response(text)
+
+    def stream_response(self, text):
+        """Shows Catia's reply token by token while it is generated on a worker thread."""
+        self.chat_box.append("Catia: ")
+        self.user_input.setEnabled(False)
+        self.listen_button.setEnabled(False)
+
+        self.worker = ResponseWorker(self.assistant, text, self)
+        self.worker.piece.connect(self.append_piece)
+        self.worker.failed.connect(lambda error: self.append_piece(f"⚠ {error}"))
+        self.worker.finished.connect(self.finish_response)
+        self.worker.start()
+
+    def append_piece(self, piece):
+        self.chat_box.moveCursor(QTextCursor.End)
+        self.chat_box.insertPlainText(piece)
+        self.chat_box.ensureCursorVisible()
+
+    def finish_response(self):
+        self.chat_box.append("")
+        self.worker.deleteLater()
+        self.worker = None
+        self.user_input.setEnabled(True)
+        self.listen_button.setEnabled(True)
+        self.user_input.setFocus()
 
     def toggle_fullscreen(self):
         if self.fullscreen:
@@ -90,26 +150,10 @@ class CatiaGUI(QMainWindow):
         self.chat_box.append("Listening...")
         user_input = self.assistant.voice.listen()
         self.chat_box.append(f"You (via voice): {user_input}")
-        response = self.assistant.respond(user_input)
-        self.chat_box.append(f"Catia: {response}\n")
+        self.stream_response(user_input)
+
     def manage_memory(self):
-        memory_data = self.assistant.memory.load_memory()
-        
-        # Create a window to list all memory
-        self.memory_window = QWidget()
-        layout = QVBoxLayout()
-        
-        for key, value in memory_data.items():
-            btn = QPushButton(f"{key} → {value}")
-            btn.clicked.connect(lambda _, k=key: self.delete_memory(k))
-            layout.addWidget(btn)
-        
-        self.memory_window.setLayout(layout)
-        self.memory_window.setWindowTitle("Memory Manager")
+        # ✅ Lazily fetched, searchable table instead of one button per memory
+        self.memory_window = MemoryManagerWindow(self.assistant.memory)
         self.memory_window.show()
 
-    def delete_memory(self, key):
-        self.assistant.memory.delete_memory(key)
-        self.memory_window.close()
-        self.manage_memory()  # Refresh the memory window
-
@@ -0,0 +1,177 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QPushButton, QTableView, QVBoxLayout, QWidget
+)
+
+
+class MemoryTableModel(QAbstractTableModel):
+    """Lazily fetched (category, input, response) rows over CatiaMemory.
+
+    Rows are pulled from a generator in batches as the view scrolls, so
+    opening the window or changing the filter never walks the whole store.
+    """
+
+    HEADERS = ["Category", "Input", "Response"]
+    BATCH_SIZE = 500
+    PREVIEW_LENGTH = 200
+
+    def __init__(self, memory, parent=None):
+        super().__init__(parent)
+        self.memory = memory
+        self.rows = []
+        self.pending = iter(())
+        self.exhausted = True
+        self.set_filter("")
+
+    def _entries(self, needle):
+        memory = self.memory.load_memory()
+        for category in list(memory):
+            value = memory.get(category)
+            if isinstance(value, dict) and category.startswith("_"):
+                continue  # Bookkeeping such as access stats, not something Catia learned
+            if isinstance(value, dict):
+                for key in list(value):
+                    if key in value and (not needle or needle in category.lower() or needle in key.lower()
+                                         or needle in str(value[key]).lower()):
+                        yield category, key
+            elif not needle or needle in category.lower():
+                yield category, None
+
+    def set_filter(self, text):
+        """Restarts the row stream with a new case-insensitive filter."""
+        self.beginResetModel()
+        self.rows = []
+        self.pending = self._entries(text.strip().lower())
+        self.exhausted = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    # ------------------------------------------------------------------ Qt model API
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        batch = []
+        for entry in self.pending:
+            batch.append(entry)
+            if len(batch) >= self.BATCH_SIZE:
+                break
+        else:
+            self.exhausted = True
+        if batch:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(batch) - 1)
+            self.rows.extend(batch)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        category, key = self.rows[index.row()]
+        if index.column() == 0:
+            return category
+        if index.column() == 1:
+            return key or ""
+
+        memory = self.memory.load_memory()
+        value = memory.get(category, {}).get(key) if key is not None else memory.get(category)
+        text = str(value)
+        if role == Qt.DisplayRole and len(text) > self.PREVIEW_LENGTH:
+            text = text[:self.PREVIEW_LENGTH] + "…"
+        return text
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    # ------------------------------------------------------------------ editing
+
+    def remove_rows(self, rows):
+        """Deletes the given rows from memory and from the model without a reload."""
+        rows = sorted(set(rows))
+        for row in rows:
+            category, key = self.rows[row]
+            if key is None:
+                self.memory.delete_memory(category)
+            else:
+                self.memory.delete_entry(category, key)
+
+        # Remove contiguous runs from the bottom up so earlier row numbers stay valid
+        runs = []
+        for row in reversed(rows):
+            if runs and runs[-1][0] == row + 1:
+                runs[-1][0] = row
+            else:
+                runs.append([row, row])
+        for first, last in runs:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+
+
+class MemoryManagerWindow(QWidget):
+    """Searchable table of everything Catia remembers, with bulk delete."""
+
+    def __init__(self, memory, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Memory Manager")
+        self.resize(900, 600)
+
+        self.model = MemoryTableModel(memory, self)
+
+        self.search_box = QLineEdit(self)
+        self.search_box.setPlaceholderText("Filter memories...")
+        # ✅ Debounce typing so the filter restarts once per pause, not per keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(lambda: self.model.set_filter(self.search_box.text()))
+        self.search_box.textChanged.connect(self.filter_timer.start)
+
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 140)
+        self.table.setColumnWidth(1, 280)
+
+        self.delete_button = QPushButton("🗑️ Delete Selected", self)
+        self.delete_button.clicked.connect(self.delete_selected)
+        self.count_label = QLabel(self)
+        self.model.modelReset.connect(self.update_count)
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.rowsRemoved.connect(self.update_count)
+        self.update_count()
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.count_label)
+        buttons.addStretch()
+        buttons.addWidget(self.delete_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def update_count(self, *args):
+        suffix = "+" if self.model.canFetchMore(QModelIndex()) else ""
+        self.count_label.setText(f"{self.model.rowCount()}{suffix} entries")
+
+    def delete_selected(self):
+        rows = [index.row() for index in self.table.selectionModel().selectedRows()]
+        if rows:
+            self.model.remove_rows(rows)
@@ -0,0 +1,224 @@
+"""Inference backends for the fine-tuned GPT-2 model.
+
+"eager" is plain PyTorch in fp32, which is faster than fp16 on CPUs without
+native half-precision matmuls. "fp16" is the old GPU path (device_map="auto").
+"int8" is eager with every projection dynamically quantized to int8. "onnx"
+runs an exported ONNX Runtime graph with past key values. "auto" picks
+"fp16" when CUDA is available and "eager" otherwise.
+
+A LoRA adapter directory is merged into a plain safetensors checkpoint
+once (next to it, with a "_merged" suffix) and loaded from there. The fp32
+weights then point into a copy-on-write mmap of that file, so every process
+that loads it shares one copy in the OS page cache.
+
+torch, transformers and optimum are imported inside the loaders, so this
+module is cheap to import.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+
+BACKENDS = ("auto", "eager", "fp16", "int8", "onnx")
+WEIGHTS_FILE = "model.safetensors"
+SAFETENSORS_DTYPES = {"F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+                      "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool"}
+
+
+def resolve_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend != "auto":
+        return backend
+    import torch
+    return "fp16" if torch.cuda.is_available() else "eager"
+
+
+def load_model(model_path, backend="auto", onnx_dir=None):
+    """Loads the model for one backend and its tokenizer (blocking)."""
+    backend = resolve_backend(backend)
+    if backend == "onnx":
+        return load_onnx(model_path, onnx_dir or model_path.rstrip(os.sep) + "_onnx")
+
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    if is_adapter(model_path):
+        model_path = merged_checkpoint(model_path, model_path.rstrip(os.sep) + "_merged")
+    weights = os.path.join(model_path, WEIGHTS_FILE)
+    # ✅ Straight from safetensors into the model, without first allocating randomly initialised weights
+    options = {"config": gpt2_config(model_path), "low_cpu_mem_usage": True,
+               "use_safetensors": True if os.path.exists(weights) else None}
+
+    if backend == "fp16":
+        model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float16, device_map="auto",
+                                                     **options)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32, **options)
+        mmap_weights(model, weights)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+    if backend == "int8":
+        model = quantize_int8(model)  # The quantized projections get their own memory; embeddings stay mapped
+    model.eval()
+    return model, tokenizer
+
+
+def gpt2_config(model_path):
+    from transformers import GPT2Config
+
+    # ✅ Explicitly define model type as GPT-2 since the config file is missing it
+    config = GPT2Config.from_pretrained(model_path)
+    config.model_type = "gpt2"
+    return config
+
+
+def is_adapter(model_path):
+    return os.path.exists(os.path.join(model_path, "adapter_config.json"))
+
+
+def merged_checkpoint(model_path, merged_dir):
+    """A plain GPT-2 safetensors checkpoint of the adapter in model_path, (re)written when the adapter is newer."""
+    adapter = os.path.join(model_path, "adapter_model.safetensors")
+    merged = os.path.join(merged_dir, WEIGHTS_FILE)
+    if os.path.exists(merged) and (not os.path.exists(adapter) or os.path.getmtime(merged) >= os.path.getmtime(adapter)):
+        return merged_dir
+
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    print(f"📦 Merging the adapter in {model_path} into {merged_dir} (once per training run)...")
+    model = AutoModelForCausalLM.from_pretrained(model_path, config=gpt2_config(model_path), torch_dtype=torch.float32)
+    model = merge_adapters(model)
+    model._hf_peft_config_loaded = False  # Otherwise save_pretrained writes only the (now removed) adapter
+    model.save_pretrained(merged_dir, safe_serialization=True)
+    AutoTokenizer.from_pretrained(model_path).save_pretrained(merged_dir)
+    return merged_dir
+
+
+def mmap_weights(model, path):
+    """Points the model's weights at a copy-on-write mmap of the safetensors file they were loaded from.
+
+    Pages come from the OS page cache, so processes loading the same file
+    share them instead of each holding a private copy. Writing to a weight
+    copies just its pages. Tensors that do not match the file (another
+    dtype or shape) keep their own memory. Returns how many were mapped.
+    """
+    import torch
+
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as file:
+        header_size = struct.unpack("<Q", file.read(8))[0]
+        header = json.loads(file.read(header_size))
+        mapped_file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    tensors = model.state_dict(keep_vars=True)
+    mapped = 0
+    for name, info in header.items():
+        if name not in tensors:
+            continue  # Includes "__metadata__"
+        tensor = tensors[name]
+        dtype = getattr(torch, SAFETENSORS_DTYPES.get(info["dtype"], ""), None)
+        if dtype != tensor.dtype or list(tensor.shape) != info["shape"] or not tensor.numel():
+            continue
+        start, end = info["data_offsets"]
+        offset = 8 + header_size + start
+        if offset % tensor.element_size():
+            continue  # frombuffer needs aligned offsets
+        with torch.no_grad():
+            tensor.data = torch.frombuffer(mapped_file, dtype=dtype, count=(end - start) // tensor.element_size(),
+                                           offset=offset).view(info["shape"])
+        mapped += 1
+    return mapped
+
+
+def merge_adapters(model):
+    """Folds LoRA adapters into their base layers and removes the wrappers, leaving a plain GPT-2."""
+    for name, module in list(model.named_modules()):
+        if hasattr(module, "base_layer") and hasattr(module, "merge"):
+            module.merge()
+            parent_name, _, child = name.rpartition(".")
+            setattr(model.get_submodule(parent_name) if parent_name else model, child, module.get_base_layer())
+    return model
+
+
+def conv1d_to_linear(model):
+    """Replaces GPT-2's Conv1D projections with equivalent nn.Linear layers so quantize_dynamic can see them."""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, module in list(model.named_modules()):
+        if isinstance(module, Conv1D):
+            linear = torch.nn.Linear(module.weight.shape[0], module.nf)
+            with torch.no_grad():
+                linear.weight.copy_(module.weight.t())  # Conv1D stores (in, out), Linear (out, in)
+                linear.bias.copy_(module.bias)
+            parent_name, _, child = name.rpartition(".")
+            setattr(model.get_submodule(parent_name) if parent_name else model, child, linear)
+    return model
+
+
+def quantize_int8(model):
+    """Dynamically quantizes every projection to int8; the tied output head stays fp32 for accuracy."""
+    import torch
+    from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+
+    model = conv1d_to_linear(merge_adapters(model))
+    targets = {name: default_dynamic_qconfig for name, module in model.named_modules()
+               if isinstance(module, torch.nn.Linear) and name != "lm_head"}
+    return quantize_dynamic(model, targets, dtype=torch.qint8)
+
+
+def load_onnx(model_path, onnx_dir):
+    """Loads the ONNX Runtime graph from onnx_dir, exporting it from model_path on first use."""
+    from optimum.onnxruntime import ORTModelForCausalLM
+    from transformers import AutoTokenizer
+
+    if not os.path.exists(os.path.join(onnx_dir, "model.onnx")):
+        print(f"📦 Exporting {model_path} to ONNX in {onnx_dir} (one time)...")
+        # Adapters cannot be exported as-is, so the merged checkpoint is exported instead
+        if is_adapter(model_path):
+            model_path = merged_checkpoint(model_path, model_path.rstrip(os.sep) + "_merged")
+        exported = ORTModelForCausalLM.from_pretrained(model_path, export=True, use_cache=True)
+        exported.save_pretrained(onnx_dir)
+        AutoTokenizer.from_pretrained(model_path).save_pretrained(onnx_dir)
+
+    return ORTModelForCausalLM.from_pretrained(onnx_dir, use_cache=True), AutoTokenizer.from_pretrained(onnx_dir)
+
+
+def greedy_agreement(reference, candidate, tokenizer, prompts, max_new_tokens=32):
+    """Fraction of greedy tokens, per prompt, the candidate generates exactly as the reference does.
+
+    Counting stops at the first divergence, since after that the two continue from different prefixes.
+    """
+    scores = []
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        expected, produced = (
+            model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                           pad_token_id=tokenizer.eos_token_id)[0, inputs["input_ids"].shape[1]:].tolist()
+            for model in (reference, candidate)
+        )
+        matched = 0
+        for want, got in zip(expected, produced):
+            if want != got:
+                break
+            matched += 1
+        scores.append(matched / max(len(expected), 1))
+    return scores
+
+
+def tokens_per_second(model, tokenizer, prompts, max_new_tokens=64, runs=3, **settings):
+    """Greedy decoding throughput over the prompts, best of `runs` to dampen noise (settings go to generate)."""
+    best = 0.0
+    for _ in range(runs):
+        generated, start = 0, time.perf_counter()
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt")
+            output = model.generate(**inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens,
+                                    do_sample=False, pad_token_id=tokenizer.eos_token_id, **settings)
+            generated += output.shape[1] - inputs["input_ids"].shape[1]
+        best = max(best, generated / (time.perf_counter() - start))
+    return best
@@ -0,0 +1,116 @@
+import copy
+import json
+import threading
+
+
+def build_persona(spec_path, tokenizer, max_tokens):
+    """Turns Catia-specV2.json examples into a prompt prefix in the fine-tuning format, up to max_tokens."""
+    try:
+        with open(spec_path, "r", encoding="utf-8") as file:
+            examples = json.load(file)
+    except (OSError, ValueError):
+        print(f"⚠ ERROR: {spec_path} not found or corrupted, starting without a persona prefix")
+        return []
+
+    ids = []
+    for example in examples if isinstance(examples, list) else []:
+        if "input" not in example or "output" not in example:
+            continue
+        # ✅ Same "input output" layout the model was fine-tuned on, one exchange per EOS-terminated turn
+        turn = tokenizer(f"{example['input']} {example['output']}")["input_ids"] + [tokenizer.eos_token_id]
+        if len(ids) + len(turn) > max_tokens:
+            break
+        ids.extend(turn)
+    return ids
+
+
+class PersonaPrefix:
+    """The persona prompt's token ids and their key/value cache, computed once per model."""
+
+    def __init__(self, model, ids):
+        import torch
+        from transformers import DynamicCache
+
+        self.ids = ids
+        self.cache = DynamicCache()
+        if ids:
+            with torch.no_grad():
+                model(input_ids=torch.tensor([ids]), past_key_values=self.cache, use_cache=True)
+
+    def fork(self):
+        """A private copy of the cache for one conversation to extend."""
+        return list(self.ids), copy.deepcopy(self.cache)
+
+
+class ConversationContext:
+    """Keeps one conversation's tokens and key/value cache between turns.
+
+    Each turn passes the whole conversation to generate along with the cache,
+    so only the tokens that are not cached yet (the new utterance) are
+    prefilled. GPT-2 uses absolute positions, so old turns cannot just be
+    dropped from the front of the cache. When the next turn would not fit in
+    `max_tokens`, the cache is cropped back to the persona prefix and only
+    the most recent turns, up to `keep_tokens`, are re-encoded. That happens
+    once every few turns instead of on every turn.
+    """
+
+    def __init__(self, prefix, max_tokens, keep_tokens):
+        self.prefix = prefix
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.ids, self.cache = self.prefix.fork()
+        self.turn_starts = []  # offset in ids where each conversation turn begins
+
+    def _slide(self, needed):
+        """Drops the oldest turns so `needed` more tokens fit, keeping the persona prefix cached."""
+        persona = len(self.prefix.ids)
+        budget = min(self.keep_tokens, self.max_tokens - persona - needed)
+        kept = [start for start in self.turn_starts if len(self.ids) - start <= budget]
+        first = kept[0] if kept else len(self.ids)
+
+        self.ids = self.ids[:persona] + self.ids[first:]
+        self.turn_starts = [persona + start - first for start in kept]
+        self.cache.crop(persona)
+        print(f"🔄 Conversation context full, keeping the last {len(kept)} turns")
+
+    def prepare(self, prompt_ids, max_new_tokens):
+        """Adds the user's turn and returns the input_ids to hand generate together with self.cache."""
+        room = self.max_tokens - len(self.prefix.ids) - max_new_tokens
+        if room <= 0:
+            raise ValueError("The persona prefix and reply length leave no room for the conversation")
+        prompt_ids = prompt_ids[-room:]  # An over-long utterance keeps its end
+        needed = len(prompt_ids) + max_new_tokens
+        if len(self.ids) + needed > self.max_tokens:
+            self._slide(needed)
+
+        self.turn_starts.append(len(self.ids))
+        self.ids = self.ids + prompt_ids
+        return self.ids
+
+    def fan_out(self, copies):
+        """Repeats the cache `copies` times so that many candidate replies can extend it at once."""
+        if copies > 1:
+            self.cache.batch_repeat_interleave(copies)
+
+    def select(self, row, copies):
+        """Keeps only one candidate's row of a fanned-out cache."""
+        if copies > 1:
+            self.cache.batch_select_indices([row])
+
+    def commit(self, output_ids, eos_token_id):
+        """Records what generate produced so the next turn extends it instead of re-encoding it."""
+        self.ids = list(output_ids)
+        if not self.ids or self.ids[-1] != eos_token_id:
+            self.ids.append(eos_token_id)  # Closes the turn; prefilled along with the next utterance
+        # A reply that ended before its batch-mates leaves padding in the cache past its own tokens
+        self.cache.crop(len(self.ids) - 1)
+
+    def rollback(self):
+        """Forgets a turn whose generation failed, cropping the cache back to match."""
+        start = self.turn_starts.pop()
+        self.ids = self.ids[:start]
+        self.cache.crop(start)
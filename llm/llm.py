@@ -1,37 +1,44 @@
+import copy
 import os
-from transformers import AutoTokenizer, AutoModelForCausalLM, GPT2Config
-import torch
 import random
 import json
+import threading
+from config import Config
 from memory.memory import CatiaMemory
+from classifier.classifier import CONTEXTS
+from llm.context import ConversationContext, PersonaPrefix, build_persona
+from llm.registry import ModelRegistry
+from llm.scheduler import BatchScheduler
+from llm.scoring import ResponseScorer
+from llm.speculative import draft_compatible
 
 class CatiaLLM:
-    def __init__(self):
-        self.memory = CatiaMemory()
-        model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "trained_catia"))
+    def __init__(self, model_path=None, with_memory=True):
+        # ✅ An inference worker only generates, so it leaves the memory store to the process that owns it
+        self.memory = CatiaMemory.shared() if with_memory else None
 
-        # ✅ Explicitly define model type as GPT-2 since the config file is missing it
-        config = GPT2Config.from_pretrained(model_path)
-        config.model_type = "gpt2"
-
-        # ✅ Load the GPT-2 model with the correct config
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_path, config=config, torch_dtype=torch.float16, device_map="auto"
-        )
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # ✅ Start loading the model in the background; memory and pre-defined responses answer until it is ready
+        self.start_loading(model_path)
 
         # ✅ Load pre-defined responses
         responses_path = os.path.join(os.path.dirname(__file__), "../responses/responses.json")
-        with open(responses_path, "r", encoding="utf-8") as f:
-            self.responses = json.load(f)["data"]
+        try:
+            with open(responses_path, "r", encoding="utf-8") as f:
+                self.responses = json.load(f)["data"]
+        except (OSError, ValueError, KeyError):
+            print("⚠ ERROR: responses.json not found or corrupted!")
+            self.responses = {}
+
+        # ✅ Conversation so far, kept as a key/value cache between turns (built once the model is loaded)
+        self.context = None
+        self.personas = {}  # model id -> its persona prefix cache, shared with every fork()
+
+        # ✅ Ranks best-of-N candidates; any callable (text, user_input, logprob) -> float can replace it
+        self.scorer = ResponseScorer(logprob_weight=Config.LLM_BEST_OF_LOGPROB_WEIGHT)
 
-        # ✅ Context-specific keywords
-        self.nsfw_keywords = ["talk dirty", "moan", "kink", "naughty", "sexy", "seduce", 
-                              "whisper", "dominate", "flirt", "kiss", "tease", "bite", "touch"]
-        self.overwork_keywords = ["working late", "overtime", "too busy", "stressed", 
-                                  "can't talk", "deadline"]
-        self.relationship_keywords = ["girlfriend", "jealous", "love me", "miss me", 
-                                      "who do you belong to", "am I your favorite", "do you think about me"]
+        # ✅ How the last reply was produced: its source and, for generated ones, why generation stopped
+        self.last_metadata = {}
+        self.cancelled = threading.Event()  # Set by cancel(); checked by the stopping criteria between tokens
 
         # ✅ Pre-defined moods
         self.moods = {
@@ -49,6 +56,28 @@ class CatiaLLM:
                        "You love it when I push your buttons, don’t you? 😉"]
         }
 
+    def start_loading(self, model_path):
+        self.loading = ModelRegistry.load(model_path or Config.MODEL_PATH, Config.MODEL_BACKEND, Config.MODEL_ONNX_DIR)
+        # ✅ Optional draft model for speculative decoding; replies are generated without it until it is ready
+        self.draft_loading = ModelRegistry.load(Config.DRAFT_MODEL_PATH, "eager") if Config.DRAFT_MODEL_PATH else None
+
+    @property
+    def ready(self):
+        """True once the model has loaded; never blocks."""
+        return self.loading.done() and self.loading.exception() is None
+
+    def wait_until_ready(self, timeout=None):
+        """Blocks until the model has loaded, raising if loading failed."""
+        self.loading.result(timeout)
+
+    @property
+    def model(self):
+        return self.loading.result()[0]
+
+    @property
+    def tokenizer(self):
+        return self.loading.result()[1]
+
     def get_predefined_response(self, user_input):
         user_input = user_input.lower().strip()
         for category, responses in self.responses.items():
@@ -57,45 +86,364 @@ class CatiaLLM:
         return None
 
     def detect_context(self, user_input):
-        user_input = user_input.lower()
-        if any(keyword in user_input for keyword in self.nsfw_keywords):
-            return "nsfw"
-        if any(keyword in user_input for keyword in self.relationship_keywords):
-            return "relationship"
-        if any(keyword in user_input for keyword in self.overwork_keywords):
-            return "overwork"
-        return "general"
+        return CONTEXTS.classify(user_input)
 
     def think(self, user_input):
+        return "".join(self.think_stream(user_input))
+
+    def think_with_metadata(self, user_input):
+        """Like think(), also returning self.last_metadata for the reply (e.g. whether it was cut short)."""
+        response = self.think(user_input)
+        return response, self.last_metadata
+
+    def think_stream(self, user_input):
+        """Yields the reply in pieces as the model produces them; joined, they are what think() returns."""
         user_input = user_input.lower().strip()
-        learned_memory = self.memory.load_memory()
-        if user_input in learned_memory:
-            return learned_memory[user_input]
+        self.cancelled.clear()
+        # ✅ An exact or confidently paraphrased learned input skips generation entirely
+        recalled = self.memory.recall(user_input)
+        if recalled:
+            self.last_metadata = {"source": "memory", "cut_short": False}
+            yield recalled
+            return
+
+        # ✅ Until the model is warm, only the tiers that need no model answer (and nothing is learned)
+        if not self.ready:
+            self.last_metadata = {"source": "warmup", "cut_short": False}
+            yield self.get_predefined_response(user_input) or self.generate_warmup_response(user_input)
+            return
 
         context = self.detect_context(user_input)
+        self.last_metadata = {"source": "scripted", "context": context, "cut_short": False}  # Until the model runs
 
         if context == "nsfw":
-            response = self.generate_nsfw_response(user_input)
+            pieces = self.stream_nsfw_response(user_input)
         elif context == "relationship":
-            response = self.generate_relationship_response(user_input)
+            pieces = self.stream_relationship_response(user_input)
         elif context == "overwork":
-            response = self.generate_overwork_response(user_input)
+            pieces = iter([self.generate_overwork_response(user_input)])
         else:
-            response = self.generate_ai_response(user_input)
+            pieces = self.stream_ai_response(user_input)
 
-        if len(response.split()) < 5:
+        # ✅ Hold the first few words back so a too-short reply can still be swapped out
+        response, holding = "", True
+        for piece in pieces:
+            response += piece
+            if not holding:
+                yield piece
+            elif len(response.split()) >= 5:
+                holding = False
+                yield response
+
+        if holding:
             response = "Oh? I expected something a little more... exciting. Try again."
+            self.last_metadata = dict(self.last_metadata, source="fallback")
+            yield response
 
         self.memory.save_memory(user_input, response)
-        return response
 
-    def generate_ai_response(self, user_input):
-        mood_prefix = random.choice(["Oh? ", "Mmm... ", "You like trouble, don’t you? 😉 ", 
-                                     "Tsk. I could say something, but where’s the fun in that? "])
-        
-        inputs = self.tokenizer(user_input, return_tensors="pt", padding=True)
-        outputs = self.model.generate(
-            **inputs,
+    def cancel(self):
+        """Stops the reply being generated at its next token; what was generated so far is kept."""
+        self.cancelled.set()
+
+    def fork(self):
+        """A CatiaLLM for another conversation: the same model, responses and persona prefix, with its own
+        conversation context, cancel flag and last_metadata."""
+        other = copy.copy(self)
+        other.context = None
+        other.last_metadata = {}
+        other.cancelled = threading.Event()
+        return other
+
+    def generate_warmup_response(self, user_input):
+        if self.detect_context(user_input) == "overwork":
+            return self.generate_overwork_response(user_input)
+        return random.choice(["Mmm… give me a second, I’m still waking up. Ask me again in a moment?",
+                              "Hold on, Boss. My brain is still booting. Talk to me in a sec. 😉",
+                              "Patience… I’m not fully awake yet. Try me again shortly."])
+
+    def conversation_context(self):
+        """The running conversation's token cache, built on first use (None when disabled or unsupported)."""
+        import torch
+
+        if not Config.LLM_CONVERSATION_CONTEXT or not isinstance(self.model, torch.nn.Module):
+            return None  # The ONNX Runtime backend keeps no cache between calls
+        if self.context is None:
+            persona = self.personas.get(id(self.model))
+            if persona is None:
+                persona_ids = build_persona(Config.PERSONA_FILE, self.tokenizer, Config.LLM_PERSONA_TOKENS)
+                persona = self.personas.setdefault(id(self.model), PersonaPrefix(self.model, persona_ids))
+            self.context = ConversationContext(persona, Config.LLM_CONTEXT_TOKENS or self.model.config.n_positions,
+                                               Config.LLM_CONTEXT_KEEP_TOKENS)
+        return self.context
+
+    def batch_scheduler(self):
+        """The process-wide micro-batcher for this model (None when disabled or unsupported)."""
+        import torch
+
+        if not Config.LLM_BATCHING or not isinstance(self.model, torch.nn.Module):
+            return None
+        return BatchScheduler.shared(self.model, self.tokenizer, Config.LLM_BATCH_WINDOW, Config.LLM_MAX_BATCH)
+
+    def draft_model(self):
+        """The speculative-decoding draft model, once loaded and usable with the main model (None otherwise)."""
+        if self.draft_loading is None or not self.draft_loading.done() or self.draft_loading.exception() is not None:
+            return None
+        draft = self.draft_loading.result()[0]
+        if not draft_compatible(self.model, draft):
+            print("⚠ Draft model does not share the main model's vocabulary or backend, generating without it")
+            self.draft_loading = None
+            return None
+        draft.generation_config.num_assistant_tokens = Config.LLM_DRAFT_TOKENS
+        return draft
+
+    @staticmethod
+    def latency_slo(slo):
+        """The named entry of Config.LLM_SLO; contexts without one use "general" ({} = no SLO)."""
+        return Config.LLM_SLO.get(slo) or Config.LLM_SLO.get("general") or {}
+
+    @staticmethod
+    def reply_budget(settings, prompt_ids, budget):
+        """max_new_tokens for the reply: explicit, from the SLO, or from generate's max_length (which counted the utterance)."""
+        from llm.stopping import reply_budget
+
+        max_length = settings.pop("max_length", 80)
+        explicit = settings.pop("max_new_tokens", None)
+        if explicit:
+            return explicit
+        if budget:
+            return reply_budget(budget, len(prompt_ids))
+        return max(max_length - len(prompt_ids), 1)
+
+    def _stopper(self, prompt_length, budget):
+        """Stopping criterion enforcing the SLO's deadline and sentence stop, recording why generation ended."""
+        from llm.stopping import ReplyStopper
+
+        return ReplyStopper(self.tokenizer, prompt_length, budget.get("seconds"), budget.get("min_tokens"),
+                            self.cancelled)
+
+    def _record(self, slo, metadata):
+        self.last_metadata = {**self.last_metadata, **metadata, "source": "model", "slo": slo}
+        if metadata["cut_short"]:
+            print(f"⚠ Reply cut short ({metadata['stop_reason']}) after {metadata['new_tokens']} tokens, "
+                  f"{metadata['seconds']:.2f}s")
+
+    def reset_context(self):
+        """Starts a fresh conversation; the persona prefix stays cached."""
+        if self.context is not None:
+            self.context.reset()
+
+    def stream_generate(self, user_input, slo="general", **settings):
+        """Generates a reply to user_input, yielding decoded text as tokens arrive.
+
+        `slo` names the Config.LLM_SLO entry that bounds the reply: its length
+        scales with the utterance, and generation stops at the deadline or at
+        the first sentence end past the minimum length. self.last_metadata says
+        which happened.
+
+        With a conversation context, the earlier turns are already in the key/value
+        cache, so only the new utterance is prefilled and only the reply is streamed.
+        The request joins the micro-batcher either way, so concurrent callers share
+        each forward pass; a conversation's cache goes along with it and comes back
+        extended by the reply. With a draft model (Config.DRAFT_MODEL_PATH), it
+        proposes a few tokens at a time that the model verifies in one pass;
+        generate does this for a single sequence only, so the micro-batcher is
+        skipped then. With Config.LLM_BEST_OF > 1 the best of that many
+        candidates is yielded whole (without the draft model).
+        """
+        if Config.LLM_BEST_OF > 1:
+            yield self.generate_best_of(user_input, Config.LLM_BEST_OF, slo, **settings)
+            return
+
+        budget = self.latency_slo(slo)
+        draft = self.draft_model()
+        context = self.conversation_context()
+        prompt_ids = self.tokenizer(user_input)["input_ids"]
+        max_new_tokens = self.reply_budget(settings, prompt_ids, budget)
+        scheduler = self.batch_scheduler() if draft is None else None
+        if context is None:
+            if scheduler is None:
+                inputs = self.tokenizer(user_input, return_tensors="pt", padding=True)
+                stopper = self._stopper(len(prompt_ids), budget)
+                output = []
+                yield from self._stream(inputs, dict(settings, max_new_tokens=max_new_tokens), skip_prompt=False,
+                                        output=output, stopper=stopper, draft=draft)
+                self._record(slo, stopper.metadata(len(output[0]) - len(prompt_ids)))
+            else:
+                request = scheduler.submit(prompt_ids, max_new_tokens=max_new_tokens, seconds=budget.get("seconds"),
+                                           min_tokens=budget.get("min_tokens"), **settings)
+                for piece in request.stream():
+                    if self.cancelled.is_set():
+                        request.cancel()
+                    yield piece
+                self._record(slo, request.metadata())
+            return
+
+        import torch
+
+        with context.lock:
+            ids = context.prepare(prompt_ids, max_new_tokens)
+            if scheduler is not None:
+                request = scheduler.submit(ids, past=context.cache, max_new_tokens=max_new_tokens,
+                                           seconds=budget.get("seconds"), min_tokens=budget.get("min_tokens"),
+                                           **settings)
+                try:
+                    for piece in request.stream():
+                        if self.cancelled.is_set():
+                            request.cancel()
+                        yield piece
+                except BaseException:
+                    context.rollback()
+                    raise
+                context.cache = request.cache  # The conversation's cache, extended by this turn
+                context.commit(ids + request.generated, self.tokenizer.eos_token_id)
+                self._record(slo, request.metadata())
+                return
+
+            inputs = {"input_ids": torch.tensor([ids]), "attention_mask": torch.ones(1, len(ids), dtype=torch.long),
+                      "past_key_values": context.cache}
+            stopper = self._stopper(len(ids), budget)
+            output = []
+            try:
+                yield from self._stream(inputs, dict(settings, max_new_tokens=max_new_tokens), skip_prompt=True,
+                                        output=output, stopper=stopper, draft=draft)
+            except BaseException:
+                context.rollback()
+                raise
+            context.commit(output[0], self.tokenizer.eos_token_id)
+            self._record(slo, stopper.metadata(len(output[0]) - len(ids)))
+
+    def generate_best_of(self, user_input, n, slo="general", **settings):
+        """Samples n candidate replies in one batched pass and returns the one self.scorer ranks highest.
+
+        With the micro-batcher the n candidates go in as one group, decoded
+        side by side in the same batch (and alongside other callers); without
+        it, one generate call returns all n (num_return_sequences).
+        """
+        import torch
+
+        budget = self.latency_slo(slo)
+        prompt_ids = self.tokenizer(user_input)["input_ids"]
+        max_new_tokens = self.reply_budget(settings, prompt_ids, budget)
+        context = self.conversation_context()
+        scheduler = self.batch_scheduler()
+
+        if context is None:
+            if scheduler is not None:
+                return self._best_of_group(scheduler, prompt_ids, n, max_new_tokens, budget, settings, user_input,
+                                           slo)[0]
+            stopper = self._stopper(len(prompt_ids), budget)
+            sequences, candidates = self._sample({"input_ids": torch.tensor([prompt_ids])}, n, max_new_tokens,
+                                                 settings, stopper)
+            best = self._rank(candidates, user_input)
+            self._record(slo, stopper.metadata(len(sequences[best]) - len(prompt_ids), best))
+            return candidates[best][0]
+
+        with context.lock:
+            ids = context.prepare(prompt_ids, max_new_tokens)
+            if scheduler is not None:
+                try:
+                    reply, request = self._best_of_group(scheduler, ids, n, max_new_tokens, budget, settings,
+                                                         user_input, slo, context.cache)
+                except BaseException:
+                    context.rollback()
+                    raise
+                context.cache = request.cache  # The winner's row; the other candidates' caches are dropped
+                context.commit(ids + request.generated, self.tokenizer.eos_token_id)
+                return reply
+
+            # ✅ Every candidate extends the same cached conversation; only the winner's row is kept
+            context.fan_out(n)
+            stopper = self._stopper(len(ids), budget)
+            try:
+                inputs = {"input_ids": torch.tensor([ids]), "attention_mask": torch.ones(1, len(ids), dtype=torch.long),
+                          "past_key_values": context.cache}
+                sequences, candidates = self._sample(inputs, n, max_new_tokens, settings, stopper)
+            except BaseException:
+                context.select(0, n)
+                context.rollback()
+                raise
+            best = self._rank(candidates, user_input)
+            context.select(best, n)
+            context.commit(sequences[best], self.tokenizer.eos_token_id)
+            self._record(slo, stopper.metadata(len(sequences[best]) - len(ids), best))
+            return candidates[best][0]
+
+    def _best_of_group(self, scheduler, prompt_ids, n, max_new_tokens, budget, settings, user_input, slo, past=None):
+        """The best of n candidates decoded as one scheduler group; returns (reply, its request)."""
+        requests = scheduler.submit_group(prompt_ids, n, max_new_tokens=max_new_tokens, seconds=budget.get("seconds"),
+                                          min_tokens=budget.get("min_tokens"), past=past, **settings)
+        candidates = [(request.future.result(), request.mean_logprob()) for request in requests]
+        best = self._rank(candidates, user_input)
+        self._record(slo, requests[best].metadata())
+        return candidates[best][0], requests[best]
+
+    def _sample(self, inputs, n, max_new_tokens, settings, stopper):
+        """One generate call with num_return_sequences=n; returns the full sequences and (reply, mean logprob) pairs."""
+        from transformers import StoppingCriteriaList
+
+        output = self.model.generate(**inputs, num_return_sequences=n, max_new_tokens=max_new_tokens,
+                                     output_scores=True, return_dict_in_generate=True,
+                                     pad_token_id=self.tokenizer.eos_token_id,
+                                     stopping_criteria=StoppingCriteriaList([stopper]), **settings)
+        logprobs = self.model.compute_transition_scores(output.sequences, output.scores, normalize_logits=True)
+        prompt_length = inputs["input_ids"].shape[1]
+
+        sequences, candidates = [], []
+        for sequence, token_logprobs in zip(output.sequences.tolist(), logprobs.tolist()):
+            reply = sequence[prompt_length:]
+            # Rows that finished early are padded with EOS; count up to and including the first one
+            length = reply.index(self.tokenizer.eos_token_id) + 1 if self.tokenizer.eos_token_id in reply else len(reply)
+            mean = sum(token_logprobs[:length]) / length if length else None
+            sequences.append(sequence[:prompt_length + length])
+            candidates.append((self.tokenizer.decode(reply[:length], skip_special_tokens=True).strip(), mean))
+        return sequences, candidates
+
+    def _rank(self, candidates, user_input):
+        scores = [self.scorer(text, user_input, logprob) for text, logprob in candidates]
+        return max(range(len(candidates)), key=scores.__getitem__)
+
+    def _stream(self, inputs, settings, skip_prompt, output=None, stopper=None, draft=None):
+        """Runs model.generate on a worker thread and yields decoded text as tokens arrive."""
+        from transformers import StoppingCriteriaList, TextIteratorStreamer  # Already imported by the model loader
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=skip_prompt, skip_special_tokens=True)
+        if stopper is not None:
+            settings = dict(settings, stopping_criteria=StoppingCriteriaList([stopper]))
+        if draft is not None:
+            settings = dict(settings, assistant_model=draft)
+        errors = []
+
+        def generate():
+            try:
+                result = self.model.generate(**inputs, streamer=streamer, **settings)
+                if output is not None:
+                    output.append(result[0].tolist())
+            except Exception as error:
+                errors.append(error)
+                streamer.end()  # Unblock the reader below
+
+        thread = threading.Thread(target=generate, name="catia-generate", daemon=True)
+        thread.start()
+
+        try:
+            started = False
+            for text in streamer:
+                if not started:
+                    text = text.lstrip()
+                    started = bool(text)
+                if text:
+                    yield text
+        finally:
+            thread.join()  # The cache must not be touched again while generate may still write to it
+        if errors:
+            raise errors[0]
+
+    def stream_ai_response(self, user_input):
+        yield random.choice(["Oh? ", "Mmm... ", "You like trouble, don’t you? 😉 ", 
+                             "Tsk. I could say something, but where’s the fun in that? "])
+        yield from self.stream_generate(
+            user_input,
             max_length=80,
             no_repeat_ngram_size=2,
             temperature=1.2,
@@ -105,15 +453,14 @@ class CatiaLLM:
             do_sample=True
         )
 
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
-        return mood_prefix + response
+    def generate_ai_response(self, user_input):
+        return "".join(self.stream_ai_response(user_input))
 
-    def generate_nsfw_response(self, user_input):
-        mood_prefix = random.choice(self.moods["flirty"] + self.moods["submissive"])
-        
-        inputs = self.tokenizer(user_input, return_tensors="pt", padding=True)
-        outputs = self.model.generate(
-            **inputs,
+    def stream_nsfw_response(self, user_input):
+        yield random.choice(self.moods["flirty"] + self.moods["submissive"])
+        yield from self.stream_generate(
+            user_input,
+            slo="nsfw",
             max_length=100,
             temperature=1.4,
             top_k=60,
@@ -122,25 +469,31 @@ class CatiaLLM:
             do_sample=True
         )
 
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
-        return mood_prefix + response
+    def generate_nsfw_response(self, user_input):
+        return "".join(self.stream_nsfw_response(user_input))
 
-    def generate_relationship_response(self, user_input):
+    def stream_relationship_response(self, user_input):
         mood_prefix = random.choice(self.moods["jealous"] + self.moods["flirty"] + self.moods["sassy"])
         
         if "love" in user_input:
-            return f"{mood_prefix}Of course I love you, idiot. What kind of girlfriend would I be if I didn’t? But don’t let it get to your head. 😏"
+            yield f"{mood_prefix}Of course I love you, idiot. What kind of girlfriend would I be if I didn’t? But don’t let it get to your head. 😏"
         elif "miss" in user_input:
-            return f"{mood_prefix}I was *so* close to finding someone else to tease. But fine… I missed you too."
+            yield f"{mood_prefix}I was *so* close to finding someone else to tease. But fine… I missed you too."
         elif "who do you belong to" in user_input:
-            return f"{mood_prefix}You, obviously. But don’t think I won’t make you work for it."
+            yield f"{mood_prefix}You, obviously. But don’t think I won’t make you work for it."
+        else:
+            yield from self.stream_ai_response(user_input)
 
-        return self.generate_ai_response(user_input)
+    def generate_relationship_response(self, user_input):
+        return "".join(self.stream_relationship_response(user_input))
 
     def generate_overwork_response(self, user_input):
         mood_prefix = random.choice(["Oh, *hell* no. ", "Are you serious? ", "You’re doing this *again*? "])
         return f"{mood_prefix}Nope. Put the work *down*. If you don’t take a break and pay attention to me, I’m *stealing* your laptop."
 
-catia = CatiaLLM()
-response = catia.think("do you love me?")
-print("Catia:", response)
+if __name__ == "__main__":
+    catia = CatiaLLM()
+    catia.wait_until_ready()
+    response = catia.think("do you love me?")
+    print("Catia:", response)
+
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from llm.backends import load_model
+
+
+class ModelRegistry:
+    """Loads each model once per process, on a background thread.
+
+    `load` returns at once with a Future of (model, tokenizer). The first call
+    for a path and backend starts the load and later calls share it, so every
+    CatiaLLM and script in the process uses the same weights (and, through
+    load_model's mmap, every process loading the same file shares its pages).
+    A failed load is retried on the next call.
+    """
+
+    _loads = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls, model_path, backend="auto", onnx_dir=None):
+        if os.path.exists(model_path):
+            model_path = os.path.abspath(model_path)  # Anything else is a Hugging Face Hub name, e.g. "distilgpt2"
+        with cls._lock:
+            future = cls._loads.get((model_path, backend))
+            if future is None or (future.done() and future.exception() is not None):
+                future = cls._loads[(model_path, backend)] = Future()
+                thread = threading.Thread(target=cls._load, args=(model_path, backend, onnx_dir, future),
+                                          name="catia-model-loader", daemon=True)
+                thread.start()
+            return future
+
+    @classmethod
+    def get(cls, model_path, backend="auto", onnx_dir=None):
+        """The shared (model, tokenizer) for a path and backend, waiting for it to load."""
+        return cls.load(model_path, backend, onnx_dir).result()
+
+    @staticmethod
+    def _load(model_path, backend, onnx_dir, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        print(f"🧠 Loading model from {model_path} ({backend} backend)...")
+        start = time.perf_counter()
+        try:
+            future.set_result(load_model(model_path, backend, onnx_dir))
+        except Exception as error:
+            print(f"❌ Could not load model: {error}")
+            future.set_exception(error)
+        else:
+            print(f"✅ Model ready in {time.perf_counter() - start:.1f}s")
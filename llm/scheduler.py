@@ -0,0 +1,312 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from llm.scoring import ends_sentence
+
+
+def cache_layers(cache):
+    """(keys, values) of every layer of a DynamicCache, across transformers versions."""
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers if layer.keys is not None]
+    return list(zip(cache.key_cache, cache.value_cache))
+
+
+def cache_from(layers):
+    """A DynamicCache holding the given (keys, values) per layer."""
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for layer, (keys, values) in enumerate(layers):
+        cache.update(keys, values, layer)
+    return cache
+
+
+class GenerationRequest:
+    """One caller's prompt in the batch, with its own sampling settings.
+
+    `future` resolves to the full reply; `stream()` yields it in pieces as
+    tokens are decoded. Either can be used, or both. `seconds` and
+    `min_tokens` work like llm.stopping.ReplyStopper: the request stops at its
+    deadline (counted from submission, so time spent queued counts too), or
+    at the first sentence end once min_tokens tokens are out.
+
+    `past` is a key/value cache (a conversation's) holding the start of
+    prompt_ids; only the rest is prefilled. The request never changes it.
+    Once finished, `cache` holds this row's own cache of the prompt and
+    reply, for the conversation to carry on from.
+    """
+
+    def __init__(self, prompt_ids, max_new_tokens=60, do_sample=True, temperature=1.0, top_k=0, top_p=1.0,
+                 repetition_penalty=1.0, no_repeat_ngram_size=0, eos_token_id=None, seconds=None, min_tokens=None,
+                 past=None):
+        self.prompt_ids = list(prompt_ids)
+        self.past = past
+        self.cache = None
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.no_repeat_ngram_size = no_repeat_ngram_size
+        self.eos_token_id = eos_token_id
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.min_tokens = min_tokens
+        self.reason = None  # Why it stopped, once it has
+        self.ended = None
+
+        self.generated = []
+        self.text = ""
+        self.logprob = 0.0  # Sum of the model's log-probabilities of the generated tokens
+        self.future = Future()
+        self.pieces = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Stops generating for this request at the next step; the reply so far is kept."""
+        self.cancelled.set()
+
+    def stream(self):
+        try:
+            while True:
+                piece = self.pieces.get()
+                if piece is None:
+                    break
+                yield piece
+        finally:
+            self.cancel()  # An abandoned stream frees its batch slot
+        self.future.result()  # Re-raises a generation error
+
+    def finished(self):
+        if self.reason is None:
+            if self.cancelled.is_set():
+                self.reason = "cancelled"
+            elif self.generated and self.generated[-1] == self.eos_token_id:
+                self.reason = "eos"
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.reason = "deadline"
+            elif self.min_tokens is not None and len(self.generated) >= self.min_tokens and ends_sentence(self.text):
+                self.reason = "sentence"
+            elif len(self.generated) >= self.max_new_tokens:
+                self.reason = "length"
+            if self.reason is not None:
+                self.ended = time.monotonic()
+        return self.reason is not None
+
+    def metadata(self):
+        """Same fields as llm.stopping.ReplyStopper.metadata, for the finished request."""
+        return {"stop_reason": self.reason, "cut_short": self.reason in ("deadline", "length", "cancelled"),
+                "new_tokens": len(self.generated), "seconds": self.ended - self.started}
+
+    def mean_logprob(self):
+        return self.logprob / len(self.generated) if self.generated else None
+
+    def banned_tokens(self):
+        """Tokens that would repeat an n-gram already in prompt + reply (no_repeat_ngram_size)."""
+        n = self.no_repeat_ngram_size
+        history = self.prompt_ids + self.generated
+        if n <= 0 or len(history) < n:
+            return []
+        prefix = tuple(history[-(n - 1):]) if n > 1 else ()
+        return [history[i + n - 1] for i in range(len(history) - n + 1) if tuple(history[i:i + n - 1]) == prefix]
+
+    def choose(self, logits):
+        """Picks the next token from this request's row of logits, applying its own settings."""
+        import torch
+
+        logits = logits.float()
+        token = self._pick(logits.clone())
+        self.logprob += float(torch.log_softmax(logits, dim=-1)[token])
+        return token
+
+    def _pick(self, logits):
+        import torch
+
+        if self.repetition_penalty != 1.0:
+            seen = torch.tensor(sorted(set(self.prompt_ids + self.generated)), dtype=torch.long)
+            scores = logits[seen]
+            logits[seen] = torch.where(scores < 0, scores * self.repetition_penalty, scores / self.repetition_penalty)
+        banned = self.banned_tokens()
+        if banned:
+            logits[banned] = -float("inf")
+
+        if not self.do_sample:
+            return int(logits.argmax())
+
+        logits = logits / max(self.temperature, 1e-5)
+        if self.top_k > 0:
+            threshold = torch.topk(logits, min(self.top_k, logits.numel())).values[-1]
+            logits[logits < threshold] = -float("inf")
+        if self.top_p < 1.0:
+            ordered, order = torch.sort(logits, descending=True)
+            cumulative = torch.softmax(ordered, dim=-1).cumsum(dim=-1)
+            drop = cumulative > self.top_p
+            drop[1:] = drop[:-1].clone()  # Keep the token that crosses top_p
+            drop[0] = False
+            logits[order[drop]] = -float("inf")
+        return int(torch.multinomial(torch.softmax(logits, dim=-1), 1))
+
+
+class BatchScheduler:
+    """Runs concurrent generation requests together in one batched decode loop.
+
+    A scheduler thread waits for a request, then gathers whatever else
+    arrives within `window` seconds (up to `max_batch`). The prompts are
+    left-padded into one batch and decoded step by step with a shared
+    key/value cache. Each row is sampled with its own settings and stops on
+    its own, so one batched forward pass per step serves every caller. A
+    lone request only waits out the window before it starts.
+
+    Requests carrying a conversation's cache batch too: the caches are
+    left-padded to one width and only each row's uncached tokens are
+    prefilled, with the padding masked out and positions counted per row.
+    A group (best-of-N candidates) is never split across batches.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model, tokenizer, window=0.005, max_batch=8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.window = window
+        self.max_batch = max_batch
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.requests = queue.Queue()  # Groups of requests that go in the same batch
+        self.held = None  # A group that did not fit in the last batch; it starts the next one
+        self.thread = threading.Thread(target=self._loop, name="catia-batcher", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def shared(cls, model, tokenizer, window=0.005, max_batch=8):
+        """Returns the one scheduler for this model, so every caller in the process batches together."""
+        with cls._shared_lock:
+            if id(model) not in cls._shared:
+                cls._shared[id(model)] = cls(model, tokenizer, window, max_batch)
+            return cls._shared[id(model)]
+
+    def submit(self, prompt_ids, **settings):
+        return self.submit_group(prompt_ids, 1, **settings)[0]
+
+    def submit_group(self, prompt_ids, copies, **settings):
+        """`copies` requests for the same prompt, decoded side by side in one batch."""
+        group = [GenerationRequest(prompt_ids, eos_token_id=self.tokenizer.eos_token_id, **settings)
+                 for _ in range(copies)]
+        self.requests.put(group)
+        return group
+
+    def _loop(self):
+        while True:
+            batch, self.held = list(self.held or self.requests.get()), None
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    group = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if len(batch) + len(group) > self.max_batch:
+                    self.held = group
+                    break
+                batch.extend(group)
+
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._decode(batch)
+            except Exception as error:
+                print(f"❌ Batched generation failed: {error}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(error)
+                        request.pieces.put(None)
+
+    def _decode(self, batch):
+        import torch
+        from transformers import DynamicCache
+
+        # Tokens of each prompt already in its past; at least the last one is prefilled to get logits
+        cached = [min(request.past.get_seq_length(), len(request.prompt_ids) - 1) if request.past is not None else 0
+                  for request in batch]
+        new = [request.prompt_ids[length:] for request, length in zip(batch, cached)]
+        past_width, width = max(cached), max(len(ids) for ids in new)
+        input_ids = torch.tensor([[self.pad_token_id] * (width - len(ids)) + ids for ids in new])
+        # Each row: padding, its past, padding, its new tokens; the padding is masked out
+        attention_mask = torch.tensor([[0] * (past_width - length) + [1] * length + [0] * (width - len(ids))
+                                       + [1] * len(ids) for length, ids in zip(cached, new)])
+        # GPT-2 needs explicit positions so padding does not shift the real tokens
+        position_ids = torch.tensor([[0] * (width - len(ids)) + list(range(length, length + len(ids)))
+                                     for length, ids in zip(cached, new)])
+        cache = self._merge(batch, cached, past_width) if past_width else DynamicCache()
+        active = list(range(len(batch)))
+
+        with torch.no_grad():
+            logits = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids,
+                                past_key_values=cache, use_cache=True).logits[:, -1]
+
+            while active:
+                next_tokens = [self.pad_token_id] * len(batch)
+                for row in active:
+                    request = batch[row]
+                    token = request.choose(logits[row])
+                    request.generated.append(token)
+                    next_tokens[row] = token
+                    self._emit(request)
+
+                for row in [row for row in active if batch[row].finished()]:
+                    active.remove(row)
+                    if batch[row].past is not None:
+                        batch[row].cache = self._split(cache, row, attention_mask[row])
+                    self._finish(batch[row])
+                if not active:
+                    break
+
+                # Finished rows keep riding along until the batch empties; their outputs are ignored
+                attention_mask = torch.cat([attention_mask, torch.ones(len(batch), 1, dtype=attention_mask.dtype)], 1)
+                position_ids = attention_mask.sum(-1, keepdim=True) - 1
+                logits = self.model(input_ids=torch.tensor(next_tokens)[:, None], attention_mask=attention_mask,
+                                    position_ids=position_ids, past_key_values=cache, use_cache=True).logits[:, -1]
+
+    @staticmethod
+    def _merge(batch, cached, past_width):
+        """One cache holding every row's past, left-padded to past_width (rows without one are all padding)."""
+        pasts = [cache_layers(request.past) if length else None for request, length in zip(batch, cached)]
+        template = next(past for past in pasts if past is not None)
+        layers = []
+        for layer, (key, value) in enumerate(template):
+            keys = key.new_zeros((len(batch), key.shape[1], past_width, key.shape[3]))
+            values = value.new_zeros((len(batch), value.shape[1], past_width, value.shape[3]))
+            for row, (past, length) in enumerate(zip(pasts, cached)):
+                if past is not None:
+                    keys[row, :, past_width - length:] = past[layer][0][0, :, :length]
+                    values[row, :, past_width - length:] = past[layer][1][0, :, :length]
+            layers.append((keys, values))
+        return cache_from(layers)
+
+    @staticmethod
+    def _split(cache, row, mask):
+        """One row's cache with the padding taken out: its past, prompt and the reply tokens fed so far."""
+        keep = mask.nonzero().squeeze(-1)
+        return cache_from([(key[row:row + 1, :, keep], value[row:row + 1, :, keep])
+                           for key, value in cache_layers(cache)])
+
+    def _emit(self, request):
+        text = self.tokenizer.decode(request.generated, skip_special_tokens=True).lstrip()
+        if text.endswith("�"):
+            return  # Half of a multi-byte character; wait for the rest
+        if len(text) > len(request.text):
+            request.pieces.put(text[len(request.text):])
+            request.text = text
+
+    def _finish(self, request):
+        text = self.tokenizer.decode(request.generated, skip_special_tokens=True).lstrip()
+        if len(text) > len(request.text):
+            request.pieces.put(text[len(request.text):])
+        request.text = text
+        request.future.set_result(text)
+        request.pieces.put(None)
@@ -0,0 +1,63 @@
+import math
+import re
+
+# Heuristics from trainer/g.py, compiled once
+GIBBERISH_PATTERNS = re.compile("|".join([
+    r"\d{4,}",  # Random long numbers
+    r"[^\w\s]{3,}",  # Too many special characters
+    r"[A-Za-z]+\d+[A-Za-z]+",  # Mixed letters and numbers
+    r"\b(\w+)(?:\s+\1\b){2,}",  # The same word over and over
+    r"Talk dirty to me.*Talk dirty to me",  # Duplicated inputs
+    r"Ugh, do I have to\?",  # Low-effort responses
+    r"You will listen and obey",  # Broken AI-generated responses
+    r"tumblr",  # Irrelevant Tumblr references
+    r"Yuzu You'll get the idea",  # Meaningless text
+    r"Posted : \d+/\d+",  # Dates from AI generations
+]), re.IGNORECASE)
+
+
+def is_gibberish(text):
+    """Checks if text is likely gibberish or repetitive nonsense."""
+    if not text or len(text.split()) < 3:
+        return True
+    return GIBBERISH_PATTERNS.search(text) is not None
+
+
+def ends_sentence(text):
+    """True if text closes a sentence (ignoring trailing quotes, brackets and spaces)."""
+    return text.rstrip().rstrip("\"')]*”’").endswith((".", "!", "?", "…"))
+
+
+def repetition(text, n=3):
+    """Share of the text's word n-grams that are repeats (0 = none repeated)."""
+    words = text.lower().split()
+    grams = [tuple(words[i:i + n]) for i in range(len(words) - n + 1)]
+    return 1 - len(set(grams)) / len(grams) if grams else 0.0
+
+
+class ResponseScorer:
+    """Scores a candidate reply; best-of-N keeps the highest.
+
+    Any callable taking (text, user_input, logprob) and returning a float can
+    stand in for it. `logprob` is the mean per-token log-probability of the
+    reply under the model, or None if it was not recorded.
+    """
+
+    def __init__(self, min_words=5, ideal_words=25, repetition_weight=2.0, logprob_weight=0.0):
+        self.min_words = min_words
+        self.ideal_words = ideal_words
+        self.repetition_weight = repetition_weight
+        self.logprob_weight = logprob_weight
+
+    def __call__(self, text, user_input, logprob=None):
+        words = len(text.split())
+        if words < self.min_words or is_gibberish(text):
+            return -math.inf
+        if text.strip().lower() == user_input.strip().lower():
+            return -math.inf  # Just echoed the user
+
+        score = min(words, self.ideal_words) / self.ideal_words
+        score -= self.repetition_weight * repetition(text)
+        if logprob is not None and self.logprob_weight:
+            score += self.logprob_weight * logprob
+        return score
@@ -0,0 +1,39 @@
+def draft_compatible(model, draft):
+    """A draft model can only propose tokens the main model reads: both PyTorch, same vocabulary."""
+    import torch
+
+    if not isinstance(model, torch.nn.Module) or not isinstance(draft, torch.nn.Module):
+        return False  # generate(assistant_model=...) needs both models in PyTorch
+    return model.config.vocab_size == draft.config.vocab_size
+
+
+def acceptance_rate(model, draft, tokenizer, prompts, draft_tokens=5, max_new_tokens=64):
+    """Share of the draft's proposed tokens the main model accepts under greedy speculative decoding.
+
+    Replays the propose/verify loop directly, since generate does not report
+    it. The draft greedily proposes `draft_tokens` tokens, one forward pass
+    of the main model scores all of them, and the proposal is kept up to its
+    first disagreement with the main model's own greedy choice, plus that
+    choice.
+    """
+    import torch
+
+    proposed = accepted = 0
+    with torch.no_grad():
+        for prompt in prompts:
+            ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+            target = ids.shape[1] + max_new_tokens
+            while ids.shape[1] < target:
+                count = min(draft_tokens, target - ids.shape[1])
+                proposal = draft.generate(ids, attention_mask=torch.ones_like(ids), max_new_tokens=count,
+                                          min_new_tokens=count, do_sample=False,
+                                          pad_token_id=tokenizer.eos_token_id)[:, ids.shape[1]:]
+                choices = model(torch.cat([ids, proposal], 1)).logits[0, ids.shape[1] - 1:].argmax(-1)
+
+                matched = 0
+                while matched < proposal.shape[1] and proposal[0, matched] == choices[matched]:
+                    matched += 1
+                proposed += proposal.shape[1]
+                accepted += matched
+                ids = torch.cat([ids, proposal[:, :matched], choices[None, matched:matched + 1]], 1)
+    return accepted / proposed if proposed else 0.0
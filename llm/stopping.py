@@ -0,0 +1,57 @@
+import time
+import torch
+from transformers import StoppingCriteria
+from llm.scoring import ends_sentence
+
+# Reasons a reply stopped that mean it was cut short
+CUT_SHORT = ("deadline", "length", "cancelled")
+
+
+def reply_budget(slo, prompt_length):
+    """max_new_tokens for a reply under an SLO: proportional to the prompt, within its min and max."""
+    scaled = int(slo.get("tokens_per_prompt_token", float("inf")) * prompt_length) if prompt_length else 0
+    return max(slo.get("min_tokens", 1), min(slo["max_tokens"], scaled or slo["max_tokens"]))
+
+
+class ReplyStopper(StoppingCriteria):
+    """Stops each row at its deadline, or at the first sentence end once `min_tokens` new tokens are out.
+
+    Keeps why every row stopped in `reasons` ("eos", "sentence", "deadline"
+    or "cancelled", once the `cancelled` event is set); a row missing from it
+    ran into max_new_tokens.
+    """
+
+    def __init__(self, tokenizer, prompt_length, seconds=None, min_tokens=None, cancelled=None):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.min_tokens = min_tokens
+        self.cancelled = cancelled
+        self.reasons = {}
+
+    def __call__(self, input_ids, scores, **kwargs):
+        new_tokens = input_ids.shape[1] - self.prompt_length
+        late = self.deadline is not None and time.monotonic() >= self.deadline
+        for row in range(input_ids.shape[0]):
+            if row in self.reasons:
+                continue  # Already done; generate pads it from here on
+            if int(input_ids[row, -1]) == self.tokenizer.eos_token_id:
+                self.reasons[row] = "eos"
+            elif self.cancelled is not None and self.cancelled.is_set():
+                self.reasons[row] = "cancelled"
+            elif late:
+                self.reasons[row] = "deadline"
+            elif (self.min_tokens is not None and new_tokens >= self.min_tokens
+                  and ends_sentence(self.tokenizer.decode(input_ids[row, -1:], skip_special_tokens=True))):
+                self.reasons[row] = "sentence"
+        return torch.tensor([row in self.reasons for row in range(input_ids.shape[0])], device=input_ids.device)
+
+    def reason(self, row=0):
+        return self.reasons.get(row, "length")
+
+    def metadata(self, new_tokens, row=0):
+        """What CatiaLLM reports about the reply in `row`."""
+        reason = self.reason(row)
+        return {"stop_reason": reason, "cut_short": reason in CUT_SHORT, "new_tokens": new_tokens,
+                "seconds": time.monotonic() - self.started}
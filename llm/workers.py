@@ -0,0 +1,370 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from config import Config
+from llm.llm import CatiaLLM
+
+# Messages over a worker's pipe are tuples: (kind, request_id, payload).
+# Pool -> worker: "generate" (session, (user_input, slo, settings)), "reset" (session, None), "cancel", "ping", "stop".
+# Worker -> pool: "ready" (error or None), "piece" text, "done" metadata, "error" message, "pong" status.
+
+_request_ids = itertools.count(1)
+_sessions = itertools.count()
+
+
+class WorkerError(RuntimeError):
+    """An inference worker failed a request, died, or stopped answering and was restarted."""
+
+
+def split_cpus(size):
+    """This process's allowed CPUs in `size` contiguous groups, one per worker ([] where pinning is unsupported)."""
+    if not hasattr(os, "sched_getaffinity"):
+        return [[] for _ in range(size)]
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = max(len(cpus) // size, 1)
+    return [cpus[i * per_worker:(i + 1) * per_worker] or cpus for i in range(size)]
+
+
+def _serve(conn, model_path, threads, cpus, sessions=8):
+    """Body of a worker process: loads its own CatiaLLM, then generates whatever the pool sends over `conn`.
+
+    Every request runs on its own thread, so requests from different
+    sessions generate at the same time and meet in the micro-batcher. Each
+    session has its own fork of the CatiaLLM (its own conversation context,
+    sharing the model and persona prefix) and a lock, so one session's
+    requests still run in order. Only the `sessions` most recently used
+    sessions are kept.
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+
+    llm = CatiaLLM(model_path, with_memory=False)
+    send_lock = threading.Lock()
+    waiting = set()  # Requests received but not started, e.g. behind an earlier one from their session
+    cancelled = set()  # Waiting or running requests that were cancelled
+    running = {}  # request id -> the session CatiaLLM generating it
+    forks = OrderedDict()  # session -> (its CatiaLLM fork, lock ordering its requests), least recently used first
+    forks_lock = threading.Lock()
+
+    def send(kind, request_id, payload=None):
+        with send_lock:
+            conn.send((kind, request_id, payload))
+
+    llm.loading.add_done_callback(
+        lambda loading: send("ready", None, None if loading.exception() is None else str(loading.exception())))
+
+    def session(key, fresh=False):
+        with forks_lock:
+            state = None if fresh else forks.pop(key, None)
+            forks[key] = state = state or (llm.fork(), threading.Lock())
+            while len(forks) > sessions:
+                forks.popitem(last=False)
+            return state
+
+    def work(kind, request_id, key, payload):
+        # A reset gives the session a fresh fork, so its next turn starts a new context
+        session_llm, order = session(key, fresh=kind == "reset")
+        with order:
+            with send_lock:
+                waiting.discard(request_id)
+                if request_id in cancelled:
+                    cancelled.discard(request_id)
+                    conn.send(("done", request_id, {"stop_reason": "cancelled", "cut_short": True}))
+                    return
+                session_llm.cancelled.clear()
+                running[request_id] = session_llm
+            try:
+                if kind == "generate":
+                    user_input, slo, settings = payload
+                    llm.wait_until_ready()
+                    for piece in session_llm.stream_generate(user_input, slo, **settings):
+                        if request_id not in cancelled:
+                            send("piece", request_id, piece)
+                send("done", request_id, session_llm.last_metadata)
+            except Exception as error:
+                send("error", request_id, f"{type(error).__name__}: {error}")
+            finally:
+                with send_lock:
+                    del running[request_id]
+                    cancelled.discard(request_id)
+
+    # ✅ This thread only reads the pipe, so pings and cancels are answered even mid-generation
+    while True:
+        try:
+            kind, request_id, payload = conn.recv()
+        except (EOFError, OSError):
+            os._exit(0)  # The pool is gone
+        if kind == "stop":
+            os._exit(0)
+        elif kind == "ping":
+            send("pong", request_id, {"pid": os.getpid(), "ready": llm.ready, "busy": bool(running),
+                                      "running": len(running), "threads": torch.get_num_threads()})
+        elif kind == "cancel":
+            with send_lock:
+                if request_id in running:
+                    cancelled.add(request_id)
+                    running[request_id].cancel()
+                elif request_id in waiting:
+                    cancelled.add(request_id)
+                # Otherwise it already finished; remembering the id would only leak it
+        else:
+            with send_lock:
+                waiting.add(request_id)
+            threading.Thread(target=work, args=(kind, request_id, *payload), name=f"catia-inference-{request_id}",
+                             daemon=True).start()
+
+
+class InferenceRequest:
+    """One request in flight on a worker. `stream()` yields the reply's pieces, then sets `metadata`."""
+
+    def __init__(self, worker, request_id):
+        self.worker = worker
+        self.id = request_id
+        self.replies = queue.Queue()
+        self.metadata = None
+
+    def stream(self):
+        finished = False
+        try:
+            while True:
+                kind, payload = self.replies.get()
+                if kind == "piece":
+                    yield payload
+                elif kind == "done":
+                    finished = True
+                    self.metadata = payload
+                    return
+                else:
+                    finished = True
+                    raise WorkerError(payload)
+        finally:
+            if not finished:
+                self.cancel()  # An abandoned stream stops its generation in the worker
+
+    def result(self):
+        return "".join(self.stream())
+
+    def cancel(self):
+        self.worker.send("cancel", self.id)
+
+
+class InferenceWorker:
+    """The pool's handle on one worker process: its pipe, the thread reading it, and the requests it is running."""
+
+    def __init__(self, index, model_path, threads, cpus):
+        self.index = index
+        self.model_path = model_path
+        self.threads = threads
+        self.cpus = cpus
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")  # Forking a process that runs torch threads or Qt is unsafe
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, self.model_path, self.threads, self.cpus,
+                                                            Config.INFERENCE_SESSIONS),
+                                       name=f"catia-inference-{self.index}", daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = Future()
+        self.pending = {}
+        self.status = {}
+        self.last_seen = time.monotonic()
+        threading.Thread(target=self._read, args=(self.conn, self.pending, self.ready),
+                         name=f"catia-inference-reader-{self.index}", daemon=True).start()
+
+    def send(self, kind, request_id=None, payload=None):
+        with self.lock:
+            try:
+                self.conn.send((kind, request_id, payload))
+            except (OSError, ValueError):
+                pass  # Died; the reader fails its requests and the health check restarts it
+
+    def submit(self, kind, payload, session=None):
+        request = InferenceRequest(self, next(_request_ids))
+        with self.lock:
+            self.pending[request.id] = request
+        self.send(kind, request.id, (session, payload))
+        return request
+
+    def _read(self, conn, pending, ready):
+        while True:
+            try:
+                kind, request_id, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            self.last_seen = time.monotonic()
+            if kind == "ready":
+                if payload is None:
+                    ready.set_result(None)
+                else:
+                    ready.set_exception(WorkerError(payload))
+            elif kind == "pong":
+                self.status = payload
+            else:
+                with self.lock:
+                    request = pending.get(request_id) if kind == "piece" else pending.pop(request_id, None)
+                if request is not None:
+                    request.replies.put((kind, payload))
+        self._fail(pending, "Inference worker exited")
+
+    def _fail(self, pending, reason):
+        with self.lock:
+            requests = list(pending.values())
+            pending.clear()
+        for request in requests:
+            request.replies.put(("error", reason))
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def load(self):
+        return len(self.pending)
+
+    def restart(self, reason):
+        print(f"🔄 Restarting inference worker {self.index} ({reason})")
+        self.stop()
+        self._fail(self.pending, f"Inference worker restarted: {reason}")
+        self.restarts += 1
+        self.start()
+
+    def stop(self, timeout=2.0):
+        self.send("stop")
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def health(self):
+        return {"index": self.index, "pid": self.process.pid, "alive": self.alive(),
+                "ready": self.ready.done() and self.ready.exception() is None, "in_flight": self.load(),
+                "restarts": self.restarts, "cpus": self.cpus, "threads": self.threads,
+                "seconds_since_seen": time.monotonic() - self.last_seen, **self.status}
+
+
+class InferenceWorkerPool:
+    """Runs generation in worker processes so a stall in generate never freezes the GUI.
+
+    Each worker loads its own CatiaLLM and is reached over a multiprocessing
+    pipe. Requests carry ids, so pieces stream back to the right caller and a
+    request can be cancelled mid-reply. A monitor thread pings every worker
+    every `health_interval` seconds and restarts any that died or went
+    `health_timeout` seconds without answering. Requests on a restarted worker
+    fail with WorkerError. `ready` resolves once the first worker has loaded
+    its model.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_path, size=1, threads=None, affinity=None, health_interval=5.0, health_timeout=30.0):
+        if affinity == "auto":
+            affinity = split_cpus(size)
+        cpus = [list(affinity[i % len(affinity)]) if affinity else [] for i in range(size)]
+        threads = [threads or max(len(cpus[i]) if cpus[i] else (os.cpu_count() or 1) // size, 1) for i in range(size)]
+
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.ready = Future()
+        self.workers = [InferenceWorker(i, model_path, threads[i], cpus[i]) for i in range(size)]
+        for worker in self.workers:
+            self._watch(worker)
+        self.closed = threading.Event()
+        threading.Thread(target=self._monitor, name="catia-inference-monitor", daemon=True).start()
+        print(f"🧠 Started {size} inference worker(s) with {threads} torch threads")
+
+    @classmethod
+    def shared(cls, model_path=None):
+        """The process-wide pool for a model, configured from Config.INFERENCE_*."""
+        model_path = model_path or Config.MODEL_PATH
+        with cls._shared_lock:
+            if model_path not in cls._shared:
+                cls._shared[model_path] = cls(model_path, Config.INFERENCE_WORKERS, Config.INFERENCE_THREADS,
+                                              Config.INFERENCE_CPU_AFFINITY, Config.INFERENCE_HEALTH_INTERVAL,
+                                              Config.INFERENCE_HEALTH_TIMEOUT)
+            return cls._shared[model_path]
+
+    def _watch(self, worker):
+        worker.ready.add_done_callback(lambda ready: self._worker_ready(ready))
+
+    def _worker_ready(self, ready):
+        if self.ready.done():
+            return
+        if ready.exception() is None:
+            self.ready.set_result(None)
+        elif all(worker.ready.done() and worker.ready.exception() is not None for worker in self.workers):
+            self.ready.set_exception(ready.exception())  # Every worker failed to load the model
+
+    def submit(self, kind, payload=None, session=None):
+        """Sends a request to a worker: the session's own worker if it is up, else the least busy one."""
+        alive = [worker for worker in self.workers if worker.alive()] or self.workers
+        if session is not None and self.workers[session % len(self.workers)] in alive:
+            worker = self.workers[session % len(self.workers)]  # Its conversation context lives there
+        else:
+            worker = min(alive, key=InferenceWorker.load)
+        return worker.submit(kind, payload, session)
+
+    def _monitor(self):
+        while not self.closed.wait(self.health_interval):
+            for worker in self.workers:
+                if not worker.alive():
+                    worker.restart(f"exited with code {worker.process.exitcode}")
+                    self._watch(worker)
+                elif time.monotonic() - worker.last_seen > self.health_timeout:
+                    worker.restart(f"no answer for {self.health_timeout:.0f}s")
+                    self._watch(worker)
+                else:
+                    worker.send("ping")
+
+    def health(self):
+        """Status of every worker, as of its last answer to a health check."""
+        return [worker.health() for worker in self.workers]
+
+    def close(self):
+        self.closed.set()
+        for worker in self.workers:
+            worker.stop()
+
+
+class RemoteLLM(CatiaLLM):
+    """CatiaLLM whose generation runs in the inference worker pool instead of in this process.
+
+    Memory, pre-defined replies and context detection stay here; only
+    stream_generate is forwarded. Each instance is a session, kept to one
+    worker so its own conversation context, cached there, carries over
+    between turns.
+    """
+
+    def start_loading(self, model_path):
+        self.pool = InferenceWorkerPool.shared(model_path)
+        self.loading = self.pool.ready
+        self.draft_loading = None
+        self.session = next(_sessions)
+        self.request = None
+
+    def stream_generate(self, user_input, slo="general", **settings):
+        self.request = request = self.pool.submit("generate", (user_input, slo, settings), self.session)
+        yield from request.stream()
+        self.last_metadata = {**self.last_metadata, **request.metadata}
+
+    def cancel(self):
+        request = self.request
+        if request is not None:
+            request.cancel()
+
+    def reset_context(self):
+        self.pool.submit("reset", None, self.session).result()
+
+    def health(self):
+        return self.pool.health()
@@ -1,12 +1,20 @@
 from gui.gui import CatiaGUI
 from PyQt5.QtWidgets import QApplication
+import os
 import sys
 from assistant.assistant import CatiaAssistant  # ✅ Import Assistant (which uses LLM)
+from boot.boot import BootScreen
+from config import Config
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
 
-    # ✅ Initialize Assistant (which now contains CatiaLLM)
+    # ✅ Boot video plays while the model loads in the background
+    if os.path.exists(Config.BOOT_VIDEO):
+        boot = BootScreen(Config.BOOT_VIDEO)
+        boot.show()
+
+    # ✅ Initialize Assistant (which now contains CatiaLLM; the model loads on a background thread)
     assistant = CatiaAssistant()
     
     # ✅ Pass the Assistant to the GUI
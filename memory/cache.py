@@ -0,0 +1,243 @@
+import atexit
+import copy
+import os
+import threading
+import time
+from config import Config
+from memory.eviction import UsageTracker
+from memory.fuzzy import FuzzyIndex
+from memory.journal import EncryptedJournal
+from memory.sqlite_store import SQLiteStore
+
+
+class MemoryCache:
+    """Process-wide decrypted copy of one memory store with write-back flushing.
+
+    Reads are served from the decrypted dict without touching the disk or the
+    key. Writes update the dict at once and queue a store operation; the
+    queue is flushed every `flush_every` writes, `flush_interval` seconds after
+    the first unflushed write, and at interpreter shutdown. If another process
+    writes the store, the cached copy is dropped and rebuilt.
+
+    Top-level names starting with "_" hold bookkeeping, not learned inputs, so
+    they are kept out of the fuzzy index. Access records under "_access" feed
+    the usage tracker once `track_usage` names the categories to watch.
+
+    The store is the append-only journal at `filepath` or, with
+    Config.MEMORY_BACKEND = "sqlite", a database next to it.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, filepath, fernet, key, flush_every=None, flush_interval=None, check_interval=None):
+        self.store = self._open_store(filepath, fernet, key)
+        self.flush_every = flush_every or Config.MEMORY_FLUSH_EVERY
+        self.flush_interval = flush_interval or Config.MEMORY_FLUSH_INTERVAL
+        self.check_interval = check_interval if check_interval is not None else Config.MEMORY_CHECK_INTERVAL
+
+        self.lock = threading.RLock()
+        self.data = None      # decrypted memory, loaded on first use
+        self.fuzzy = FuzzyIndex()  # length / LCS index over second-level keys, kept in step with data
+        self.usage = UsageTracker()  # recency / hit counts of learned entries, kept in step with data
+        self.pending = []     # journal operations not yet written
+        self.dirty = False
+        self.last_check = time.monotonic()
+        self.timer = None
+
+    @classmethod
+    def shared(cls, filepath, fernet, key):
+        """Returns the one cache for this file, creating it on first use."""
+        path = os.path.abspath(filepath)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(filepath, fernet, key)
+            return cls._shared[path]
+
+    @staticmethod
+    def _open_store(filepath, fernet, key):
+        if Config.MEMORY_BACKEND != "sqlite":
+            return EncryptedJournal(filepath, fernet)
+
+        store = SQLiteStore(os.path.splitext(filepath)[0] + ".db", fernet, key)
+        if store.is_empty() and os.path.exists(filepath):
+            # ✅ One-time import of the journal into a fresh database
+            print(f"🔄 Importing {filepath} into {store.filepath}")
+            journal = EncryptedJournal(filepath, fernet)
+            snapshot = journal.snapshot()
+            # Access stats land on learned rows, so they must follow them
+            names = sorted(snapshot, key=lambda name: name == "_access")
+            store.write_batch([("put", (name,), snapshot[name]) for name in names])
+            journal.close()
+        return store
+
+    # ------------------------------------------------------------------ reads
+
+    def memory(self):
+        """Returns the live decrypted memory dict. Treat it as read-only."""
+        with self.lock:
+            self._check_disk()
+            if self.data is None:
+                self.data = self.store.snapshot()
+                for operation in self.pending:
+                    self._apply(self.data, *operation)
+                self.fuzzy.build(self.data)
+                self.usage.build(self.data)
+            return self.data
+
+    def get(self, path, default=None):
+        value = self.memory()
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def contains(self, path):
+        return self.get(path, self) is not self
+
+    def close_matches(self, word, n=3, cutoff=0.7):
+        """Fuzzy-matches word against every stored second-level key."""
+        with self.lock:
+            self.memory()
+            return self.fuzzy.close_matches(word, n, cutoff)
+
+    def track_usage(self, categories):
+        """Starts keeping recency and hit counts for the learned entries in these categories."""
+        with self.lock:
+            categories = set(categories)
+            if categories - self.usage.categories:
+                self.usage.categories |= categories
+                if self.data is not None:
+                    self.usage.build(self.data)
+
+    def _check_disk(self):
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+
+        if self.store.changed_on_disk():
+            print("🔄 Memory file changed on disk, reloading cache")
+            self.store.reload()
+            self.data = None
+
+    # ------------------------------------------------------------------ writes
+
+    def put(self, path, value):
+        self._write(("put", tuple(path), value))
+
+    def delete(self, path):
+        if self.contains(path):
+            self._write(("delete", tuple(path), None))
+
+    def append(self, path, item, limit):
+        """Appends item to the list at path, keeping only the last `limit` items."""
+        self._write(("append", tuple(path), (item, limit)))
+
+    def _write(self, operation):
+        with self.lock:
+            memory = self.memory()
+            self._index(memory, *operation)
+            action, path, value = operation
+            # The live dict gets its own copy, or later writes under it would leak into the queued record
+            self._apply(memory, action, path, copy.deepcopy(value) if action == "put" else value)
+            self.pending.append(operation)
+            self.dirty = True
+
+            if len(self.pending) >= self.flush_every:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _index(self, memory, action, path, value):
+        """Mirrors a pending write into the fuzzy index and usage tracker before it is applied."""
+        category = path[0]
+        self._track(memory, action, path, value)
+        if category.startswith("_"):
+            return
+        if action == "append":
+            if isinstance(memory.get(category), dict) and len(path) == 1:
+                self.fuzzy.discard_category(category, list(memory[category]))
+        elif len(path) == 1:
+            if isinstance(memory.get(category), dict):
+                self.fuzzy.discard_category(category, list(memory[category]))
+            if action == "put" and isinstance(value, dict):
+                for key in value:
+                    self.fuzzy.add(key, category)
+        elif len(path) == 2:
+            if action == "put":
+                self.fuzzy.add(path[1], category)
+            else:
+                self.fuzzy.discard(path[1], category)
+
+    def _track(self, memory, action, path, value):
+        usage, category = self.usage, path[0]
+        if category == "_access":
+            if action == "put" and len(path) == 3 and (path[1], path[2]) in usage.stats:
+                usage.added(path[1], path[2], *value)
+        elif category in usage.categories:
+            if len(path) == 2:
+                if action == "put":
+                    hits, _ = usage.stats.get((category, path[1]), (0, 0.0))
+                    usage.added(category, path[1], hits)
+                else:
+                    usage.removed(category, path[1])
+            elif len(path) == 1:
+                usage.removed_category(category)
+                if action == "put" and isinstance(value, dict):
+                    access = memory.get("_access", {}).get(category, {})
+                    for key in value:
+                        usage.added(category, key, *access.get(key, (0, 0.0)))
+
+    @staticmethod
+    def _apply(data, action, path, value):
+        for key in path[:-1]:
+            if not isinstance(data.get(key), dict):
+                data[key] = {}
+            data = data[key]
+        if action == "put":
+            data[path[-1]] = value
+        elif action == "append":
+            item, limit = value
+            current = data.get(path[-1])
+            data[path[-1]] = ((current if isinstance(current, list) else []) + [item])[-limit:]
+        else:
+            data.pop(path[-1], None)
+
+    def flush(self):
+        """Writes every queued operation to the journal in one append."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.pending:
+                return
+
+            self.store.write_batch(self.pending)
+            self.pending = []
+            self.dirty = False
+
+    def clear(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.pending = []
+            self.dirty = False
+            self.store.clear()
+            self.data = {}
+            self.fuzzy.build(self.data)
+            self.usage.build(self.data)
+
+    @classmethod
+    def flush_all(cls):
+        with cls._shared_lock:
+            caches = list(cls._shared.values())
+        for cache in caches:
+            cache.flush()
+
+
+atexit.register(MemoryCache.flush_all)
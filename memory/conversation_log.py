@@ -0,0 +1,181 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from itertools import islice
+from config import Config
+
+
+class ConversationLog:
+    """Append-only JSONL conversation log with size/age rotation.
+
+    The live segment is `<name>.jsonl`. Once it grows past `max_bytes` or its
+    first entry is older than `max_age` seconds, it is renamed to
+    `<name>.<timestamp>-<n>.jsonl` (gzipped if `compress`) and a new one starts.
+    Readers stream entries across all segments, oldest first, without ever
+    loading the whole history.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path, max_bytes=None, max_age=None, compress=None, fsync=None):
+        self.path = path
+        self.base = os.path.splitext(path)[0]
+        self.max_bytes = max_bytes or Config.CONVERSATION_LOG_MAX_BYTES
+        self.max_age = max_age or Config.CONVERSATION_LOG_MAX_AGE
+        self.compress = Config.CONVERSATION_LOG_COMPRESS if compress is None else compress
+        self.fsync = Config.CONVERSATION_LOG_FSYNC if fsync is None else fsync
+        self.lock = threading.Lock()
+
+        self.migrate(self.base + ".json")
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.started = self._first_timestamp()
+
+    @classmethod
+    def shared(cls, path):
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path)
+            return cls._shared[key]
+
+    def _first_timestamp(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.loads(file.readline()).get("time")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    # ------------------------------------------------------------------ writes
+
+    def append(self, entry):
+        """Writes one turn as a single line; O(entry) regardless of history size."""
+        entry = dict(entry, time=entry.get("time", time.time()))
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            if self.started is None:
+                self.started = entry["time"]
+            if self.file.tell() >= self.max_bytes or entry["time"] - self.started >= self.max_age:
+                self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        suffix = 0
+        segment = f"{self.base}.{stamp}-{suffix:03d}.jsonl"
+        while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+            suffix += 1
+            segment = f"{self.base}.{stamp}-{suffix:03d}.jsonl"
+        os.replace(self.path, segment)
+
+        if self.compress:
+            with open(segment, "rb") as source, gzip.open(segment + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(segment)
+
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.started = None
+
+    def migrate(self, legacy_path):
+        """Converts an old JSON-array log into JSONL once, keeping the original as *.migrated."""
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as file:
+                history = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            print(f"⚠ Could not migrate {legacy_path}: not a JSON conversation log")
+            return
+
+        print(f"🔄 Migrating {len(history)} conversation turns to {self.path}")
+        with open(self.path, "a", encoding="utf-8") as file:
+            for entry in history:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+    # ------------------------------------------------------------------ reads
+
+    def segments(self):
+        """Rotated segments oldest first, then the live one."""
+        return sorted(glob.glob(glob.escape(self.base) + ".*.jsonl*")) + [self.path]
+
+    @staticmethod
+    def _open_segment(path):
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+
+    def read(self):
+        """Yields every logged turn, oldest first, one line at a time."""
+        with self.lock:
+            self.file.flush()
+            segments = self.segments()
+
+        for path in segments:
+            try:
+                with self._open_segment(path) as file:
+                    for line in file:
+                        if line.strip():
+                            try:
+                                yield json.loads(line)
+                            except json.JSONDecodeError:
+                                continue  # A torn last line from a crash
+            except OSError:
+                continue
+
+    def page(self, offset=0, limit=50):
+        """Returns `limit` turns starting at `offset` (0 = oldest)."""
+        return list(islice(self.read(), offset, offset + limit))
+
+    def tail(self, count=20):
+        """Returns the last `count` turns, reading segments backwards only as far as needed."""
+        with self.lock:
+            self.file.flush()
+            segments = self.segments()
+
+        turns = deque()
+        for path in reversed(segments):
+            needed = count - len(turns)
+            if needed <= 0:
+                break
+            try:
+                if path.endswith(".gz"):
+                    with self._open_segment(path) as file:
+                        lines = deque(file, maxlen=needed)
+                else:
+                    lines = self._last_lines(path, needed)
+            except OSError:
+                continue
+            for line in reversed(lines):
+                if line.strip():
+                    try:
+                        turns.appendleft(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return list(turns)[-count:] if count else []
+
+    @staticmethod
+    def _last_lines(path, count, block=8192):
+        with open(path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(block, position)
+                position -= step
+                file.seek(position)
+                data = file.read(step) + data
+        return [line.decode("utf-8") for line in data.splitlines()[-count:]]
+
+    def close(self):
+        with self.lock:
+            self.file.close()
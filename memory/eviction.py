@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+
+
+class EvictionPolicy:
+    """Scores learned entries; the lowest score among the candidates is evicted.
+
+    "lru" drops the least recently used entry, "lfu" the least used one, and
+    "age" weighs hit count against age so that old entries nobody recalls go
+    first. Candidates are always the `sample_size` least recently used
+    entries, so choosing a victim costs O(sample_size), not O(store).
+    """
+
+    def __init__(self, kind="lru", sample_size=16):
+        if kind not in ("lru", "lfu", "age"):
+            raise ValueError(f"Unknown eviction policy: {kind}")
+        self.kind = kind
+        self.sample_size = sample_size
+
+    def score(self, hits, last_used, now):
+        if self.kind == "lru":
+            return last_used
+        if self.kind == "lfu":
+            return hits + last_used / (now + 1.0)  # Ties go to the least recently used
+        age_days = max(now - last_used, 0.0) / 86400.0
+        return (hits + 1.0) / (1.0 + age_days)
+
+    def choose(self, candidates, stats, now=None):
+        now = now or time.time()
+        return min(candidates, key=lambda entry: self.score(*stats.get(entry, (0, 0.0)), now), default=None)
+
+
+class UsageTracker:
+    """Hit counts, last-used times and recency order of learned entries.
+
+    Kept in step with the memory cache so eviction never has to scan the
+    store, plus hit/miss/eviction counters for tuning the caps.
+    """
+
+    def __init__(self, categories=()):
+        self.categories = set(categories)  # only entries in these categories are tracked
+        self.stats = {}             # (category, key) -> (hits, last_used)
+        self.order = OrderedDict()  # (category, key), least recently used first
+        self.by_category = {}       # category -> OrderedDict of keys, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def build(self, memory):
+        self.stats, self.order, self.by_category = {}, OrderedDict(), {}
+        access = memory.get("_access")
+        entries = []
+        for category in self.categories:
+            recorded = access.get(category, {}) if isinstance(access, dict) else {}
+            learned = memory.get(category)
+            for key in learned if isinstance(learned, dict) else ():
+                hits, last_used = recorded.get(key, (0, 0.0))
+                entries.append((last_used, category, key, hits))
+        for last_used, category, key, hits in sorted(entries, key=lambda entry: entry[0]):
+            self._place(category, key, hits, last_used)
+
+    def _place(self, category, key, hits, last_used):
+        self.stats[(category, key)] = (hits, last_used)
+        self.order[(category, key)] = None
+        self.order.move_to_end((category, key))
+        keys = self.by_category.setdefault(category, OrderedDict())
+        keys[key] = None
+        keys.move_to_end(key)
+
+    def added(self, category, key, hits=0, last_used=None):
+        self._place(category, key, hits, time.time() if last_used is None else last_used)
+
+    def removed(self, category, key):
+        self.stats.pop((category, key), None)
+        self.order.pop((category, key), None)
+        self.by_category.get(category, {}).pop(key, None)
+
+    def removed_category(self, category):
+        for key in list(self.by_category.pop(category, {})):
+            self.stats.pop((category, key), None)
+            self.order.pop((category, key), None)
+
+    def count(self, category=None):
+        return len(self.order) if category is None else len(self.by_category.get(category, ()))
+
+    def victim(self, policy, category=None):
+        """Picks an entry to evict, globally or within one category."""
+        if category is None:
+            candidates = list(islice(self.order, policy.sample_size))
+        else:
+            candidates = [(category, key) for key in islice(self.by_category.get(category, ()), policy.sample_size)]
+        return policy.choose(candidates, self.stats)
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.order),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "per_category": {category: len(keys) for category, keys in self.by_category.items()},
+        }
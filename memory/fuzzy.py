@@ -0,0 +1,155 @@
+from difflib import SequenceMatcher
+from heapq import nlargest
+import numpy as np
+
+WORD_BITS = 64  # Query characters the bit-parallel LCS tracks at once
+
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    return np.unpackbits(values.view(np.uint8)).reshape(-1, WORD_BITS).sum(axis=1)
+
+
+def _width(length):
+    """The key width a length is stored under: 8, 12, 16, 24, 32, 48, 64, 96..."""
+    width = 8
+    while width < length:
+        width = width * 3 // 2 if width & (width - 1) == 0 else width * 4 // 3
+    return width
+
+
+class _Shelf:
+    """Keys of one width class, as columns of character codes (0 = padding) for the vectorised LCS."""
+
+    def __init__(self, width):
+        self.width = width
+        self.codes = np.zeros((width, 64), dtype=np.uint32)  # column per key, so a character position is one row
+        self.lengths = np.zeros(64, dtype=np.int64)
+        self.keys = []
+        self.rows = {}  # key -> its column
+
+    def add(self, key, codes):
+        row = len(self.keys)
+        if row == self.lengths.shape[0]:
+            self.codes = np.concatenate([self.codes, np.zeros_like(self.codes)], axis=1)
+            self.lengths = np.concatenate([self.lengths, np.zeros_like(self.lengths)])
+        self.codes[:, row] = 0
+        self.codes[:len(codes), row] = codes
+        self.lengths[row] = len(key)
+        self.keys.append(key)
+        self.rows[key] = row
+
+    def discard(self, key):
+        row = self.rows.pop(key)
+        last = len(self.keys) - 1
+        if row != last:  # The last key fills the hole
+            moved = self.keys[last]
+            self.codes[:, row] = self.codes[:, last]
+            self.lengths[row] = self.lengths[last]
+            self.keys[row] = moved
+            self.rows[moved] = row
+        self.keys.pop()
+
+
+class FuzzyIndex:
+    """Stored inputs grouped by length for exact difflib-style fuzzy recall.
+
+    `close_matches` returns what `difflib.get_close_matches` would over every
+    stored key, but only runs SequenceMatcher.ratio() on keys that can reach
+    the cutoff. ratio() is 2 * M / (len(a) + len(b)), where M counts the
+    characters in its matching blocks; those blocks are a common subsequence,
+    so M never exceeds the longest common subsequence. The LCS of the query
+    with every key of a reachable length is computed at once with the
+    bit-parallel algorithm over numpy arrays, and a key whose LCS bound falls
+    short of the cutoff cannot be one of difflib's matches. Nothing else is
+    filtered, so the results are the same as difflib's.
+    """
+
+    def __init__(self):
+        self.shelves = {}             # width -> _Shelf of the keys up to that length
+        self.characters = {}          # character -> its code (from 1; 0 pads short keys)
+        self.categories = {}          # key -> categories the key is stored under
+
+    def _code(self, character):
+        return self.characters.setdefault(character, len(self.characters) + 1)
+
+    def build(self, memory):
+        self.shelves, self.characters, self.categories = {}, {}, {}
+        for category, entries in memory.items():
+            if isinstance(entries, dict) and not category.startswith("_"):
+                for key in entries:
+                    self.add(key, category)
+
+    def add(self, key, category):
+        categories = self.categories.setdefault(key, [])
+        if category in categories:
+            return
+        categories.append(category)
+        if len(categories) == 1:
+            width = _width(len(key))
+            shelf = self.shelves.get(width) or self.shelves.setdefault(width, _Shelf(width))
+            shelf.add(key, [self._code(character) for character in key])
+
+    def discard(self, key, category):
+        categories = self.categories.get(key)
+        if not categories or category not in categories:
+            return
+        categories.remove(category)
+        if categories:
+            return
+        del self.categories[key]
+        self.shelves[_width(len(key))].discard(key)
+
+    def discard_category(self, category, keys):
+        for key in keys:
+            self.discard(key, category)
+
+    def categories_of(self, key):
+        return self.categories.get(key, [])
+
+    def close_matches(self, word, n=3, cutoff=0.7):
+        """Same contract and results as difflib.get_close_matches(word, all_keys, n, cutoff)."""
+        bits = min(len(word), WORD_BITS)
+        full = np.uint64((1 << bits) - 1)
+        masks = np.zeros(len(self.characters) + 1, dtype=np.uint64)  # code -> query positions holding it
+        for position, character in enumerate(word[:bits]):
+            code = self.characters.get(character)
+            if code is not None:
+                masks[code] |= np.uint64(1 << position)
+
+        # ratio() can never beat 2 * min(len) / (len(a) + len(b)); widths are only a coarse first cut
+        shortest = len(word) * cutoff / (2 - cutoff) - 1
+        longest = len(word) * (2 - cutoff) / cutoff + 1
+
+        result = []
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        for width, shelf in self.shelves.items():
+            if not shelf.keys or width < shortest or (width > 8 and width * 2 // 3 > longest):
+                continue
+            lengths = shelf.lengths[:len(shelf.keys)]
+            totals = lengths + len(word)
+            upper = np.minimum(lengths, len(word))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rows = np.flatnonzero((totals == 0) | (2.0 * upper / totals >= cutoff))
+            if not rows.size:
+                continue
+
+            # ✅ Bit-parallel LCS of the query's first WORD_BITS characters with every remaining key at once
+            v = np.full(rows.size, full, dtype=np.uint64)
+            for column in shelf.codes[:int(lengths[rows].max()), rows]:
+                u = v & masks[column]
+                v = (v + u) | (v - u)
+            lcs = bits - _popcount(v & full) + (len(word) - bits)  # Characters past WORD_BITS may all match
+            upper = np.minimum(lcs, upper[rows])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                reachable = (totals[rows] == 0) | (2.0 * upper / totals[rows] >= cutoff)
+
+            for row in rows[reachable]:
+                s.set_seq1(shelf.keys[row])
+                score = s.ratio()  # Never above quick_ratio() or real_quick_ratio(), so difflib's checks agree
+                if score >= cutoff:
+                    result.append((score, shelf.keys[row]))
+
+        return [key for score, key in nlargest(n, result)]
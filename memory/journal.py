@@ -0,0 +1,375 @@
+import json
+import os
+import threading
+from cryptography.fernet import InvalidToken
+
+
+class EncryptedJournal:
+    """Append-only log of individually Fernet-encrypted memory records.
+
+    Every line of the file is one Fernet token wrapping either
+    {"k": path, "v": value} (a put) or {"k": path, "d": 1} (a delete of the
+    path and everything below it). Paths are short lists such as
+    ["flirtation", "hello"] or ["_last_topic"]. A put of a non-empty dict is
+    stored as a delete of its path followed by one record per leaf, so no
+    record ever holds another path's value and deleting a child never leaves
+    a copy of it behind in its parent. Only the newest record of each live
+    path is referenced from the in-memory offset index; everything else is
+    dead weight that a background compaction drops.
+    """
+
+    def __init__(self, filepath, fernet, compact_ratio=0.5, compact_min_bytes=256 * 1024, fsync=False):
+        self.filepath = filepath
+        self.fernet = fernet
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.fsync = fsync
+
+        self.lock = threading.RLock()
+        self.index = {}       # path tuple -> (offset, length) of its newest record
+        self.prefixes = {}    # path prefix -> set of indexed paths below it
+        self.size = 0
+        self.live_bytes = 0
+
+        self._pending = None  # records appended while a compaction is running
+        self._compactor = None
+
+        if not os.path.exists(self.filepath):
+            open(self.filepath, "wb").close()
+        self.file = open(self.filepath, "r+b")
+        self._replay()
+
+    # ------------------------------------------------------------------ replay
+
+    def _replay(self):
+        """Rebuilds the offset index from disk, dropping a torn last record."""
+        self.file.seek(0)
+        offset = 0
+        legacy = None
+        whole = set()  # Paths whose record holds a non-empty dict, written before puts were split into leaves
+
+        while True:
+            line = self.file.readline()
+            if not line:
+                break
+
+            try:
+                record = json.loads(self.fernet.decrypt(line.strip()).decode())
+            except (InvalidToken, ValueError):
+                record = None
+
+            # ✅ Pre-journal files are one encrypted JSON blob without a newline
+            if offset == 0 and isinstance(record, dict) and "k" not in record:
+                legacy = record
+                break
+
+            if not isinstance(record, dict) or "k" not in record:
+                if not self.file.read(1):
+                    print(f"⚠ Dropping torn record at byte {offset} of {self.filepath}")
+                    self.file.truncate(offset)
+                    break
+                print(f"⚠ Skipping unreadable record at byte {offset} of {self.filepath}")
+                self.file.seek(offset + len(line))
+                offset += len(line)
+                continue
+
+            if not line.endswith(b"\n"):
+                # Record survived the crash but its terminator did not
+                self.file.seek(0, os.SEEK_END)
+                self.file.write(b"\n")
+                self.file.flush()
+                line += b"\n"
+
+            self._apply(self.index, self.prefixes, tuple(record["k"]), "d" in record, offset, len(line))
+            if isinstance(record.get("v"), dict) and record["v"]:
+                whole.add(tuple(record["k"]))
+            else:
+                whole.discard(tuple(record["k"]))
+            offset += len(line)
+
+        self.size = offset
+        self.live_bytes = sum(length for _, length in self.index.values())
+        self._remember_stat()
+
+        if legacy is not None:
+            print(f"🔄 Migrating {self.filepath} to the append-only journal format")
+            self._rewrite(self._split(legacy))
+            return
+
+        # ✅ Split dicts stored whole by older versions into leaves, so their children can be deleted
+        whole = [path for path in whole if path in self.index]
+        if whole:
+            self.write_batch([("put", path, self._read(*self.index[path])) for path in whole])
+
+    @classmethod
+    def _split(cls, snapshot):
+        """Breaks a whole-memory dict into the per-leaf records the journal stores."""
+        return [leaf for key, value in snapshot.items() for leaf in cls._leaves((key,), value)]
+
+    @classmethod
+    def _leaves(cls, path, value):
+        """(path, value) of every leaf below path: values that are not dicts, and empty dicts."""
+        if not (isinstance(value, dict) and value):
+            return [(path, value)]
+        return [leaf for key, child in value.items() for leaf in cls._leaves(path + (key,), child)]
+
+    @classmethod
+    def _put_records(cls, path, value):
+        """The records of a put. A dict replaces everything below path, so its leaves follow a delete of path."""
+        if not (isinstance(value, dict) and value):
+            return [(path, {"k": list(path), "v": value})]
+        return [(path, {"k": list(path), "d": 1})] + [(leaf, {"k": list(leaf), "v": leaf_value})
+                                                       for leaf, leaf_value in cls._leaves(path, value)]
+
+    @staticmethod
+    def _apply(index, prefixes, path, deleted, offset, length):
+        """Applies one record to an offset index, replacing whatever it shadows.
+
+        Returns the change in live bytes, so writers can keep a running total.
+        """
+        change = 0
+        for shadowed in [path] + list(prefixes.pop(path, ())):
+            entry = index.pop(shadowed, None)
+            if entry is not None:
+                change -= entry[1]
+                for i in range(1, len(shadowed)):
+                    prefixes.get(shadowed[:i], set()).discard(shadowed)
+
+        if not deleted:
+            index[path] = (offset, length)
+            change += length
+            for i in range(1, len(path)):
+                prefixes.setdefault(path[:i], set()).add(path)
+        return change
+
+    # ------------------------------------------------------------------ reads
+
+    def _read(self, offset, length):
+        self.file.seek(offset)
+        return json.loads(self.fernet.decrypt(self.file.read(length).strip()).decode())["v"]
+
+    def contains(self, path):
+        with self.lock:
+            return path in self.index or bool(self.prefixes.get(path))
+
+    def get(self, path, default=None):
+        """Returns the value stored at path, decrypting only the records it needs."""
+        with self.lock:
+            entries = list(self.prefixes.get(path, ()))
+            if path in self.index:
+                if not entries:
+                    return self._read(*self.index[path])
+                entries.append(path)
+            if not entries:
+                return default
+
+            holder = {}
+            for entry in sorted(entries, key=lambda p: self.index[p][0]):
+                self._place(holder, entry, self._read(*self.index[entry]))
+            for key in path:
+                holder = holder[key]
+            return holder
+
+    def snapshot(self):
+        """Decrypts every live record into the nested dict CatiaMemory exposes."""
+        with self.lock:
+            memory = {}
+            for path, (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                self._place(memory, path, self._read(offset, length))
+            return memory
+
+    @staticmethod
+    def _place(target, path, value):
+        for key in path[:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        target[path[-1]] = value
+
+    # ------------------------------------------------------------------ writes
+
+    def put(self, path, value):
+        self._append_lines(self._put_records(tuple(path), value))
+
+    def delete(self, path):
+        path = tuple(path)
+        if self.contains(path):
+            self._append(path, {"k": list(path), "d": 1})
+
+    def put_many(self, records):
+        """Appends several (path, value) records with a single write and flush."""
+        self._append_lines([record for path, value in records for record in self._put_records(tuple(path), value)])
+
+    def write_batch(self, operations):
+        """Appends a batch of put / delete / append operations with a single write.
+
+        Operations are ("put", path, value), ("delete", path, None) and
+        ("append", path, (item, limit)); an append is stored as a put of the
+        list trimmed to its last `limit` items.
+        """
+        records, staged = [], {}  # staged: list values written earlier in this batch
+        with self.lock:
+            for action, path, value in operations:
+                path = tuple(path)
+                if action == "append":
+                    item, limit = value
+                    current = staged[path] if path in staged else self.get(path, [])
+                    staged[path] = ((current if isinstance(current, list) else []) + [item])[-limit:]
+                    records.append((path, {"k": list(path), "v": staged[path]}))
+                elif action == "put":
+                    staged[path] = value
+                    records.extend(self._put_records(path, value))
+                else:
+                    staged[path] = []
+                    records.append((path, {"k": list(path), "d": 1}))
+            self._append_lines(records)
+
+    def _append(self, path, record):
+        self._append_lines([(path, record)])
+
+    def _append_lines(self, records):
+        lines = [(path, "d" in record, self.fernet.encrypt(json.dumps(record).encode()) + b"\n")
+                 for path, record in records]
+        if not lines:
+            return
+
+        with self.lock:
+            self.file.seek(0, os.SEEK_END)
+            offset = self.file.tell()
+            self.file.write(b"".join(line for _, _, line in lines))
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+
+            for path, deleted, line in lines:
+                # ✅ Running total: a write costs O(its records), not O(entries in the store)
+                self.live_bytes += self._apply(self.index, self.prefixes, path, deleted, offset, len(line))
+                offset += len(line)
+            if self._pending is not None:
+                self._pending.extend(lines)
+
+            self.size = offset
+            self._remember_stat()
+            self._maybe_compact()
+
+    def clear(self):
+        while True:
+            self._wait_for_compaction()
+            with self.lock:
+                if self._pending is not None:
+                    continue
+                self.file.seek(0)
+                self.file.truncate()
+                self.file.flush()
+                self.index, self.prefixes = {}, {}
+                self.size = self.live_bytes = 0
+                self._remember_stat()
+                return
+
+    # ------------------------------------------------------------------ change detection
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _remember_stat(self):
+        self._known_stat = self._stat()
+
+    def changed_on_disk(self):
+        """True when another process has written the file since our last write."""
+        return self._stat() != self._known_stat
+
+    def reload(self):
+        """Reopens the file and rebuilds the index from scratch."""
+        while True:
+            self._wait_for_compaction()
+            with self.lock:
+                if self._pending is not None:
+                    continue
+                self.file.close()
+                self.index, self.prefixes = {}, {}
+                if not os.path.exists(self.filepath):
+                    open(self.filepath, "wb").close()
+                self.file = open(self.filepath, "r+b")
+                self._replay()
+                return
+
+    # ------------------------------------------------------------------ compaction
+
+    def _maybe_compact(self):
+        dead = self.size - self.live_bytes
+        if self.size >= self.compact_min_bytes and dead > self.size * self.compact_ratio:
+            self.compact()
+
+    def compact(self, wait=False):
+        """Rewrites only the live records; runs on a background thread."""
+        with self.lock:
+            if self._pending is None:
+                self._pending = []
+                entries = sorted(self.index.items(), key=lambda item: item[1][0])
+                self._compactor = threading.Thread(target=self._compact, args=(entries,), daemon=True)
+                self._compactor.start()
+        if wait:
+            self._wait_for_compaction()
+
+    def _wait_for_compaction(self):
+        compactor = self._compactor
+        if compactor is not None and compactor is not threading.current_thread():
+            compactor.join()
+
+    def _compact(self, entries):
+        temp_path = self.filepath + ".compact"
+        index, prefixes = {}, {}
+        try:
+            # Records are copied still encrypted: compaction never touches the key
+            with open(self.filepath, "rb") as source, open(temp_path, "wb") as target:
+                for path, (offset, length) in entries:
+                    source.seek(offset)
+                    self._apply(index, prefixes, path, False, target.tell(), length)
+                    target.write(source.read(length))
+
+            with self.lock:
+                with open(temp_path, "ab") as target:
+                    for path, deleted, line in self._pending:
+                        self._apply(index, prefixes, path, deleted, target.tell(), len(line))
+                        target.write(line)
+                    target.flush()
+                    os.fsync(target.fileno())
+                    size = target.tell()
+
+                self.file.close()
+                os.replace(temp_path, self.filepath)
+                self.file = open(self.filepath, "r+b")
+                self.index, self.prefixes = index, prefixes
+                self.size = size
+                self.live_bytes = sum(length for _, length in index.values())
+                self._remember_stat()
+        except OSError as error:
+            print(f"⚠ Memory compaction failed: {error}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if self.file.closed:
+                self.file = open(self.filepath, "r+b")
+        finally:
+            with self.lock:
+                self._pending = None
+                self._compactor = None
+
+    def close(self):
+        self._wait_for_compaction()
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+    def _rewrite(self, records):
+        """Replaces the whole file with the given records (used for migration)."""
+        with self.lock:
+            self.file.seek(0)
+            self.file.truncate()
+            self.index, self.prefixes = {}, {}
+            self.size = self.live_bytes = 0
+            self.put_many(records)
+            os.fsync(self.file.fileno())
@@ -1,14 +1,24 @@
-import json
 from cryptography.fernet import Fernet
 import os
-from difflib import get_close_matches
-
+import threading
+import time
+from classifier.classifier import MEMORY_CATEGORIES
+from config import Config
+from memory.cache import MemoryCache
+from memory.conversation_log import ConversationLog
+from memory.eviction import EvictionPolicy
+from memory.semantic import SemanticIndex
 
 
 class CatiaMemory:
-    def __init__(self):
-        self.filepath = "memory/catia_memory.enc"
-        self.keypath = "memory/memory_key.key"
+    CATEGORIES = ["flirtation", "jokes", "casual", "facts", "questions", "greetings", "goodbyes", "affirmations", "negations"]
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, filepath="memory/catia_memory.enc", keypath="memory/memory_key.key"):
+        self.filepath = filepath
+        self.keypath = keypath
 
         # ✅ Generate or Load Encryption Key
         if not os.path.exists(self.keypath):
@@ -21,51 +31,37 @@ class CatiaMemory:
 
         self.fernet = Fernet(self.key)
 
-        # ✅ Ensure memory file exists
-        if not os.path.exists(self.filepath):
-            with open(self.filepath, "wb") as file:
-                file.write(self.fernet.encrypt(json.dumps({}).encode()))
+        # ✅ One shared decrypted cache per file, backed by the journal or SQLite (Config.MEMORY_BACKEND)
+        self.cache = MemoryCache.shared(self.filepath, self.fernet, self.key)
+
+        # ✅ Recency and hit counts of learned responses, so the store can be capped (Config.MEMORY_MAX_ENTRIES)
+        self.cache.track_usage(self.CATEGORIES)
+        self.eviction = EvictionPolicy(Config.MEMORY_EVICTION_POLICY, Config.MEMORY_EVICTION_SAMPLE)
+
+        # ✅ Embeddings of learned inputs for paraphrase recall
+        self.semantic = SemanticIndex.shared(os.path.splitext(self.filepath)[0] + "_semantic", self.fernet)
+
+        # ✅ Append-only JSONL conversation log (migrates the old conversation_log.json)
+        self.conversation_log = ConversationLog.shared(os.path.join(os.path.dirname(self.filepath), "conversation_log.jsonl"))
+
+    @classmethod
+    def shared(cls, filepath="memory/catia_memory.enc", keypath="memory/memory_key.key"):
+        """Returns the one CatiaMemory for this file, so every component in the process uses the same store."""
+        path = os.path.abspath(filepath)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(filepath, keypath)
+            return cls._shared[path]
 
     def save_memory(self, key, value):
         """Encrypts and stores memory data while preventing overwriting similar inputs and keeping categories."""
-        memory = self.load_memory()
-
         # ✅ Ensure memory categories exist
-        categories = ["flirtation", "jokes", "casual", "facts", "questions", "greetings", "goodbyes", "affirmations", "negations"]
-        for category in categories:
-            if category not in memory:
-                memory[category] = {}
-
-        # ✅ Detect category based on user input
-        flirt_keywords = ["beautiful", "hot", "gorgeous", "sexy", "cute", "stunning", "ravishing", "luscious"]
-        joke_keywords = ["joke", "funny", "laugh"]
-        fact_keywords = ["what is", "who is", "tell me about", "explain", "define"]
-        question_keywords = ["how", "why", "when", "where", "does", "can", "is", "should", "will"]
-        greeting_keywords = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "yo", "sup"]
-        goodbye_keywords = ["bye", "goodbye", "see you", "later", "farewell", "take care"]
-        affirmation_keywords = ["yes", "yeah", "yep", "sure", "absolutely", "of course"]
-        negation_keywords = ["no", "nah", "nope", "never", "not really"]
-
-        key_lower = key.lower()
-
-        if any(word in key_lower for word in flirt_keywords):
-            category = "flirtation"
-        elif any(word in key_lower for word in joke_keywords):
-            category = "jokes"
-        elif any(word in key_lower for word in fact_keywords):
-            category = "facts"
-        elif any(word in key_lower for word in question_keywords):
-            category = "questions"
-        elif any(word in key_lower for word in greeting_keywords):
-            category = "greetings"
-        elif any(word in key_lower for word in goodbye_keywords):
-            category = "goodbyes"
-        elif any(word in key_lower for word in affirmation_keywords):
-            category = "affirmations"
-        elif any(word in key_lower for word in negation_keywords):
-            category = "negations"
-        else:
-            category = "casual"  # Default category
+        for category in self.CATEGORIES:
+            if not self.cache.contains((category,)):
+                self.cache.put((category,), {})
+
+        # ✅ Detect category based on user input (one compiled pass over all keyword tables)
+        category = MEMORY_CATEGORIES.classify(key)
 
         # ✅ Prevent saving bad responses
         bad_responses = [
@@ -82,117 +78,175 @@ class CatiaMemory:
             return
 
         # ✅ Check for similar responses before saving
-        existing_responses = self.load_memory_fuzzy(key)
+        existing_responses = self.load_memory_fuzzy(key, track=False)
 
         if existing_responses:
             print(f"🔄 Updating existing memory for similar input: {key}")
         else:
             print(f"💾 Learning new {category} response: {key} → {value}")
 
-        memory[category][key] = value
+        with self.cache.lock:
+            hits, _ = self.cache.usage.stats.get((category, key), (0, 0.0))
+            self.cache.put((category, key), value)
+            self.cache.put(("_access", category, key), [hits, time.time()])
+            self.semantic.add(category, key)
+            self._enforce_caps(category)
+
+    def _enforce_caps(self, category):
+        """Evicts a few entries if this category or the whole store is over its cap."""
+        usage = self.cache.usage
+        category_cap = Config.MEMORY_CATEGORY_CAPS.get(category)
+
+        # At most MEMORY_EVICTION_BATCH per save, so a lowered cap is reached gradually
+        for _ in range(Config.MEMORY_EVICTION_BATCH):
+            if category_cap is not None and usage.count(category) > category_cap:
+                victim = usage.victim(self.eviction, category)
+            elif Config.MEMORY_MAX_ENTRIES is not None and usage.count() > Config.MEMORY_MAX_ENTRIES:
+                victim = usage.victim(self.eviction)
+            else:
+                return
+            if victim is None:
+                return
+            print(f"🧹 Evicting {victim[0]} memory: {victim[1]}")
+            self.delete_entry(*victim)
+            usage.evictions += 1
+
+    def _touch(self, category, key):
+        """Records a recall of one learned response."""
+        with self.cache.lock:
+            hits, _ = self.cache.usage.stats.get((category, key), (0, 0.0))
+            self.cache.put(("_access", category, key), [hits + 1, time.time()])
+
+    def _count(self, found):
+        with self.cache.lock:
+            if found:
+                self.cache.usage.hits += 1
+            else:
+                self.cache.usage.misses += 1
+
+    def recall(self, user_input):
+        """Returns the learned response for this exact input, else for a confident paraphrase of it."""
+        memory = self.load_memory()
+        for category in self.cache.fuzzy.categories_of(user_input):
+            if category in self.CATEGORIES:
+                self._touch(category, user_input)
+                self._count(True)
+                return memory[category][user_input]
 
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        recalled = self.recall_semantic(user_input, track=False)
+        self._count(recalled is not None)
+        return recalled
 
-    def load_memory_fuzzy(self, user_input):
+    def load_memory_fuzzy(self, user_input, track=True):
         """Finds memory responses for similar inputs, searching in all categories."""
         memory = self.load_memory()
-        all_keys = []
 
-        # Collect all stored user inputs across categories
-        for category in memory.values():
-            if isinstance(category, dict):
-                all_keys.extend(category.keys())
+        # Find closest 3 matches (trigram index instead of scanning every stored input)
+        matches = self.cache.close_matches(user_input, n=3, cutoff=0.7)
+        found = [(category, match) for match in matches for category in self.cache.fuzzy.categories_of(match)]
 
-        # Find closest 3 matches
-        matches = get_close_matches(user_input, all_keys, n=3, cutoff=0.7)
+        if track:
+            for category, match in found:
+                if category in self.CATEGORIES:
+                    self._touch(category, match)
+            self._count(bool(found))
 
-        if matches:
-            return [memory[category][match] for match in matches for category in memory if match in memory.get(category, {})]
+        if found:
+            return [memory[category][match] for category, match in found]
 
         return None
 
+    def recall_semantic(self, user_input, threshold=None, track=True):
+        """Returns the learned response whose input means roughly the same thing, if confident enough."""
+        threshold = threshold if threshold is not None else Config.SEMANTIC_RECALL_THRESHOLD
+        memory = self.load_memory()
 
+        if not self.semantic.synced:
+            entries = [(category, key) for category in self.CATEGORIES for key in memory.get(category, {})]
+            if not self.semantic.consistent_with(entries):
+                print("🔄 Rebuilding semantic memory index")
+                self.semantic.rebuild(entries)
+            self.semantic.synced = True
+
+        for (category, key), score in self.semantic.search([user_input], k=1)[0]:
+            if score >= threshold and key in memory.get(category, {}):
+                self._touch(category, key)
+                if track:
+                    self._count(True)
+                return memory[category][key]
+
+        if track:
+            self._count(False)
+        return None
+
+    def stats(self):
+        """Learned entry counts and hit / miss / eviction counters since startup."""
+        with self.cache.lock:
+            self.cache.memory()
+            return self.cache.usage.report()
 
     def load_memory(self, user_input=None):
-        """Loads and decrypts memory data, with optional fuzzy matching."""
-        try:
-            with open(self.filepath, "rb") as file:
-                encrypted_data = file.read()
-                memory = json.loads(self.fernet.decrypt(encrypted_data).decode())
-
-                # If a user input is provided, try fuzzy recall
-                if user_input:
-                    fuzzy_responses = self.load_memory_fuzzy(user_input)
-                    if fuzzy_responses:
-                        return {"fuzzy_matches": fuzzy_responses}  # ✅ Store inside a dictionary
-
-                return memory
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        """Loads decrypted memory data (shared and cached, do not mutate), with optional fuzzy matching."""
+        # If a user input is provided, try fuzzy recall
+        if user_input:
+            fuzzy_responses = self.load_memory_fuzzy(user_input)
+            if fuzzy_responses:
+                return {"fuzzy_matches": fuzzy_responses}  # ✅ Store inside a dictionary
+
+        return self.cache.memory()
 
     def delete_memory(self, key):
         """Deletes a specific memory entry."""
-        memory = self.load_memory()
-        if key in memory:
-            del memory[key]
-            with open(self.filepath, "wb") as file:
-                file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        self.cache.delete((key,))
+        self.cache.delete(("_access", key))
+        self.semantic.remove_category(key)
+
+    def delete_entry(self, category, key):
+        """Deletes one learned response, leaving the rest of its category alone."""
+        self.cache.delete((category, key))
+        self.cache.delete(("_access", category, key))
+        self.semantic.remove(category, key)
 
     def clear_memory(self):
         """Completely clears stored memory."""
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps({}).encode()))
+        self.cache.clear()
+        self.semantic.clear()
 
     def save_conversation(self, user_input, response):
-        """Stores full conversation history securely."""
-        history = self.load_conversation()
-        history.append({"user": user_input, "catia": response})
-        with open("memory/conversation_log.json", "w") as file:
-            file.write(json.dumps(history, indent=4))
-
-    def load_conversation(self):
-        """Loads past conversations."""
-        try:
-            with open("memory/conversation_log.json", "r") as file:
-                return json.loads(file.read())
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        """Appends one turn to the conversation log."""
+        self.conversation_log.append({"user": user_input, "catia": response})
+
+    def load_conversation(self, offset=0, limit=None):
+        """Streams past conversations oldest first; pass limit to get one page as a list."""
+        if limit is not None:
+            return self.conversation_log.page(offset, limit)
+        return self.conversation_log.read()
+
+    def tail_conversation(self, count=20):
+        """Returns the most recent turns without reading the whole log."""
+        return self.conversation_log.tail(count)
 
     def store_interaction(self, user_input, catia_response):
         """Stores full interactions securely."""
-        memory = self.load_memory()
-        if "conversation_history" not in memory:
-            memory["conversation_history"] = []
-        memory["conversation_history"].append({"user": user_input, "catia": catia_response})
-
         # Keep memory manageable (only store last 20 interactions)
-        memory["conversation_history"] = memory["conversation_history"][-20:]
-
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        self.cache.append(("conversation_history",), {"user": user_input, "catia": catia_response}, 20)
 
     def save_feedback(self, user_input, correct_response):
         """Stores feedback and tracks repeated mistakes to improve learning."""
-        memory = self.load_memory()
-        
-        if "incorrect_responses" not in memory:
-            memory["incorrect_responses"] = {}
+        feedback = self.cache.get(("incorrect_responses", user_input))
 
         # Track mistakes count
-        if user_input in memory["incorrect_responses"]:
-            memory["incorrect_responses"][user_input]["count"] += 1
+        if feedback:
+            feedback = dict(feedback, count=feedback["count"] + 1)
         else:
-            memory["incorrect_responses"][user_input] = {"response": correct_response, "count": 1}
+            feedback = {"response": correct_response, "count": 1}
 
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        self.cache.put(("incorrect_responses", user_input), feedback)
 
 
     def get_feedback(self, user_input):
         """Retrieves corrected responses if available (fixes mistakes immediately)."""
-        memory = self.load_memory()
-        feedback_data = memory.get("incorrect_responses", {}).get(user_input)
+        feedback_data = self.cache.get(("incorrect_responses", user_input))
 
         if feedback_data:  # Apply correction immediately instead of waiting for 3 mistakes
             return feedback_data["response"]
@@ -202,25 +256,13 @@ class CatiaMemory:
 
     def save_emotion(self, emotion):
         """Stores the last 5 detected emotions securely."""
-        memory = self.load_memory()
-        
-        if "_past_emotions" not in memory:
-            memory["_past_emotions"] = []
-
-        memory["_past_emotions"].append(emotion)
-
         # Keep only last 5 emotions to avoid overflow
-        memory["_past_emotions"] = memory["_past_emotions"][-5:]
-
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        self.cache.append(("_past_emotions",), emotion, 5)
 
 
     def load_emotion(self):
         """Loads the most recent emotion and checks for trends."""
-        memory = self.load_memory()
-        
-        emotions = memory.get("_past_emotions", ["neutral"])
+        emotions = self.cache.get(("_past_emotions",), ["neutral"])
 
         if len(emotions) >= 3 and all(e == emotions[-1] for e in emotions[-3:]):
             return f"{emotions[-1]} (strong trend detected)"  # Adds trend awareness
@@ -229,15 +271,11 @@ class CatiaMemory:
 
     def save_recent_topic(self, user_input):
         """Tracks the last discussed topic to maintain context."""
-        memory = self.load_memory()
-        memory["_last_topic"] = user_input  # Store the last user query
-        with open(self.filepath, "wb") as file:
-            file.write(self.fernet.encrypt(json.dumps(memory).encode()))
+        self.cache.put(("_last_topic",), user_input)  # Store the last user query
 
     def get_recent_topic(self):
         """Retrieves the last discussed topic for context-aware responses."""
-        memory = self.load_memory()
-        return memory.get("_last_topic", None)
+        return self.cache.get(("_last_topic",))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from config import Config
+from memory.journal import EncryptedJournal
+
+
+class SemanticIndex:
+    """Hashed TF-IDF embeddings of stored inputs in a memory-mapped float32 matrix.
+
+    Row i of `<base>.npy` is the unit-length embedding of one learned input;
+    which (category, input) a row belongs to, the document frequencies and the
+    row count live in an encrypted journal next to it (`<base>.enc`), so the
+    plaintext inputs never hit the disk. Lookups are one matrix product.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, basepath, fernet, dim=None, capacity=1024):
+        self.matrix_path = basepath + ".npy"
+        self.meta = EncryptedJournal(basepath + ".enc", fernet)
+        self.dim = dim or Config.SEMANTIC_DIM
+        self.lock = threading.RLock()
+        self.synced = False  # Set once the rows have been checked against the memory store
+
+        self.rows = {}   # row number -> (category, key)
+        self.lookup = {}  # (category, key) -> row number
+        self.df = np.zeros(self.dim, dtype=np.float32)
+        whole_df = self.meta.get(("df",)) if ("df",) in self.meta.index else None  # Older indexes saved it whole
+        if isinstance(whole_df, list) and len(whole_df) == self.dim:
+            self.df[:] = whole_df
+        for path in list(self.meta.index):
+            if path[0] == "row":
+                entry = tuple(self.meta.get(path))
+                self.rows[int(path[1])] = entry
+                self.lookup[entry] = int(path[1])
+            elif path[0] == "df" and len(path) == 2 and int(path[1]) < self.dim:
+                self.df[int(path[1])] = self.meta.get(path)
+        self.count = self.meta.get(("count",), 0)
+        if whole_df is not None:
+            # ✅ One-time move to a record per bucket; deleting ("df",) first also drops any stale buckets
+            self.meta.write_batch([("delete", ("df",), None)]
+                                  + [("put", path, value) for path, value in self._df_records(np.flatnonzero(self.df))])
+        self.free = [row for row in range(self.count) if row not in self.rows]
+
+        if os.path.exists(self.matrix_path):
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+            if self.matrix.shape[1] != self.dim:
+                print("⚠ Semantic index dimension changed, starting a new one")
+                self.clear()
+        else:
+            self.matrix = np.lib.format.open_memmap(self.matrix_path, mode="w+", dtype=np.float32,
+                                                    shape=(capacity, self.dim))
+
+    @classmethod
+    def shared(cls, basepath, fernet):
+        path = os.path.abspath(basepath)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(basepath, fernet)
+            return cls._shared[path]
+
+    # ------------------------------------------------------------------ embedding
+
+    def _features(self, text):
+        """Hashes words and word bigrams into buckets; crc32 keeps buckets stable across runs."""
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        counts = {}
+        for term in terms:
+            bucket = zlib.crc32(term.encode()) % self.dim
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def _embed(self, counts):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not counts:
+            return vector
+        buckets = np.fromiter(counts.keys(), dtype=np.int64)
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))
+        idf = np.log((1.0 + len(self.rows)) / (1.0 + self.df[buckets])) + 1.0
+        vector[buckets] = tf * idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # ------------------------------------------------------------------ updates
+
+    def add(self, category, key):
+        with self.lock:
+            if (category, key) in self.lookup:
+                return
+            counts = self._features(key)
+            self.df[list(counts)] += 1
+
+            row = self.free.pop() if self.free else self.count
+            if row >= self.matrix.shape[0]:
+                self._grow(row + 1)
+            self.matrix[row] = self._embed(counts)
+            self.matrix.flush()
+
+            self.rows[row] = (category, key)
+            self.lookup[(category, key)] = row
+            self.count = max(self.count, row + 1)
+            self.meta.put_many([(("row", str(row)), [category, key]), (("count",), self.count)]
+                               + self._df_records(counts))
+
+    def remove(self, category, key):
+        with self.lock:
+            row = self.lookup.pop((category, key), None)
+            if row is None:
+                return
+            del self.rows[row]
+            self.free.append(row)
+            buckets = list(self._features(key))
+            self.df[buckets] -= 1
+            self.matrix[row] = 0.0
+            self.matrix.flush()
+            self.meta.write_batch([("delete", ("row", str(row)), None)]
+                                  + [("put", path, value) for path, value in self._df_records(buckets)])
+
+    def remove_category(self, category):
+        with self.lock:
+            for entry in [entry for entry in self.lookup if entry[0] == category]:
+                self.remove(*entry)
+
+    def _df_records(self, buckets):
+        """Journal records for just these document frequencies, so a save costs O(key), not O(dim)."""
+        return [(("df", str(bucket)), int(self.df[bucket])) for bucket in buckets]
+
+    def _grow(self, rows):
+        """Doubles the matrix capacity until it holds `rows`; the file is swapped in place of the old one."""
+        capacity = self.matrix.shape[0]
+        while capacity < rows:
+            capacity *= 2
+        temp_path = self.matrix_path + ".grow.npy"
+        grown = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        used = min(self.count, self.matrix.shape[0])  # Only rows the old matrix actually holds
+        grown[:used] = self.matrix[:used]
+        grown.flush()
+        del grown
+        del self.matrix
+        os.replace(temp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+
+    def rebuild(self, entries):
+        """Re-embeds every (category, key) from scratch with up-to-date IDF weights."""
+        with self.lock:
+            self.clear()
+            entries = list(entries)
+            if len(entries) > self.matrix.shape[0]:
+                self._grow(len(entries))  # Before count is set, while the fresh matrix has nothing to copy
+            for category, key in entries:
+                self.df[list(self._features(key))] += 1
+                self.rows[len(self.rows)] = (category, key)
+            self.count = len(self.rows)
+            for row, (category, key) in self.rows.items():
+                self.matrix[row] = self._embed(self._features(key))
+                self.lookup[(category, key)] = row
+            self.matrix.flush()
+            self.meta.put_many([(("row", str(row)), list(entry)) for row, entry in self.rows.items()]
+                               + [(("count",), self.count)] + self._df_records(np.flatnonzero(self.df)))
+
+    def clear(self):
+        with self.lock:
+            self.rows, self.lookup, self.free = {}, {}, []
+            self.count = 0
+            self.df = np.zeros(self.dim, dtype=np.float32)
+            self.meta.clear()
+            if hasattr(self, "matrix"):
+                del self.matrix
+            self.matrix = np.lib.format.open_memmap(self.matrix_path, mode="w+", dtype=np.float32,
+                                                    shape=(1024, self.dim))
+
+    # ------------------------------------------------------------------ queries
+
+    def search(self, queries, k=3):
+        """Batched cosine top-k: returns, per query, a list of ((category, key), score)."""
+        with self.lock:
+            if not self.rows:
+                return [[] for _ in queries]
+            embedded = np.stack([self._embed(self._features(query)) for query in queries])
+            scores = embedded @ self.matrix[:self.count].T
+
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for query_scores, candidates in zip(scores, top):
+                ranked = candidates[np.argsort(-query_scores[candidates])]
+                results.append([(self.rows[row], float(query_scores[row]))
+                                for row in ranked if row in self.rows and query_scores[row] > 0])
+            return results
+
+    def consistent_with(self, entries):
+        """True when the index covers exactly these (category, key) entries."""
+        return set(self.lookup) == set(entries)
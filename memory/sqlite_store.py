@@ -0,0 +1,232 @@
+import hashlib
+import hmac
+import json
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """SQLite memory backend with per-row Fernet encryption.
+
+    Offers the same interface as EncryptedJournal (snapshot, write_batch,
+    changed_on_disk, reload, clear, close), so MemoryCache can sit on either.
+    Learned responses, conversation history, feedback, emotions and topics
+    each get their own table; the "_access" stats of a learned response are
+    two plain columns on its row. Inputs are stored encrypted and looked up by an
+    HMAC of the input under the memory key, so every update is one indexed
+    statement. The database runs in WAL mode, so readers such as the GUI's
+    Memory Manager are not blocked while the assistant writes.
+    """
+
+    LISTS = {"conversation_history": "history", "_past_emotions": "emotions"}
+    FEEDBACK = "incorrect_responses"
+    ACCESS = "_access"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS learned (
+            category TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            input BLOB NOT NULL,
+            value BLOB NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_used REAL,
+            PRIMARY KEY (category, input_hash)
+        );
+        CREATE INDEX IF NOT EXISTS learned_input ON learned (input_hash);
+        CREATE TABLE IF NOT EXISTS feedback (
+            input_hash TEXT PRIMARY KEY,
+            input BLOB NOT NULL,
+            response BLOB NOT NULL,
+            count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, entry BLOB NOT NULL);
+        CREATE TABLE IF NOT EXISTS emotions (id INTEGER PRIMARY KEY AUTOINCREMENT, entry BLOB NOT NULL);
+        CREATE TABLE IF NOT EXISTS topics (name TEXT PRIMARY KEY, value BLOB NOT NULL);
+    """
+
+    def __init__(self, filepath, fernet, key):
+        self.filepath = filepath
+        self.fernet = fernet
+        self.hash_key = hashlib.sha256(b"catia-memory-index" + key).digest()
+        self.lock = threading.RLock()
+
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+        self._migrate()
+        self._known_version = self._data_version()
+
+    def _migrate(self):
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(learned)")}
+        with self.connection:
+            if "hits" not in columns:
+                self.connection.execute("ALTER TABLE learned ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+            if "last_used" not in columns:
+                self.connection.execute("ALTER TABLE learned ADD COLUMN last_used REAL")
+
+    # ------------------------------------------------------------------ helpers
+
+    def _hash(self, text):
+        return hmac.new(self.hash_key, text.encode(), hashlib.sha256).hexdigest()
+
+    def _encrypt(self, value):
+        return self.fernet.encrypt(json.dumps(value).encode())
+
+    def _decrypt(self, blob):
+        return json.loads(self.fernet.decrypt(bytes(blob)).decode())
+
+    def _data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def is_empty(self):
+        with self.lock:
+            tables = ["categories", "learned", "feedback", "history", "emotions", "topics"]
+            return not any(self.connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in tables)
+
+    # ------------------------------------------------------------------ reads
+
+    def snapshot(self):
+        with self.lock:
+            execute = self.connection.execute
+            memory = {}
+            for (name,) in execute("SELECT name FROM categories"):
+                memory[name] = {}
+            access = {}
+            rows = execute("SELECT category, input, value, hits, last_used FROM learned ORDER BY rowid")
+            for category, raw_input, value, hits, last_used in rows:
+                key = self._decrypt(raw_input)
+                memory.setdefault(category, {})[key] = self._decrypt(value)
+                if last_used is not None:
+                    access.setdefault(category, {})[key] = [hits, last_used]
+            if access:
+                memory[self.ACCESS] = access
+
+            feedback = execute("SELECT input, response, count FROM feedback ORDER BY rowid").fetchall()
+            if feedback:
+                memory[self.FEEDBACK] = {self._decrypt(raw_input): {"response": self._decrypt(response), "count": count}
+                                         for raw_input, response, count in feedback}
+
+            for name, table in self.LISTS.items():
+                entries = execute(f"SELECT entry FROM {table} ORDER BY id").fetchall()
+                if entries:
+                    memory[name] = [self._decrypt(entry) for (entry,) in entries]
+
+            for name, value in execute("SELECT name, value FROM topics"):
+                memory[name] = self._decrypt(value)
+            return memory
+
+    # ------------------------------------------------------------------ writes
+
+    def write_batch(self, operations):
+        """Applies put / delete / append operations in one transaction."""
+        with self.lock, self.connection:
+            for action, path, value in operations:
+                if action == "append":
+                    self._append(path[0], *value)
+                elif action == "put":
+                    self._put(tuple(path), value)
+                else:
+                    self._delete(tuple(path))
+            self._known_version = self._data_version()
+
+    def _put(self, path, value):
+        execute = self.connection.execute
+        name = path[0]
+
+        if name == self.ACCESS:
+            self._put_access(path, value)
+        elif len(path) == 2 and name == self.FEEDBACK:
+            execute("INSERT INTO feedback (input_hash, input, response, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (input_hash) DO UPDATE SET response = excluded.response, count = excluded.count",
+                    (self._hash(path[1]), self._encrypt(path[1]), self._encrypt(value["response"]), value["count"]))
+        elif len(path) == 2:
+            execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            execute("INSERT INTO learned (category, input_hash, input, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (category, input_hash) DO UPDATE SET value = excluded.value",
+                    (name, self._hash(path[1]), self._encrypt(path[1]), self._encrypt(value)))
+        elif len(path) == 1:
+            self._delete(path)
+            if name in self.LISTS and isinstance(value, list):
+                self.connection.executemany(f"INSERT INTO {self.LISTS[name]} (entry) VALUES (?)",
+                                            [(self._encrypt(entry),) for entry in value])
+            elif isinstance(value, dict):
+                if name != self.FEEDBACK:
+                    execute("INSERT INTO categories (name) VALUES (?)", (name,))
+                for child, child_value in value.items():
+                    self._put((name, child), child_value)
+            else:
+                execute("INSERT INTO topics (name, value) VALUES (?, ?)", (name, self._encrypt(value)))
+        else:
+            raise ValueError(f"SQLite memory store cannot hold path {path!r}")
+
+    def _put_access(self, path, value):
+        if len(path) == 3:
+            self.connection.execute("UPDATE learned SET hits = ?, last_used = ? WHERE category = ? AND input_hash = ?",
+                                    (value[0], value[1], path[1], self._hash(path[2])))
+        elif len(path) > 3:
+            raise ValueError(f"SQLite memory store cannot hold path {path!r}")
+        else:
+            self._delete_access(path)
+            for child, child_value in value.items():
+                self._put_access(path + (child,), child_value)
+
+    def _delete_access(self, path):
+        reset = "UPDATE learned SET hits = 0, last_used = NULL"
+        if len(path) == 1:
+            self.connection.execute(reset)
+        elif len(path) == 2:
+            self.connection.execute(reset + " WHERE category = ?", (path[1],))
+        else:
+            self.connection.execute(reset + " WHERE category = ? AND input_hash = ?", (path[1], self._hash(path[2])))
+
+    def _append(self, name, item, limit):
+        table = self.LISTS.get(name)
+        if table is None:
+            raise ValueError(f"SQLite memory store has no list named {name!r}")
+        self.connection.execute(f"INSERT INTO {table} (entry) VALUES (?)", (self._encrypt(item),))
+        self.connection.execute(f"DELETE FROM {table} WHERE id <= (SELECT MAX(id) FROM {table}) - ?", (limit,))
+
+    def _delete(self, path):
+        execute = self.connection.execute
+        name = path[0]
+
+        if name == self.ACCESS:
+            self._delete_access(path)
+            return
+        if len(path) == 2:
+            if name == self.FEEDBACK:
+                execute("DELETE FROM feedback WHERE input_hash = ?", (self._hash(path[1]),))
+            else:
+                execute("DELETE FROM learned WHERE category = ? AND input_hash = ?", (name, self._hash(path[1])))
+            return
+
+        if name in self.LISTS:
+            execute(f"DELETE FROM {self.LISTS[name]}")
+        if name == self.FEEDBACK:
+            execute("DELETE FROM feedback")
+        execute("DELETE FROM learned WHERE category = ?", (name,))
+        execute("DELETE FROM categories WHERE name = ?", (name,))
+        execute("DELETE FROM topics WHERE name = ?", (name,))
+
+    def clear(self):
+        with self.lock, self.connection:
+            for table in ["categories", "learned", "feedback", "history", "emotions", "topics"]:
+                self.connection.execute(f"DELETE FROM {table}")
+            self._known_version = self._data_version()
+
+    # ------------------------------------------------------------------ change detection
+
+    def changed_on_disk(self):
+        """True when another connection has committed since our last write."""
+        with self.lock:
+            return self._data_version() != self._known_version
+
+    def reload(self):
+        with self.lock:
+            self._known_version = self._data_version()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,277 @@
+"""Builds the offline Wikipedia index (search.wikipedia) from a Wikipedia dump.
+
+Takes either dump from https://dumps.wikimedia.org/enwiki/latest/:
+pages-articles (.xml.bz2; the lead paragraph of each article is pulled out
+of its wikitext, and redirects become extra titles) or abstracts (.xml.gz).
+The dump is decompressed and parsed as a stream, so it never has to fit in
+memory or be unpacked on disk.
+
+The main process only reads the XML. Batches of pages go to a pool of
+worker processes, which pull out abstracts, tokenize them and invert each
+batch into a sorted segment file on disk. The segments are then merged,
+term by term, into the final posting lists. The new index is built next to
+the old one and swapped in when complete.
+
+Run from the project root:
+    python -m search.build_wikipedia enwiki-latest-pages-articles.xml.bz2
+"""
+import argparse
+import bz2
+import gzip
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from array import array
+from collections import Counter, deque
+import numpy as np
+from config import Config
+from search.extract import good_snippet
+from search.wikipedia import title_key, tokenize
+
+SKIPPED_NAMESPACES = ("file", "image", "category", "media")  # Links into these are not prose
+DISAMBIGUATION = re.compile(r"\{\{\s*(?:disambiguation|disambig|dab|set index)", re.IGNORECASE)
+
+
+def open_dump(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")  # Multistream dumps are read through as one stream
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_pages(path):
+    """Yields (title, text, redirect target, is wikitext) for every article in the dump, as it is read."""
+    with open_dump(path) as file:
+        root = None
+        for event, element in ElementTree.iterparse(file, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end":
+                continue
+            tag = element.tag.rsplit("}", 1)[-1]
+            if tag == "page":
+                fields = {child.tag.rsplit("}", 1)[-1]: child for child in element.iter()}
+                if fields.get("ns") is not None and fields["ns"].text == "0":
+                    redirect = fields.get("redirect")
+                    text = fields["text"].text if "text" in fields else None
+                    yield (fields["title"].text, text or "",
+                           None if redirect is None else redirect.get("title"), True)
+                root.clear()  # Keeps memory flat however long the dump is
+            elif tag == "doc":
+                title = element.findtext("title") or ""
+                yield title.split(": ", 1)[-1], element.findtext("abstract") or "", None, False
+                root.clear()
+
+
+def abstract_from_wikitext(text, limit=600):
+    """The lead paragraph of an article's wikitext as plain text, cut at a sentence near `limit` characters."""
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    text = re.sub(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", "", text, flags=re.DOTALL | re.IGNORECASE)
+    while True:  # Innermost templates and tables first, so nested ones come out whole
+        text, count = re.subn(r"\{\{[^{}]*\}\}|\{\|[^{}]*?\|\}", "", text)
+        if not count:
+            break
+
+    def link(match):
+        target, _, label = match.group(1).partition("|")
+        if target.split(":", 1)[0].strip().lower() in SKIPPED_NAMESPACES:
+            return ""
+        return label.rsplit("|", 1)[-1] if label else target
+
+    while True:  # Innermost links first; file captions hold links of their own
+        text, count = re.subn(r"\[\[([^\[\]]*)\]\]", link, text)
+        if not count:
+            break
+    text = re.sub(r"\[https?://\S+ ([^\]]*)\]|\[https?://\S+\]", r"\1", text)
+    text = re.sub(r"<[^>]+>|'{2,}", "", text)
+
+    for paragraph in text.split("\n\n"):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph or paragraph[0] in "=*#:;|!{}[]" or not good_snippet(paragraph):
+            continue
+        if len(paragraph) > limit:
+            cut = paragraph.rfind(". ", 0, limit)
+            paragraph = paragraph[:cut + 1] if cut > 0 else paragraph[:limit].rsplit(" ", 1)[0] + "…"
+        return paragraph
+    return None
+
+
+def index_batch(pages, segment_path):
+    """Worker body: the abstracts and lengths of one batch, with its inverted index written to segment_path.
+
+    Document ids in the segment are local to the batch; the merge offsets them.
+    """
+    docs, lengths, inverted = [], array("I"), {}
+    for title, text, is_wikitext in pages:
+        if is_wikitext and DISAMBIGUATION.search(text):
+            continue
+        abstract = abstract_from_wikitext(text) if is_wikitext else " ".join(text.split())
+        if not abstract or not good_snippet(abstract):
+            continue
+        counts = Counter(tokenize(f"{title} {abstract}"))
+        for term, count in counts.items():
+            inverted.setdefault(term, []).append((len(docs), count))
+        lengths.append(sum(counts.values()))
+        docs.append((title, abstract))
+
+    postings = 0
+    with open(segment_path, "wb") as file:
+        for term in sorted(inverted):
+            ids, freqs = zip(*inverted[term])
+            postings += len(ids)
+            pickle.dump((term, np.array(ids, dtype=np.uint32), np.array(freqs, dtype=np.uint16)), file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    return docs, lengths, postings
+
+
+def read_segment(path, batch):
+    with open(path, "rb") as file:
+        while True:
+            try:
+                term, ids, freqs = pickle.load(file)
+            except EOFError:
+                return
+            yield term, batch, ids, freqs
+
+
+def write_strings(blob_path, offsets_path, strings):
+    """Packs strings into one file, with their boundaries in an .npy array (the layout StringTable reads)."""
+    offsets = array("Q", [0])
+    with open(blob_path, "wb") as file:
+        for string in strings:
+            data = string.encode("utf-8")
+            file.write(data)
+            offsets.append(offsets[-1] + len(data))
+    np.save(offsets_path, np.array(offsets, dtype=np.uint64))
+
+
+def build(dump, directory, workers=None, batch_size=20000):
+    """Indexes dump into directory, replacing any index there once the new one is complete."""
+    start = time.time()
+    building = directory.rstrip(os.sep) + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    segments = tempfile.mkdtemp(prefix="segments-", dir=building)
+    workers = workers or os.cpu_count() or 1
+
+    batches = []  # (segment path, first document id, postings) per batch, in document order
+    doc_lengths = array("I")
+    titles = {}  # title key -> document id
+    redirects = []  # (title key, target title)
+    documents = 0
+
+    with open(os.path.join(building, "docs.bin"), "wb") as docs_file:
+        doc_offsets = array("Q", [0])
+
+        def collect(result, segment_path):
+            nonlocal documents
+            docs, lengths, postings = result.get()
+            batches.append((segment_path, documents, postings))
+            for title, abstract in docs:
+                data = f"{title}\n{abstract}".encode("utf-8")
+                docs_file.write(data)
+                doc_offsets.append(doc_offsets[-1] + len(data))
+                titles.setdefault(title_key(title), documents)
+                documents += 1
+            doc_lengths.extend(lengths)
+            print(f"📦 {documents} articles indexed ({time.time() - start:.0f}s)")
+
+        # ✅ Spawned workers, at most two batches queued per worker, so the reader never runs far ahead
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            in_flight = deque()
+
+            def submit(batch):
+                segment_path = os.path.join(segments, f"{len(batches) + len(in_flight):06d}.seg")
+                in_flight.append((pool.apply_async(index_batch, (batch, segment_path)), segment_path))
+                if len(in_flight) >= 2 * workers:
+                    collect(*in_flight.popleft())
+
+            batch = []
+            for title, text, redirect, is_wikitext in read_pages(dump):
+                if redirect is not None:
+                    redirects.append((title_key(title), redirect.split("#", 1)[0]))
+                    continue
+                batch.append((title, text, is_wikitext))
+                if len(batch) >= batch_size:
+                    submit(batch)
+                    batch = []
+            if batch:
+                submit(batch)
+            while in_flight:
+                collect(*in_flight.popleft())
+        np.save(os.path.join(building, "doc_offsets.npy"), np.array(doc_offsets, dtype=np.uint64))
+    np.save(os.path.join(building, "doc_lengths.npy"), np.array(doc_lengths, dtype=np.uint32))
+
+    print(f"📦 Merging {len(batches)} segments...")
+    total = sum(postings for _, _, postings in batches)
+    postings = np.lib.format.open_memmap(os.path.join(building, "postings.npy"), mode="w+", dtype=np.uint32,
+                                         shape=(total,))
+    freqs = np.lib.format.open_memmap(os.path.join(building, "freqs.npy"), mode="w+", dtype=np.uint16,
+                                      shape=(total,))
+    posting_offsets = array("Q", [0])
+    merged = heapq.merge(*(read_segment(path, batch) for batch, (path, _, _) in enumerate(batches)),
+                         key=lambda entry: (entry[0], entry[1]))
+
+    def terms():
+        cursor = 0
+        for term, entries in itertools.groupby(merged, key=lambda entry: entry[0]):
+            for _, batch, ids, counts in entries:  # Batches in order, so document ids stay ascending
+                postings[cursor:cursor + len(ids)] = ids + batches[batch][1]
+                freqs[cursor:cursor + len(ids)] = counts
+                cursor += len(ids)
+            posting_offsets.append(cursor)
+            yield term
+
+    write_strings(os.path.join(building, "terms.bin"), os.path.join(building, "term_offsets.npy"), terms())
+    np.save(os.path.join(building, "posting_offsets.npy"), np.array(posting_offsets, dtype=np.uint64))
+    postings.flush()
+    freqs.flush()
+    del postings, freqs
+    shutil.rmtree(segments)
+
+    # ✅ Redirects point at their target's document, so a title lookup never needs a second hop
+    for key, target in redirects:
+        doc_id = titles.get(title_key(target))
+        if doc_id is not None:
+            titles.setdefault(key, doc_id)
+    keys = sorted(titles, key=lambda key: key.encode("utf-8"))  # The order StringTable.find searches in
+    write_strings(os.path.join(building, "titles.bin"), os.path.join(building, "title_offsets.npy"), keys)
+    np.save(os.path.join(building, "title_docs.npy"), np.array([titles[key] for key in keys], dtype=np.uint32))
+
+    meta = {"documents": documents, "average_length": sum(doc_lengths) / max(documents, 1),
+            "terms": len(posting_offsets) - 1, "postings": total, "titles": len(keys),
+            "dump": os.path.basename(dump), "built": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(os.path.join(building, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump(meta, file, indent=4)
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(building, directory)
+    print(f"✅ Indexed {documents} articles, {meta['terms']} terms and {len(keys)} titles into {directory} "
+          f"in {time.time() - start:.0f}s")
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dump", help="Path to a pages-articles .xml.bz2 or abstract .xml.gz dump")
+    parser.add_argument("--output", default=Config.WIKI_INDEX_DIR)
+    parser.add_argument("--workers", type=int, default=Config.WIKI_BUILD_WORKERS,
+                        help="Worker processes (default: one per core)")
+    parser.add_argument("--batch-size", type=int, default=20000,
+                        help="Articles per worker batch; each leaves one segment file open during the merge")
+    args = parser.parse_args()
+    build(args.dump, args.output, args.workers, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+
+def normalize(query):
+    """The cache key form of a query: lower case, single spaces, no surrounding punctuation."""
+    return re.sub(r"\s+", " ", query.lower()).strip(" \t?!.,;:'\"")
+
+
+class AnswerCache:
+    """Extracted search answers on disk, one small JSON file per normalized query.
+
+    Files are named by the SHA-256 of the scope and normalized query, so
+    lookups never scan the directory. An answer is fresh for `ttl` seconds,
+    and stale but still usable for `stale_ttl` seconds after that. The
+    caller serves a stale answer at once and refreshes it in the
+    background. Once the files pass `max_bytes`, the least recently used
+    ones (by mtime, bumped on every hit) are evicted.
+    """
+
+    def __init__(self, directory, ttl=24 * 3600, stale_ttl=7 * 24 * 3600, max_bytes=20 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.sizes = {}  # path -> bytes, for eviction without rescanning
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    self.sizes[path] = os.path.getsize(path)
+        self.bytes = sum(self.sizes.values())
+
+    def _path(self, query, scope):
+        digest = hashlib.sha256(f"{scope}\0{normalize(query)}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ".json")
+
+    def get(self, query, scope="web"):
+        """(answer, fresh) for the query, or None when it is not cached or too old to serve."""
+        path = self._path(query, scope)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        age = time.time() - entry["stored"]
+        if age > self.ttl + self.stale_ttl:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Recently used; evicted last
+        except OSError:
+            pass
+        return entry["answer"], age <= self.ttl
+
+    def put(self, query, answer, scope="web"):
+        path = self._path(query, scope)
+        data = json.dumps({"query": normalize(query), "scope": scope, "answer": answer, "stored": time.time()})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary, path)  # Readers see the old entry or the new one, never half of one
+
+        with self.lock:
+            self.bytes += len(data.encode("utf-8")) - self.sizes.get(path, 0)
+            self.sizes[path] = len(data.encode("utf-8"))
+        if self.bytes > self.max_bytes:
+            self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.bytes -= self.sizes.pop(path, 0)
+
+    def _evict(self):
+        """Deletes least recently used answers until the cache is back under 90% of max_bytes."""
+        def last_used(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0.0
+
+        with self.lock:
+            paths = sorted(self.sizes, key=last_used)
+        evicted = 0
+        for path in paths:
+            if self.bytes <= self.max_bytes * 0.9:
+                break
+            self._remove(path)
+            evicted += 1
+        print(f"🧹 Evicted {evicted} cached search answers")
+
+    def clear(self):
+        with self.lock:
+            paths = list(self.sizes)
+        for path in paths:
+            self._remove(path)
@@ -0,0 +1,84 @@
+import codecs
+import random
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SearchClient:
+    """HTTP for search: one keep-alive session per host and a user-agent pool built once.
+
+    Reusing a host's session reuses its TCP and TLS connections, so only
+    the first request to a host pays for the handshake. fake_useragent is
+    slow to initialise, so `pool_size` user agents are drawn from it once
+    and rotated from then on.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_size=20, connections=4):
+        self.connections = connections
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.user_agents = self._load_user_agents(pool_size)
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _load_user_agents(pool_size):
+        from fake_useragent import UserAgent
+
+        agents = UserAgent()
+        return list({agents.random for _ in range(pool_size)})
+
+    def session(self, url):
+        """The keep-alive session for url's host, created on first use."""
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+            return self.sessions[host]
+
+    def stream(self, url, timeout=5.0, cancelled=None, chunk_size=16384):
+        """GETs url and yields its body as decoded text, chunk by chunk.
+
+        Stops early, leaving the rest undownloaded, when `cancelled` is set or
+        the caller stops iterating. Raises requests.HTTPError for anything but
+        a 200.
+        """
+        headers = {"User-Agent": random.choice(self.user_agents)}
+        with self.session(url).get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            for chunk in response.iter_content(chunk_size):
+                if cancelled is not None and cancelled.is_set():
+                    return
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield text
+
+    def get(self, url, timeout=5.0, cancelled=None):
+        """The whole body of url as text, or None if `cancelled` was set while downloading."""
+        pieces = list(self.stream(url, timeout, cancelled))
+        return None if cancelled is not None and cancelled.is_set() else "".join(pieces)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+import requests
+from config import Config
+from search.cache import AnswerCache
+from search.client import SearchClient
+from search.extract import snippet_parser
+from search.health import HealthTracker, SourceHealth
+from search.wikipedia import WikiIndex
+
+# (name, URL template, tag holding the answer), in the order they used to be tried
+SOURCES = [
+    ("Google", "https://www.google.com/search?q={query}", "span"),
+    ("DuckDuckGo", "https://html.duckduckgo.com/html/?q={query}", "div"),
+    ("Bing", "https://www.bing.com/search?q={query}", "p"),
+    ("Wikipedia", "https://en.wikipedia.org/w/index.php?search={query}", "p"),
+]
+
+
+class SearchEngine:
+    """Sends a query to every source at once and returns the first answer that passes the quality filter.
+
+    Each source is fetched on its own worker thread and awaited from an
+    asyncio task. Pages are parsed as they download, and a download stops
+    as soon as its snippet is found. As soon as one answer passes the
+    quality filter, the remaining tasks are cancelled, and their downloads
+    stop at the next chunk. The whole race is bounded by `deadline` seconds,
+    so the worst case is about one timeout rather than one timeout per
+    source. Sources whose circuit breaker is open are not asked at all, and
+    the rest are started best first (see search.health).
+
+    With a `cache`, a fresh answer is served from disk without any request.
+    A stale one is served at once too, and refreshed in the background.
+    With a `wiki` index, queries that Wikipedia would be asked are first
+    answered from it offline, and the network is used only when it has no
+    answer.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, sources=SOURCES, timeout=5.0, deadline=6.0, parser=snippet_parser, client=None, cache=None,
+                 wiki=None, health=None):
+        self.sources = list(sources)
+        self.timeout = timeout
+        self.deadline = deadline
+        self.parser = parser  # tag -> object with feed(text) and close(), both returning the snippet or None
+        self.client = client or SearchClient.shared()
+        self.cache = cache
+        self.wiki = wiki
+        self.health = health or HealthTracker([name for name, _, _ in self.sources])
+        self.wiki_stats = SourceHealth("Wikipedia (offline)", min_success=0.0)  # Only counted; it has no breaker
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(self.sources), thread_name_prefix="catia-search")
+        self.refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catia-search-refresh")
+        self.refreshing = set()
+        self.refreshing_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """The process-wide engine, configured from Config.SEARCH_*; its health stats cover every caller."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cache = AnswerCache(Config.SEARCH_CACHE_DIR, Config.SEARCH_CACHE_TTL, Config.SEARCH_CACHE_STALE_TTL,
+                                    Config.SEARCH_CACHE_MAX_BYTES) if Config.SEARCH_CACHE_DIR else None
+                health = HealthTracker.from_config([name for name, _, _ in SOURCES])
+                cls._shared = cls(timeout=Config.SEARCH_TIMEOUT, deadline=Config.SEARCH_DEADLINE, cache=cache,
+                                  wiki=WikiIndex.shared(), health=health)
+            return cls._shared
+
+    def search(self, query, names=None):
+        """The first good answer for query from the named sources (default all), or None if none found one in time."""
+        sources = [source for source in self.sources if names is None or source[0] in names]
+        if self.wiki is not None and any(name == "Wikipedia" for name, _, _ in sources):
+            answer = self._ask_wiki(query)
+            if answer:
+                return answer
+
+        scope = ",".join(name for name, _, _ in sources)
+        cached = self.cache.get(query, scope) if self.cache else None
+        if cached is not None:
+            answer, fresh = cached
+            if not fresh:
+                self._refresh(query, sources, scope)
+            return answer
+
+        answer = asyncio.run(self.race(query, sources))
+        if answer and self.cache:
+            self.cache.put(query, answer, scope)
+        return answer
+
+    def _ask_wiki(self, query):
+        start = time.monotonic()
+        answer = self.wiki.answer(query)
+        self.wiki_stats.record("answered" if answer else "empty", time.monotonic() - start)
+        if answer:
+            self.wiki_stats.won()
+            print(f"✅ Offline Wikipedia answered in {(time.monotonic() - start) * 1000:.1f} ms")
+        return answer
+
+    def _refresh(self, query, sources, scope):
+        """Re-runs a stale query in the background, once at a time per query."""
+        key = (scope, query)
+        with self.refreshing_lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                answer = asyncio.run(self.race(query, sources))
+                if answer:
+                    self.cache.put(query, answer, scope)
+            finally:
+                with self.refreshing_lock:
+                    self.refreshing.discard(key)
+
+        self.refresher.submit(refresh)
+
+    async def race(self, query, sources=None):
+        expired = threading.Event()  # Set at the deadline, so sources still running count it as a timeout
+        order = self.health.order(sources or self.sources)
+        tasks = {asyncio.ensure_future(self._ask(source, query, expired)): source[0] for source in order}
+        remaining = set(tasks)
+        finish_by = time.monotonic() + self.deadline
+        try:
+            while remaining:
+                done, remaining = await asyncio.wait(remaining, timeout=finish_by - time.monotonic(),
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"⚠ Search deadline of {self.deadline:.0f}s reached")
+                    expired.set()
+                    return None
+                for task in sorted(done, key=list(tasks).index):  # Answers that arrive together go to the best source
+                    answer = task.result()
+                    if answer:
+                        self.health[tasks[task]].won()
+                        print(f"✅ {tasks[task]} answered first")
+                        return answer
+            return None
+        finally:
+            for task in remaining:
+                task.cancel()
+            if remaining:
+                await asyncio.wait(remaining)
+            self.health.save()
+
+    async def _ask(self, source, query, expired):
+        name, template, tag = source
+        health = self.health[name]
+        cancelled = threading.Event()
+        start = time.monotonic()
+        try:
+            answer = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._fetch, template.format(query=quote_plus(query)), tag, cancelled)
+        except asyncio.CancelledError:
+            cancelled.set()  # The worker thread drops the download at its next chunk
+            if expired.is_set():
+                health.record("timed_out", time.monotonic() - start)
+            else:
+                health.record("cancelled")
+            raise
+        except requests.exceptions.RequestException as error:
+            print(f"❌ {name} failed: {error}")
+            health.record("failed", time.monotonic() - start)
+            return None
+        except Exception as error:  # A parser bug or odd page in one source must not end the race for the rest
+            print(f"❌ {name} failed: {type(error).__name__}: {error}")
+            health.record("failed", time.monotonic() - start)
+            return None
+
+        health.record("answered" if answer else "empty", time.monotonic() - start)
+        return answer
+
+    def _fetch(self, url, tag, cancelled):
+        """Downloads and extracts on a worker thread, so parsing never holds up the race."""
+        parser = self.parser(tag)
+        for text in self.client.stream(url, self.timeout, cancelled):
+            if parser.feed(text):
+                return parser.result  # Leaving the stream closes the connection; the rest is never downloaded
+        return None if cancelled.is_set() else parser.close()
+
+    def report(self):
+        """Per-source request outcomes, wins, recent success rate, latency EWMA and circuit breaker state."""
+        report = self.health.report()
+        if self.wiki is not None:
+            report["Wikipedia (offline)"] = self.wiki_stats.as_dict()
+        return report
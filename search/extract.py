@@ -0,0 +1,141 @@
+"""Pulling the answer snippet out of a search results page.
+
+extract_snippet parses a whole page with BeautifulSoup. The streaming
+parsers are fed the page chunk by chunk as it downloads, build no tree,
+and report the snippet as soon as the element holding it closes, so the
+rest of the page need not be downloaded. snippet_parser picks lxml's
+incremental parser when lxml is installed and the standard library's
+HTMLParser otherwise. Both return the same snippet extract_snippet would
+on well-formed pages; on malformed ones lxml repairs the markup the way a
+browser does, where html.parser keeps it as written.
+"""
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+SKIPPED = ("script", "style", "template")  # Their text is not page text
+
+
+def good_snippet(text):
+    """The quality filter for a search answer: long enough and not just a link."""
+    return len(text) > 50 and "http" not in text
+
+
+def extract_snippet(html, tag):
+    """The first `tag` element on a results page whose text passes good_snippet (None if there is none)."""
+    soup = BeautifulSoup(html, "html.parser")
+    for snippet in soup.find_all(tag):
+        text = snippet.text.strip()
+        if good_snippet(text):
+            return text
+    return None
+
+
+class StreamingSnippetParser(HTMLParser):
+    """extract_snippet over a page fed in pieces, without building a tree.
+
+    `tag` elements nest (a div in a div), and an outer element comes first
+    in document order even though it closes last. So the snippet is chosen
+    each time an outermost `tag` element closes, from it and everything
+    nested in it, in the order they opened. `feed` returns the snippet once
+    found, and the rest of the page can then be skipped.
+    """
+
+    def __init__(self, tag):
+        super().__init__(convert_charrefs=True)
+        self.tag = tag
+        self.open = []  # Text pieces of each `tag` element still open, outermost first
+        self.candidates = []  # Every `tag` element under the current outermost one, in opening order
+        self.skipping = 0
+        self.result = None
+
+    def feed(self, data):
+        if self.result is None:
+            super().feed(data)
+        return self.result
+
+    def close(self):
+        if self.result is None:
+            super().close()
+            self.open.clear()  # Unclosed elements end with the page
+            self._choose()
+        return self.result
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED:
+            self.skipping += 1
+        elif tag == self.tag:
+            pieces = []
+            self.open.append(pieces)
+            self.candidates.append(pieces)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag == self.tag and self.open:
+            self.open.pop()
+            if not self.open:
+                self._choose()
+
+    def handle_data(self, data):
+        if not self.skipping:
+            for pieces in self.open:
+                pieces.append(data)
+
+    def _choose(self):
+        for pieces in self.candidates:
+            text = "".join(pieces).strip()
+            if good_snippet(text):
+                self.result = text
+                break
+        self.candidates.clear()
+
+
+class LxmlSnippetParser:
+    """StreamingSnippetParser on lxml's incremental HTML parser (libxml2), several times faster."""
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.parser = etree.HTMLPullParser(events=("start", "end"), tag=tag)
+        self.depth = 0
+        self.result = None
+
+    def feed(self, data):
+        if self.result is None:
+            self.parser.feed(data)
+            self._read()
+        return self.result
+
+    def close(self):
+        if self.result is None:
+            try:
+                self.parser.close()
+            except etree.XMLSyntaxError:
+                pass  # An empty or truncated page
+            self._read()
+        return self.result
+
+    def _read(self):
+        for event, element in self.parser.read_events():
+            if event == "start":
+                self.depth += 1
+                continue
+            self.depth -= 1
+            if self.depth or self.result is not None:
+                continue
+            etree.strip_elements(element, *SKIPPED, with_tail=False)
+            for node in element.iter(self.tag):
+                text = "".join(node.itertext()).strip()
+                if good_snippet(text):
+                    self.result = text
+                    break
+            element.clear(keep_tail=True)  # Done with it; keeps memory flat on long pages
+
+
+def snippet_parser(tag):
+    """A streaming parser for `tag` snippets: lxml's when it is installed, else the standard library's."""
+    return LxmlSnippetParser(tag) if etree is not None else StreamingSnippetParser(tag)
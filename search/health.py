@@ -0,0 +1,221 @@
+"""How each search source has been doing, and whether it is worth asking.
+
+Every source has a circuit breaker. While it is closed the source is asked
+as usual. Repeated failures (errors, timeouts, CAPTCHA pages answering 429)
+or a success rate near zero over the recent window open it, and the source
+is skipped for a cooldown. After the cooldown the breaker is half open: one
+probe request is let through, which closes it if it answers and reopens it
+for twice as long if not. The sources that are asked are ordered by recent
+answers per second of latency, so ties go to the source that has been
+doing best.
+
+The numbers and breaker states are saved to a JSON file after every
+search, so a source that was dead before a restart stays skipped after it.
+
+Show the saved state from the project root:
+    python -m search.health
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from config import Config
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class SourceHealth:
+    """One source's request outcomes, recent success rate, latency EWMA and circuit breaker."""
+
+    OUTCOMES = ("answered", "empty", "failed", "timed_out", "cancelled", "skipped")
+    FAILURES = ("failed", "timed_out")  # Count towards opening the breaker; "empty" only lowers the success rate
+
+    def __init__(self, name, window=50, alpha=0.2, failures=5, min_success=0.05, cooldown=60.0,
+                 max_cooldown=3600.0):
+        self.name = name
+        self.alpha = alpha
+        self.failure_limit = failures
+        self.min_success = min_success
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+
+        self.counts = dict.fromkeys(self.OUTCOMES, 0)
+        self.wins = 0  # Answers that were the first good one and got used
+        self.recent = deque(maxlen=window)  # 1 for answered, 0 for anything else that finished
+        self.latency = None  # EWMA of seconds per finished request
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0  # Times opened since it last closed; each doubles the cooldown
+        self.cooldown = 0.0
+        self.opened_until = 0.0  # Wall clock, so it holds across restarts
+        self.probing = False
+
+    def allow(self):
+        """Whether to ask this source now. Claims the probe when the breaker is half open."""
+        with self.lock:
+            if self.state == OPEN and time.time() >= self.opened_until:
+                self.state = HALF_OPEN
+                print(f"🔄 {self.name} circuit half open, probing")
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            if self.state != CLOSED:
+                self.counts["skipped"] += 1
+                return False
+            return True
+
+    def force_probe(self):
+        """Half opens the breaker now, cooldown or not, with this request as its probe."""
+        with self.lock:
+            self.state, self.probing = HALF_OPEN, True
+
+    def won(self):
+        with self.lock:
+            self.wins += 1
+
+    def record(self, outcome, seconds=None):
+        with self.lock:
+            self.counts[outcome] += 1
+            if outcome == "cancelled":
+                self.probing = False  # A probe that lost the race told us nothing; the next one may go
+                return
+
+            self.recent.append(1 if outcome == "answered" else 0)
+            if seconds is not None:
+                self.latency = seconds if self.latency is None else (
+                    self.alpha * seconds + (1.0 - self.alpha) * self.latency)
+            if outcome == "answered":
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    self.state, self.trips, self.probing = CLOSED, 0, False
+                    self.recent.clear()  # A fresh start, so old failures don't reopen it at once
+                    print(f"✅ {self.name} circuit closed")
+                return
+
+            if outcome in self.FAILURES:
+                self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._open("probe failed")
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_limit:
+                self._open(f"{self.consecutive_failures} failures in a row")
+            elif self.state == CLOSED and len(self.recent) >= self.recent.maxlen // 2 and (
+                    self.success_rate() < self.min_success):
+                self._open(f"{self.success_rate():.0%} success over the last {len(self.recent)} requests")
+
+    def _open(self, reason):
+        self.trips += 1
+        self.cooldown = min(self.base_cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        self.opened_until = time.time() + self.cooldown
+        self.state, self.probing = OPEN, False
+        print(f"⚠ {self.name} circuit opened for {self.cooldown:.0f}s ({reason})")
+
+    def success_rate(self):
+        """Share of recent finished requests that answered (None before any)."""
+        return sum(self.recent) / len(self.recent) if self.recent else None
+
+    def score(self):
+        """Recent answers per second of latency, smoothed so a new source starts in the middle."""
+        rate = (sum(self.recent) + 1) / (len(self.recent) + 2)
+        return rate / ((self.latency if self.latency is not None else 1.0) + 0.1)
+
+    def as_dict(self):
+        with self.lock:
+            finished = len(self.recent)
+            return {**self.counts, "wins": self.wins, "state": self.state,
+                    "success_rate": sum(self.recent) / finished if finished else None, "window": finished,
+                    "latency_ewma": self.latency, "consecutive_failures": self.consecutive_failures,
+                    "cooldown": self.cooldown if self.state != CLOSED else 0.0,
+                    "open_for": max(self.opened_until - time.time(), 0.0) if self.state == OPEN else 0.0}
+
+    def state_dict(self):
+        with self.lock:
+            return {"counts": self.counts, "wins": self.wins, "recent": list(self.recent), "latency": self.latency,
+                    "state": self.state, "consecutive_failures": self.consecutive_failures, "trips": self.trips,
+                    "cooldown": self.cooldown, "opened_until": self.opened_until}
+
+    def load_state(self, saved):
+        with self.lock:
+            self.counts.update(saved.get("counts", {}))
+            self.wins = saved.get("wins", 0)
+            self.recent.extend(saved.get("recent", []))
+            self.latency = saved.get("latency")
+            # A probe in flight when the app stopped never finished; go back to waiting for the next one
+            self.state = OPEN if saved.get("state") == HALF_OPEN else saved.get("state", CLOSED)
+            self.consecutive_failures = saved.get("consecutive_failures", 0)
+            self.trips = saved.get("trips", 0)
+            self.cooldown = saved.get("cooldown", 0.0)
+            self.opened_until = saved.get("opened_until", 0.0)
+
+
+class HealthTracker:
+    """The SourceHealth of every search source, saved to and loaded from `path` (None = not persisted)."""
+
+    def __init__(self, names, path=None, **settings):
+        self.path = path
+        self.sources = {name: SourceHealth(name, **settings) for name in names}
+        self.lock = threading.Lock()
+        for name, saved in self._load().items():
+            if name in self.sources:
+                self.sources[name].load_state(saved)
+
+    @classmethod
+    def from_config(cls, names):
+        return cls(names, Config.SEARCH_HEALTH_FILE, window=Config.SEARCH_HEALTH_WINDOW,
+                   alpha=Config.SEARCH_LATENCY_ALPHA, failures=Config.SEARCH_BREAKER_FAILURES,
+                   min_success=Config.SEARCH_BREAKER_MIN_SUCCESS, cooldown=Config.SEARCH_BREAKER_COOLDOWN,
+                   max_cooldown=Config.SEARCH_BREAKER_MAX_COOLDOWN)
+
+    def __getitem__(self, name):
+        return self.sources[name]
+
+    def order(self, sources):
+        """The (name, ...) sources worth asking now, best first.
+
+        Sources with an open breaker are left out, unless every one is open;
+        then the one due back soonest is probed early rather than asking no
+        one at all.
+        """
+        allowed = [source for source in sources if self.sources[source[0]].allow()]
+        if not allowed and sources:
+            soonest = min(sources, key=lambda source: self.sources[source[0]].opened_until)
+            self.sources[soonest[0]].force_probe()
+            allowed = [soonest]
+        return sorted(allowed, key=lambda source: self.sources[source[0]].score(), reverse=True)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            print(f"⚠ Could not read search health from {self.path}: {error}")
+            return {}
+
+    def save(self):
+        if not self.path:
+            return
+        data = json.dumps({name: health.state_dict() for name, health in self.sources.items()}, indent=4)
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(temporary, self.path)  # Never a half-written file, even if the app dies mid-save
+
+    def report(self):
+        return {name: health.as_dict() for name, health in self.sources.items()}
+
+
+if __name__ == "__main__":
+    from search.engine import SOURCES
+
+    tracker = HealthTracker.from_config([name for name, _, _ in SOURCES])
+    for name, health in tracker.report().items():
+        rate = "-" if health["success_rate"] is None else f"{health['success_rate']:.0%}"
+        latency = "-" if health["latency_ewma"] is None else f"{health['latency_ewma']:.2f}s"
+        print(f"📊 {name:<12} {health['state']:<9} success {rate:>4} of {health['window']:<3} "
+              f"latency {latency:>6}  wins {health['wins']:<5} skipped {health['skipped']:<5}"
+              + (f" open for {health['open_for']:.0f}s" if health["open_for"] else ""))
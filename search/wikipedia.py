@@ -0,0 +1,168 @@
+"""An offline Wikipedia index: answers factual questions from disk, with no network.
+
+search.build_wikipedia turns a Wikipedia dump into a directory of flat
+files, and WikiIndex memory-maps them, so opening the index costs nothing
+and the OS pages in only what queries touch:
+
+    meta.json                    counts and the average document length
+    docs.bin, doc_offsets.npy    "title\\nabstract" of every article, by document id
+    doc_lengths.npy              tokens per document, for BM25
+    terms.bin, term_offsets.npy  every term, sorted
+    posting_offsets.npy          where each term's postings start in...
+    postings.npy, freqs.npy      ...document ids and term frequencies, grouped by term
+    titles.bin, title_offsets.npy, title_docs.npy
+                                 normalized titles and redirects, sorted, with their document id
+
+A question naming an article ("who was Alan Turing") is answered by a title
+lookup, a binary search of the sorted title table. Anything else is ranked
+with BM25 over the inverted index.
+"""
+import json
+import mmap
+import os
+import re
+import threading
+import numpy as np
+from config import Config
+from search.cache import normalize
+
+STOPWORDS = frozenset("a an and are as at be by did do does for from how in is it of on or that the this to "
+                      "was were what when where which who whom why with".split())
+QUESTION = re.compile(r"^(?:(?:what|who|where|which)(?: is| are| was| were)|tell me about|define|search(?: for)?"
+                      r"|look up)\s+(?:an? |the )?")
+
+
+def tokenize(text):
+    """The index terms of text: lower case words and numbers, without stopwords."""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+
+def title_key(title):
+    """The form titles are stored and looked up in."""
+    return normalize(title.replace("_", " "))
+
+
+class StringTable:
+    """UTF-8 strings packed into one mmap'd blob, read without loading it."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets  # Entry i is blob[offsets[i]:offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+    def find(self, key):
+        """The position of key by binary search, or None. Only for tables sorted by their UTF-8 bytes."""
+        key = key.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self[low] == key else None
+
+
+class WikiIndex:
+    """Queries a Wikipedia index built by search.build_wikipedia."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory, k1=1.2, b=0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+            self.meta = json.load(file)
+        self.documents = self.meta["documents"]
+        self.average_length = self.meta["average_length"]
+
+        self.docs = StringTable(self._blob("docs.bin"), self._array("doc_offsets.npy"))
+        self.doc_lengths = self._array("doc_lengths.npy")
+        self.terms = StringTable(self._blob("terms.bin"), self._array("term_offsets.npy"))
+        self.posting_offsets = self._array("posting_offsets.npy")
+        self.postings = self._array("postings.npy")
+        self.freqs = self._array("freqs.npy")
+        self.titles = StringTable(self._blob("titles.bin"), self._array("title_offsets.npy"))
+        self.title_docs = self._array("title_docs.npy")
+        print(f"📦 Offline Wikipedia: {self.documents} articles, {len(self.terms)} terms, {len(self.titles)} titles")
+
+    @classmethod
+    def shared(cls):
+        """The process-wide index from Config.WIKI_INDEX_DIR, or None until one has been built there."""
+        with cls._shared_lock:
+            directory = Config.WIKI_INDEX_DIR
+            if cls._shared is None and directory and os.path.exists(os.path.join(directory, "meta.json")):
+                cls._shared = cls(directory, Config.WIKI_BM25_K1, Config.WIKI_BM25_B)
+            return cls._shared
+
+    def _array(self, name):
+        return np.load(os.path.join(self.directory, name), mmap_mode="r")
+
+    def _blob(self, name):
+        with open(os.path.join(self.directory, name), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""  # mmap refuses empty files
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def document(self, doc_id):
+        """(title, abstract) of a document."""
+        title, _, abstract = self.docs[doc_id].decode("utf-8").partition("\n")
+        return title, abstract
+
+    def lookup(self, title):
+        """The document for an article title or redirect, or None."""
+        position = self.titles.find(title_key(title))
+        return None if position is None else int(self.title_docs[position])
+
+    def search(self, query, k=5, min_coverage=0.0):
+        """The top k (score, title, abstract) for query by BM25.
+
+        Only documents containing at least `min_coverage` of the query's
+        distinct terms are ranked.
+        """
+        terms = sorted(set(tokenize(query)))
+        doc_ids, scores = [], []
+        for term in terms:
+            position = self.terms.find(term)
+            if position is None:
+                continue
+            start, end = int(self.posting_offsets[position]), int(self.posting_offsets[position + 1])
+            ids = np.asarray(self.postings[start:end])
+            tf = np.asarray(self.freqs[start:end], dtype=np.float32)
+            lengths = np.asarray(self.doc_lengths[ids], dtype=np.float32)
+            idf = np.log(1.0 + (self.documents - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / self.average_length)
+            doc_ids.append(ids)
+            scores.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+        if not doc_ids:
+            return []
+
+        # ✅ Sum each document's scores across terms without a score array over the whole collection
+        matched, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if min_coverage:
+            coverage = np.bincount(inverse) / len(terms)
+            totals[coverage < min_coverage] = 0.0
+        top = np.argsort(-totals)[:k] if len(totals) <= k else np.argpartition(-totals, k)[:k]
+        top = top[np.argsort(-totals[top])]
+        return [(float(totals[i]), *self.document(int(matched[i]))) for i in top if totals[i] > 0]
+
+    def answer(self, query):
+        """The abstract of the article query is about, or None if the index has no confident answer.
+
+        An article named by the question wins; otherwise the best BM25 match
+        among articles containing every query term.
+        """
+        for title in (query, QUESTION.sub("", title_key(query))):
+            doc_id = self.lookup(title) if title else None
+            if doc_id is not None:
+                return self.document(doc_id)[1]
+        results = self.search(query, 1, min_coverage=1.0)
+        return results[0][2] if results else None
@@ -0,0 +1,58 @@
+"""EncryptedJournal: deletes below a dict put stay deleted, in memory and after a reopen.
+
+Run from the project root:
+    python -m unittest tests.test_journal
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from cryptography.fernet import Fernet
+from memory.journal import EncryptedJournal
+
+
+class JournalDeleteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="catia-journal-")
+        self.filepath = os.path.join(self.directory, "memory.enc")
+        self.fernet = Fernet(Fernet.generate_key())
+        self.journal = EncryptedJournal(self.filepath, self.fernet)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.journal.close()
+        self.journal = EncryptedJournal(self.filepath, self.fernet)
+
+    def test_deleted_child_of_dict_put_stays_deleted(self):
+        self.journal.put(("_access",), {"casual": {"a": [1, 1.0]}})
+        self.journal.put(("_access", "casual", "b"), [2, 2.0])
+        self.journal.delete(("_access", "casual", "b"))
+
+        expected = {"_access": {"casual": {"a": [1, 1.0]}}}
+        self.assertEqual(self.journal.snapshot(), expected)
+        self.assertEqual(self.journal.get(("_access", "casual")), {"a": [1, 1.0]})
+        self.reopen()
+        self.assertEqual(self.journal.snapshot(), expected)
+
+    def test_dict_put_replaces_everything_below_it(self):
+        self.journal.put(("learned",), {"hi": "hello", "bye": "see you"})
+        self.journal.put(("learned",), {"hey": {"text": "there"}})
+        self.journal.delete(("learned", "hey", "text"))
+        self.reopen()
+        self.assertEqual(self.journal.snapshot(), {})
+
+    def test_whole_dict_records_from_older_journals_are_split(self):
+        # What older versions wrote for a dict put: one record holding the whole dict
+        self.journal._append_lines([(("_access",), {"k": ["_access"], "v": {"casual": {"a": 1, "b": 2}}})])
+        self.reopen()
+        self.journal.delete(("_access", "casual", "b"))
+        self.reopen()
+        self.assertEqual(self.journal.snapshot(), {"_access": {"casual": {"a": 1}}})
+        self.assertEqual(self.journal.live_bytes, sum(length for _, length in self.journal.index.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
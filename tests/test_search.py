@@ -0,0 +1,116 @@
+"""SearchClient and SearchEngine against a local HTTP stub: kept-alive sessions, timeouts, dead hosts, the race.
+
+Run from the project root:
+    python -m unittest tests.test_search
+"""
+import http.server
+import socket
+import threading
+import time
+import unittest
+import requests
+from search.client import SearchClient
+from search.engine import SearchEngine
+
+SLOW_SECONDS = 2.0
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse shows in the client ports
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.ports.append(self.client_address[1])
+        if self.path.startswith("/slow"):
+            time.sleep(SLOW_SECONDS)
+        elif self.path.startswith("/late"):
+            time.sleep(0.3)  # Long enough for the failing sources to finish first
+        if self.path.startswith("/busy"):
+            self.reply(429, b"<p>Too many requests</p>")
+        elif self.path.startswith("/empty"):
+            self.reply(200, b"<p>nothing</p>")
+        else:
+            self.reply(200, b"<p>Paris is the capital and most populous city of France, on the Seine.</p>")
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def unused_port():
+    """A local port nothing listens on, so connecting to it fails at once."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class SearchStubTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.server.ports = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.client = SearchClient(pool_size=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def engine(self, sources, timeout=5.0, deadline=6.0):
+        return SearchEngine([(name, base + path, "p") for name, base, path in sources],
+                            timeout=timeout, deadline=deadline, client=self.client)
+
+    def test_one_kept_alive_session_per_host(self):
+        del self.server.ports[:]
+        self.assertIn("Paris", self.client.get(self.base + "/answer?q=1"))
+        self.assertIn("Paris", self.client.get(self.base + "/answer?q=2"))
+        self.assertIs(self.client.session(self.base + "/a"), self.client.session(self.base + "/b"))
+        self.assertEqual(len(set(self.server.ports)), 1)  # The second request reused the first one's connection
+
+    def test_timeout_raises(self):
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.client.get(self.base + "/slow", timeout=0.3)
+
+    def test_http_error_raises(self):
+        with self.assertRaises(requests.HTTPError):
+            self.client.get(self.base + "/busy")
+
+    def test_failed_host_does_not_stop_the_race(self):
+        dead = f"http://127.0.0.1:{unused_port()}"
+        engine = self.engine([("Dead", dead, "/?q={query}"), ("Busy", self.base, "/busy?q={query}"),
+                              ("Good", self.base, "/late?q={query}")])
+        self.assertIn("Paris", engine.search("capital of france"))
+        report = engine.report()
+        self.assertEqual(report["Dead"]["failed"], 1)
+        self.assertEqual(report["Busy"]["failed"], 1)
+        self.assertEqual(report["Good"]["wins"], 1)
+
+    def test_first_answer_cancels_the_slow_sources(self):
+        engine = self.engine([("Slow", self.base, "/slow?q={query}"), ("Good", self.base, "/answer?q={query}")])
+        start = time.monotonic()
+        self.assertIn("Paris", engine.search("capital of france"))
+        self.assertLess(time.monotonic() - start, SLOW_SECONDS)
+        self.assertEqual(engine.report()["Slow"]["cancelled"], 1)
+
+    def test_deadline_times_out_the_race(self):
+        engine = self.engine([("Slow", self.base, "/slow?q={query}"), ("Empty", self.base, "/empty?q={query}")],
+                             timeout=5.0, deadline=0.5)
+        start = time.monotonic()
+        self.assertIsNone(engine.search("capital of france"))
+        self.assertLess(time.monotonic() - start, SLOW_SECONDS)
+        report = engine.report()
+        self.assertEqual(report["Slow"]["timed_out"], 1)
+        self.assertEqual(report["Empty"]["empty"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
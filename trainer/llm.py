@@ -1,10 +1,12 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
-import torch
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # ✅ Shared code lives in the project root
+from llm.registry import ModelRegistry
 
 class CatiaLLM:
-    def __init__(self):
-        self.model = AutoModelForCausalLM.from_pretrained("./trained_catia")
-        self.tokenizer = AutoTokenizer.from_pretrained("./trained_catia")
+    def __init__(self, model_path="./trained_catia"):
+        self.model, self.tokenizer = ModelRegistry.get(model_path, "eager")  # ✅ One copy per process, however many instances
 
     def think(self, user_input):
         inputs = self.tokenizer(user_input, return_tensors="pt", padding=True)
@@ -12,6 +14,7 @@ class CatiaLLM:
         return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
 
 # ✅ Example usage
-catia = CatiaLLM()
-response = catia.think("hey")
-print("Catia:", response)
+if __name__ == "__main__":
+    catia = CatiaLLM()
+    response = catia.think("hey")
+    print("Catia:", response)
@@ -1,14 +1,20 @@
 import json
+import os
 import random
+import sys
 import time
-from transformers import AutoModelForCausalLM, AutoTokenizer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # ✅ Shared code lives in the project root
+from llm.registry import ModelRegistry
+from llm.scoring import ResponseScorer
 
 class NSFWChatGenerator:
-    def __init__(self, model_path="./trained_catia"):
+    def __init__(self, model_path="./trained_catia", best_of=4):
         """Load fine-tuned NSFW model"""
-        self.model = AutoModelForCausalLM.from_pretrained(model_path)
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model, self.tokenizer = ModelRegistry.get(model_path, "eager")  # ✅ Shared, merged and mmap'd weights
         self.mood = self.random_mood()
+        self.best_of = best_of  # ✅ Candidates sampled per prompt in one generate call
+        self.scorer = ResponseScorer()
 
     def random_mood(self):
         """Randomly selects a mood for variation in responses"""
@@ -28,10 +34,14 @@ class NSFWChatGenerator:
             top_p=0.95,  
             repetition_penalty=1.4,  
             do_sample=True,  
-            num_return_sequences=1,  
+            num_return_sequences=self.best_of,  
             eos_token_id=self.tokenizer.eos_token_id  
         )
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+        # ✅ Keep the best-scored candidate instead of falling back whenever the single sample is bad
+        prompt_length = inputs["input_ids"].shape[1]
+        candidates = [self.tokenizer.decode(output, skip_special_tokens=True).strip() for output in outputs]
+        replies = [self.tokenizer.decode(output[prompt_length:], skip_special_tokens=True).strip() for output in outputs]
+        response = max(zip(candidates, replies), key=lambda pair: self.scorer(pair[1], user_prompt))[0]
 
         return self.filter_response(response, user_prompt)
 
@@ -92,5 +102,6 @@ class NSFWChatGenerator:
         print(f"🔥 Auto-generated {len(dataset)} NSFW chat pairs!")
 
 # ✅ Run the generator
-generator = NSFWChatGenerator()
-generator.create_nsfw_dataset(num_chats=50)
+if __name__ == "__main__":
+    generator = NSFWChatGenerator()
+    generator.create_nsfw_dataset(num_chats=50)
@@ -0,0 +1,83 @@
+from transformers import AutoModelForCausalLM, AutoTokenizer, Trainer, TrainingArguments
+import json
+import os
+import sys
+import torch
+import torch.nn.functional as F
+from datasets import Dataset
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # ✅ Shared code lives in the project root
+from llm.backends import load_model
+
+# ✅ Draft model for speculative decoding: a small GPT-2 with the same tokenizer as trained_catia.
+# It is fine-tuned on the same data as train.py and also distilled from trained_catia, so it
+# proposes the tokens Catia would pick. Point Config.DRAFT_MODEL_PATH at the result.
+draft_name = "distilgpt2"
+teacher_path = "../llm/trained_catia"
+output_path = "../llm/trained_catia_draft"
+temperature = 2.0  # Softens the teacher's distribution so the draft learns its runner-up tokens too
+alpha = 0.5  # Weight of the distillation loss against plain next-token loss
+
+model = AutoModelForCausalLM.from_pretrained(draft_name)
+tokenizer = AutoTokenizer.from_pretrained(draft_name)
+tokenizer.pad_token = tokenizer.eos_token  # GPT-2 needs this
+teacher = load_model(teacher_path, "eager")[0]  # Merged, eval mode
+teacher.requires_grad_(False)
+
+# ✅ Load and tokenize dataset (same format as train.py)
+with open("training_data.json", "r") as f:
+    training_data = json.load(f)
+
+dataset = Dataset.from_list(training_data)
+
+def tokenize_function(example):
+    tokenized = tokenizer(example["input"] + " " + example["output"], truncation=True, padding="max_length",
+                          max_length=128)
+    tokenized["labels"] = [token if mask else -100 for token, mask in
+                           zip(tokenized["input_ids"], tokenized["attention_mask"])]  # No loss on padding
+    return tokenized
+
+
+tokenized_datasets = dataset.map(tokenize_function, remove_columns=dataset.column_names)
+
+
+class DistillationTrainer(Trainer):
+    """Mixes the usual language-modelling loss with KL divergence from the teacher's next-token distribution."""
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = teacher(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits
+
+        mask = inputs["attention_mask"].bool()
+        distill = F.kl_div(F.log_softmax(outputs.logits[mask] / temperature, dim=-1),
+                           F.softmax(teacher_logits[mask] / temperature, dim=-1),
+                           reduction="batchmean") * temperature ** 2
+        loss = alpha * distill + (1 - alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+# ✅ Training settings (the draft is small enough to fine-tune fully, without LoRA)
+training_args = TrainingArguments(
+    output_dir=output_path,
+    per_device_train_batch_size=4,
+    save_total_limit=2,
+    num_train_epochs=3,
+    learning_rate=5e-5,
+    logging_dir="./logs"
+)
+
+trainer = DistillationTrainer(
+    model=model,
+    args=training_args,
+    train_dataset=tokenized_datasets
+)
+
+# ✅ Start training
+trainer.train()
+
+# ✅ Save the draft model
+model.save_pretrained(output_path)
+tokenizer.save_pretrained(output_path)
+
+print(f"🎉 Draft model saved to {output_path}! Set Config.DRAFT_MODEL_PATH to use it.")
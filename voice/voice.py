@@ -1,3 +1,5 @@
+import queue
+import threading
 import pyttsx3
 import speech_recognition as sr
 from config import Config
@@ -13,6 +15,9 @@ class CatiaVoice:
 
         self.recognizer = sr.Recognizer()
 
+        self.speech_queue = queue.Queue()  # ✅ Sentences waiting to be spoken, in order
+        self.speaker = None
+
     def speak(self, text):
         """Speaks out text while preventing the 'run loop already started' error."""
         try:
@@ -22,6 +27,19 @@ class CatiaVoice:
         except RuntimeError:
             print("⚠ Voice engine already running. Skipping speech to prevent crash.")
 
+    def speak_queued(self, text):
+        """Queues text to be spoken after anything already queued, without blocking the caller."""
+        if not text.strip():
+            return
+        if self.speaker is None:
+            self.speaker = threading.Thread(target=self._speak_loop, name="catia-voice", daemon=True)
+            self.speaker.start()
+        self.speech_queue.put(text)
+
+    def _speak_loop(self):
+        while True:
+            self.speak(self.speech_queue.get())
+
     def listen(self):
         """Listens to the microphone and processes voice input safely."""
         with sr.Microphone() as source: